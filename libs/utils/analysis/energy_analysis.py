@@ -0,0 +1,373 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+""" Energy Analysis Module """
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from analysis_module import AnalysisModule
+from devlib.utils.misc import memoized
+from energy_markers import ENERGY_MARKER
+
+
+class EnergyAnalysis(AnalysisModule):
+    """
+    Support for attributing energy meter samples to trace activity
+
+    Energy meters index their samples from the moment they start sampling,
+    while trace events are timestamped by the kernel clock. Samples are moved
+    onto the trace timeline using, in order of preference:
+
+    - an offset provided by the caller
+    - the "start" (and "stop") markers written in the trace by energy meters
+      configured with ``"trace_markers" : True``
+    - the cross-correlation between the total power and the number of active
+      CPUs, see :meth:`estimate_energy_offset`
+
+    The samples are read from the ``samples.csv`` file found in the trace
+    directory, as written by continuous energy meters (e.g. AEP, Monsoon) and
+    by :class:`HWMon` in sampling mode. Only ``SITE_power`` columns are used.
+
+    Energy is attributed to CPUs by matching the name of each channel with a
+    cluster name in the platform description (e.g. channel "LITTLE" with
+    cluster "little"). Use the ``channel_cpus`` parameters to override this.
+
+    :param trace: input Trace object
+    :type trace: :mod:`libs.utils.Trace`
+    """
+
+    def __init__(self, trace):
+        super(EnergyAnalysis, self).__init__(trace)
+
+###############################################################################
+# DataFrame Getter Methods
+###############################################################################
+
+    def _dfg_energy_markers(self):
+        """
+        Get the energy meter start and stop markers found in the trace
+
+        :returns: :mod:`pandas.DataFrame` with an "event" column, or None if
+                  the trace has no markers
+        """
+        if not self._trace.hasEvents(ENERGY_MARKER):
+            return None
+        return self._dfg_trace_event(ENERGY_MARKER)[['event']]
+
+    def _dfg_energy_samples(self, sample_rate_hz=None, offset=None,
+                            samples_file='samples.csv'):
+        """
+        Get the energy meter power samples on the trace timeline
+
+        :param sample_rate_hz: Sample rate of the energy meter. Only needed for
+                               samples without a time column when the trace
+                               does not have both a start and a stop marker.
+        :type sample_rate_hz: int
+
+        :param offset: Trace time of the first sample. Found from the trace
+                       markers or estimated if not provided.
+        :type offset: float
+
+        :param samples_file: Name of the samples file in the trace directory
+        :type samples_file: str
+
+        :returns: :mod:`pandas.DataFrame` indexed by trace time, with the power
+                  of each channel in a column
+        """
+        power, timed = self._getSamples(samples_file)
+
+        start = stop = None
+        markers = self._dfg_energy_markers()
+        if markers is not None:
+            starts = markers[markers.event == 'start'].index
+            stops = markers[markers.event == 'stop'].index
+            start = starts[0] if len(starts) else None
+            stop = stops[-1] if len(stops) else None
+
+        if timed:
+            time = power.index.values
+        elif sample_rate_hz:
+            time = np.arange(len(power)) / float(sample_rate_hz)
+        elif start is not None and stop is not None and len(power) > 1:
+            # Markers delimit the first and last samples
+            time = np.arange(len(power)) * (stop - start) / (len(power) - 1)
+        else:
+            raise ValueError('sample_rate_hz is required to align energy '
+                             'samples without start and stop trace markers')
+        power = pd.DataFrame(power.values, index=time, columns=power.columns)
+
+        if offset is None:
+            if start is not None:
+                offset = start
+            else:
+                offset = self.estimate_energy_offset(power.sum(axis=1))
+            self._log.debug('Energy samples start at %.6f[s]', offset)
+
+        power.index = power.index + offset
+        return power
+
+    def _dfg_energy_tasks(self, samples=None, channel_cpus=None):
+        """
+        Get the energy used by each task
+
+        The energy of each sample of a channel is split evenly between the
+        tasks running on the channel's CPUs at that time. Energy used while no
+        task is running on any of those CPUs is reported as "<idle>".
+
+        :param samples: Power samples as returned by
+                        :meth:`_dfg_energy_samples`, which is called with
+                        default parameters if not provided.
+        :type samples: :mod:`pandas.DataFrame`
+
+        :param channel_cpus: Dict mapping channel names to lists of CPUs
+        :type channel_cpus: dict
+
+        :returns: :mod:`pandas.DataFrame` indexed by task name with the energy
+                  used on each channel in a column
+        """
+        if not self._trace.hasEvents('sched_switch'):
+            self._log.warning('Events [sched_switch] not found, '
+                              'energy attribution to tasks not possible!')
+            return None
+
+        if samples is None:
+            samples = self._dfg_energy_samples()
+        energy = self._getSamplesEnergy(samples)
+        switch_df = self._dfg_trace_event('sched_switch')
+
+        tasks_nrg = {}
+        for channel, cpus in self._getChannelCpus(channel_cpus,
+                                                  samples).iteritems():
+            if channel not in energy:
+                continue
+
+            # Task running on each CPU at each sample, None when idle
+            running = []
+            for cpu in cpus:
+                cpu_df = switch_df[switch_df['__cpu'] == cpu]
+                merged = self._asof(samples.index, cpu_df[['next_comm',
+                                                           'next_pid']])
+                running.append(
+                    merged.next_comm.where(merged.next_pid > 0).values)
+            running = np.column_stack(running)
+
+            busy = pd.notnull(running)
+            busy_count = busy.sum(axis=1)
+            channel_nrg = energy[channel].values
+            share = channel_nrg / np.maximum(busy_count, 1)
+            share = np.broadcast_to(share[:, np.newaxis], running.shape)
+
+            df = pd.DataFrame({'task' : running[busy], 'energy' : share[busy]})
+            nrg = df.groupby('task').energy.sum()
+            nrg['<idle>'] = channel_nrg[busy_count == 0].sum()
+            tasks_nrg[channel] = nrg
+
+        return pd.DataFrame(tasks_nrg).fillna(0)
+
+    def _dfg_energy_frequency_residency(self, channel, samples=None,
+                                        channel_cpus=None):
+        """
+        Get the time spent and energy used by a channel at each frequency
+
+        The frequency of the first CPU of the channel is used; samples taken
+        before the first frequency change in the trace are ignored.
+
+        :param channel: Energy meter channel name
+        :type channel: str
+
+        :param samples: Power samples as returned by
+                        :meth:`_dfg_energy_samples`, which is called with
+                        default parameters if not provided.
+        :type samples: :mod:`pandas.DataFrame`
+
+        :param channel_cpus: Dict mapping channel names to lists of CPUs
+        :type channel_cpus: dict
+
+        :returns: :mod:`pandas.DataFrame` indexed by frequency with "time" and
+                  "energy" columns
+        """
+        if not self._trace.hasEvents('cpu_frequency'):
+            self._log.warning('Events [cpu_frequency] not found, '
+                              'energy attribution to frequencies not possible!')
+            return None
+
+        if samples is None:
+            samples = self._dfg_energy_samples()
+        cpus = self._getChannelCpus(channel_cpus, samples)[channel]
+
+        freq_df = self._dfg_trace_event('cpu_frequency')
+        freq_df = freq_df[freq_df.cpu == cpus[0]][['frequency']]
+        merged = self._asof(samples.index, freq_df)
+
+        return self._getResidency(samples[channel], merged.frequency,
+                                  'frequency')
+
+    def _dfg_energy_cluster_activity(self, channel, samples=None,
+                                     channel_cpus=None):
+        """
+        Get the time spent and energy used by a channel while its CPUs are
+        active (at least one of them is not idle) and idle
+
+        :param channel: Energy meter channel name
+        :type channel: str
+
+        :param samples: Power samples as returned by
+                        :meth:`_dfg_energy_samples`, which is called with
+                        default parameters if not provided.
+        :type samples: :mod:`pandas.DataFrame`
+
+        :param channel_cpus: Dict mapping channel names to lists of CPUs
+        :type channel_cpus: dict
+
+        :returns: :mod:`pandas.DataFrame` indexed by "active" and "idle" with
+                  "time" and "energy" columns
+        """
+        if not self._trace.hasEvents('cpu_idle'):
+            self._log.warning('Events [cpu_idle] not found, '
+                              'energy attribution to activity not possible!')
+            return None
+
+        if samples is None:
+            samples = self._dfg_energy_samples()
+        cpus = self._getChannelCpus(channel_cpus, samples)[channel]
+
+        active = self._trace.getClusterActiveSignal(cpus)
+        merged = self._asof(samples.index, active.to_frame(name='active'))
+        state = merged.active.map({1 : 'active', 0 : 'idle'})
+
+        return self._getResidency(samples[channel], state, 'state')
+
+
+###############################################################################
+# Utility Methods
+###############################################################################
+
+    def estimate_energy_offset(self, power, resolution_s=1e-3,
+                               max_offset_s=None):
+        """
+        Estimate the trace time of the first energy sample
+
+        Finds the shift maximising the cross-correlation between the power and
+        the number of active CPUs, both resampled with the given resolution.
+        This works best for workloads with large changes of activity.
+
+        :param power: Power series indexed by time since the first sample
+        :type power: :mod:`pandas.Series`
+
+        :param resolution_s: Resolution of the estimate
+        :type resolution_s: float
+
+        :param max_offset_s: If provided, only consider offsets within this
+                             distance from the start of the trace
+        :type max_offset_s: float
+
+        :returns: float
+        """
+        if not self._trace.hasEvents('cpu_idle'):
+            raise ValueError('Events [cpu_idle] not found, cannot estimate '
+                             'energy samples offset')
+
+        t_start = 0.0
+        if not self._trace.ftrace.normalized_time:
+            t_start = self._trace.ftrace.basetime
+
+        grid = t_start + np.arange(0, self._trace.time_range, resolution_s)
+        activity = np.zeros(len(grid))
+        for cpu in range(self._platform['cpus_count']):
+            signal = self._trace.getCPUActiveSignal(cpu)
+            activity += self._sample_step(signal, grid)
+        power = self._sample_step(
+            power, np.arange(0, power.index[-1], resolution_s))
+
+        a = activity - activity.mean()
+        b = power - power.mean()
+        nfft = 1 << int(np.ceil(np.log2(len(a) + len(b) - 1)))
+        corr = np.fft.irfft(np.fft.rfft(a, nfft) * np.conj(np.fft.rfft(b, nfft)),
+                            nfft)
+        # corr[k] is the correlation with power delayed by k steps, negative
+        # delays wrap around to the end
+        lags = np.concatenate((np.arange(len(a)), np.arange(1 - len(b), 0)))
+        corr = np.concatenate((corr[:len(a)], corr[nfft - len(b) + 1:]))
+        if max_offset_s is not None:
+            keep = np.abs(lags) <= max_offset_s / resolution_s
+            lags, corr = lags[keep], corr[keep]
+
+        return t_start + lags[np.argmax(corr)] * resolution_s
+
+    @memoized
+    def _getSamples(self, samples_file):
+        """
+        Read the power columns of an energy samples file
+
+        :returns: tuple (df, timed). If the file has a "time" column, timed is
+                  True and df is indexed by it; otherwise df has a default
+                  index. df has one column per channel.
+        """
+        df = pd.read_csv(os.path.join(self._data_dir, samples_file))
+        timed = 'time' in df.columns
+        if timed:
+            df = df.set_index('time')
+        power = df[[c for c in df.columns if c.endswith('_power')]]
+        power.columns = [c.rsplit('_', 1)[0] for c in power.columns]
+        return power, timed
+
+    def _getChannelCpus(self, channel_cpus, samples):
+        """
+        Get the CPUs of the channels of the samples, from the clusters of the
+        platform unless channel_cpus is provided
+        """
+        if channel_cpus is not None:
+            return channel_cpus
+        clusters = (self._platform or {}).get('clusters', {})
+        return {channel : clusters[channel.lower()]
+                for channel in samples.columns if channel.lower() in clusters}
+
+    @staticmethod
+    def _getSamplesEnergy(samples):
+        # Each sample's power is held until the next sample
+        dt = np.ediff1d(samples.index.values, to_end=0)
+        return samples.mul(dt, axis=0)
+
+    @staticmethod
+    def _asof(index, df):
+        """
+        Get the rows of df in effect at each time of a sorted index
+
+        :returns: :mod:`pandas.DataFrame` with a row for each item of index
+        """
+        left = pd.DataFrame({'__time' : np.asarray(index, dtype=float)})
+        right = df.copy()
+        right['__time'] = right.index.values.astype(float)
+        return pd.merge_asof(left, right.sort_values('__time'), on='__time')
+
+    @staticmethod
+    def _sample_step(series, times):
+        """Sample a step signal at the given (sorted) times, 0 before it starts"""
+        idx = np.searchsorted(series.index.values, times, side='right') - 1
+        values = series.values[idx.clip(min=0)].astype(float)
+        return np.where(idx >= 0, values, 0)
+
+    def _getResidency(self, power, key, name):
+        time = np.ediff1d(power.index.values, to_end=0)
+        df = pd.DataFrame({name : key.values, 'time' : time,
+                           'energy' : power.values * time})
+        return df.groupby(name)[['time', 'energy']].sum()
+
+# vim :set tabstop=4 shiftwidth=4 expandtab
@@ -20,6 +20,7 @@
 import matplotlib.gridspec as gridspec
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 import pylab as pl
 import re
 
@@ -182,6 +183,62 @@ class TasksAnalysis(AnalysisModule):
 
         return rt_tasks
 
+    def _dfg_task_lifetimes(self, tasks):
+        """
+        First and last time each task ran, and its total runtime
+
+        Computed with a single pass over the sched_switch events. Tasks are
+        matched by name, aggregating all the PIDs with the same name. The
+        runtime is the sum of the intervals between a switch in of the task
+        and its next switch out.
+
+        :param tasks: names of the tasks
+        :type tasks: list(str)
+
+        :returns: a DataFrame indexed by task name, with columns:
+
+            - first_run: first time the task was switched in
+            - last_run: last time the task was switched in
+            - runtime: total time the task was running
+
+          Tasks which never ran have NaN values.
+        """
+        if not self._trace.hasEvents('sched_switch'):
+            self._log.warning('Events [sched_switch] not found')
+            return None
+
+        df = self._dfg_trace_event('sched_switch')
+
+        # Switch in of the tasks
+        sw_in = df[df.next_comm.isin(tasks)]
+        times = pd.Series(sw_in.index, index=sw_in.next_comm.values)
+        lifetimes = pd.DataFrame({
+            'first_run' : times.groupby(level=0).min(),
+            'last_run'  : times.groupby(level=0).max(),
+        })
+
+        # Pair each switch in of the tasks PIDs with the following event of
+        # the same PID, adding up the time until the switch outs
+        sw_out = df[df.prev_pid.isin(sw_in.next_pid.unique())]
+        events = pd.concat([
+            pd.DataFrame({'time' : sw_in.index, 'pid' : sw_in.next_pid.values,
+                          'running' : True}),
+            pd.DataFrame({'time' : sw_out.index,
+                          'pid' : sw_out.prev_pid.values,
+                          'running' : False}),
+        ]).sort_values(['pid', 'time'], kind='mergesort')
+        following = events.shift(-1)
+        run = events.running & (following.pid == events.pid) & \
+              ~following.running.astype(bool)
+        runtime = (following.time - events.time)[run]\
+                  .groupby(events.pid[run]).sum()
+
+        comms = sw_in.drop_duplicates('next_pid', keep='last')\
+                     .set_index('next_pid').next_comm
+        lifetimes['runtime'] = runtime.groupby(comms).sum()
+        lifetimes['runtime'] = lifetimes.runtime.fillna(0)
+        return lifetimes.reindex(tasks)[['first_run', 'last_run', 'runtime']]
+
 
 ###############################################################################
 # Plotting Methods
@@ -18,6 +18,8 @@
 """Initialization for Android module"""
 
 from screen import Screen
+from shell import ShellSession
+from logcat import LogcatWatcher
 from system import System
 from workload import Workload
 from benchmark import LisaBenchmark
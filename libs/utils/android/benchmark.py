@@ -18,13 +18,11 @@
 import argparse
 import logging
 import os
-import select
 
-from subprocess import Popen, PIPE
 from time import sleep
 
 from conf import LisaLogging
-from android import System, Workload
+from android import LogcatWatcher, System, Workload
 from env import TestEnv
 
 from devlib.utils.misc import memoized
@@ -318,33 +316,18 @@ class LisaBenchmark(object):
         self.benchmarkFinalize()
 
     def _wait_for_logcat_idle(self, seconds=1):
-        lines = 0
-
         # Clear logcat
         # os.system('{} logcat -s {} -c'.format(adb, DEVICE));
         self.target.clear_logcat()
 
-        # Dump logcat output
-        logcat_cmd = 'adb -s {} logcat'.format(self.target.adb_name)
-        logcat = Popen(logcat_cmd, shell=True, stdout=PIPE)
-        logcat_poll = select.poll()
-        logcat_poll.register(logcat.stdout, select.POLLIN)
-
         # Monitor logcat until it's idle for the specified number of [s]
         self._log.info('Waiting for system to be almost idle')
         self._log.info('   i.e. at least %d[s] of no logcat messages', seconds)
-        while True:
-            poll_result = logcat_poll.poll(seconds * 1000)
-            if not poll_result:
-                break
-            lines = lines + 1
-            line = logcat.stdout.readline(1024)
-            if lines % 1000:
-                self._log.debug('   still waiting...')
-            if lines > 1e6:
+        logcat = LogcatWatcher(['adb', '-s', self.target.adb_name, 'logcat'])
+        with logcat:
+            if not logcat.wait_idle(seconds, max_lines=1e6):
                 self._log.warning('device logcat seems quite busy, '
                                   'continuing anyway... ')
-                break
 
     def reboot_target(self, disable_charge=True):
         """
@@ -0,0 +1,211 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Watcher of the lines logged by logcat"""
+
+from collections import OrderedDict
+import logging
+import re
+import shlex
+import subprocess
+import threading
+import time
+
+from devlib import TargetError
+
+class LogcatWatcher(object):
+    """
+    Watch the lines of a logcat stream for a set of patterns
+
+    The stream is read by a background thread, which matches each line
+    against a single regexp combining all the patterns, records the matches
+    and calls the callbacks of the patterns matched. A line is only matched
+    against the first of the patterns it matches.
+
+    The watcher is a context manager, starting the stream on entry and
+    terminating it on exit::
+
+        watcher = LogcatWatcher('adb logcat ActivityManager:* *:S')
+        watcher.on('start', r'ActivityManager: START')
+        with watcher:
+            watcher.wait('start', timeout=60)
+
+    :param command: Command streaming the log lines, e.g. ``adb logcat``
+    :type command: str or list(str)
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self._log = logging.getLogger('LogcatWatcher')
+        self._patterns = OrderedDict()
+        self._groups = {}
+        self._matcher = None
+        self._cond = threading.Condition()
+        self._matches = {}
+        self._ended = False
+        self._error = None
+        self._lines = 0
+        self._last_line = None
+        self._proc = None
+        self._thread = None
+
+    def on(self, name, pattern, callback=None):
+        """
+        Watch for lines matching a pattern
+
+        :param name: Name of the pattern, to :meth:`wait` for it
+        :type name: str
+
+        :param pattern: Regexp to search in the lines. Its named groups must
+                        not clash with those of the other patterns.
+        :type pattern: str or compiled regexp
+
+        :param callback: Called from the watcher thread with the match object
+                         of each matching line
+        :type callback: callable
+        """
+        pattern = getattr(pattern, 'pattern', pattern)
+        self._patterns[name] = (pattern, callback)
+        self._groups = dict(('_lisa_{}'.format(idx), name)
+                            for idx, name in enumerate(self._patterns))
+        self._matcher = re.compile('|'.join(
+            '(?P<_lisa_{}>{})'.format(idx, pattern)
+            for idx, (pattern, _) in enumerate(self._patterns.values())))
+
+    def start(self):
+        """
+        Start streaming the log lines
+        """
+        self._log.debug('Starting: %s', self.command)
+        command = self.command
+        self._last_line = time.time()
+        if isinstance(command, basestring):
+            command = shlex.split(command)
+        self._proc = subprocess.Popen(command, stdout=subprocess.PIPE,
+                                      close_fds=True)
+        self._thread = threading.Thread(target=self._watch)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Terminate the log stream and wait for the watcher thread
+        """
+        if self._proc is None:
+            return
+        if self._proc.poll() is None:
+            self._proc.terminate()
+            for _ in range(10):
+                if self._proc.poll() is not None:
+                    break
+                time.sleep(0.1)
+            else:
+                self._proc.kill()
+        self._proc.wait()
+        self._thread.join()
+        self._proc.stdout.close()
+        self._log.debug('Stopped: %s', self.command)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def wait(self, name, timeout=None):
+        """
+        Wait for a line matching a pattern, unless one already matched
+
+        :param name: Name of the pattern
+        :type name: str
+
+        :param timeout: Seconds to wait, forever by default
+        :type timeout: int
+
+        :raises TargetError: if no line matched before the timeout or the end
+                             of the stream
+
+        :returns: the match object of the last line matching the pattern
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while name not in self._matches:
+                if self._error is not None:
+                    raise self._error
+                if self._ended:
+                    raise TargetError('Logcat ended before [{}] matched'\
+                                      .format(name))
+                remaining = None
+                if deadline is not None:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        raise TargetError('Timeout waiting for [{}] in logcat'\
+                                          .format(name))
+                self._cond.wait(remaining)
+            return self._matches[name]
+
+    def wait_idle(self, seconds, max_lines=None):
+        """
+        Wait until no line has been logged for some time
+
+        :param seconds: Seconds without any line logged
+        :type seconds: int
+
+        :param max_lines: Give up waiting once that many lines have been
+                          logged since the start, never by default
+        :type max_lines: int
+
+        :returns: False if the stream gave up or ended before being idle,
+                  True otherwise
+        """
+        while True:
+            with self._cond:
+                if self._ended:
+                    return False
+                if max_lines is not None and self._lines > max_lines:
+                    return False
+                idle = time.time() - self._last_line
+                if idle >= seconds:
+                    return True
+                self._cond.wait(seconds - idle)
+
+    def _watch(self):
+        try:
+            for line in iter(self._proc.stdout.readline, ''):
+                self._lines += 1
+                self._last_line = time.time()
+                match = self._matcher and self._matcher.search(line)
+                if match is None:
+                    continue
+                name = self._groups[match.lastgroup]
+                with self._cond:
+                    self._matches[name] = match
+                    self._cond.notify_all()
+                callback = self._patterns[name][1]
+                if callback:
+                    callback(match)
+        except Exception as e:
+            self._log.error('Watching logcat failed: %s', e)
+            with self._cond:
+                self._error = e
+        finally:
+            with self._cond:
+                self._ended = True
+                self._cond.notify_all()
+
+# vim :set tabstop=4 shiftwidth=4 expandtab
@@ -16,8 +16,8 @@
 #
 
 import logging
+from shell import execute
 from system import System
-from time import sleep
 
 class Screen(object):
     """
@@ -44,24 +44,24 @@ class Screen(object):
             log.info('Set orientation: AUTO')
 
         if acc_mode == 0:
-            target.execute('content insert '\
-                           '--uri content://settings/system '\
-                           '--bind name:s:accelerometer_rotation '\
-                           '--bind value:i:{}'.format(acc_mode))
-            target.execute('content insert '\
-                           '--uri content://settings/system '\
-                           '--bind name:s:user_rotation '\
-                           '--bind value:i:{}'.format(usr_mode))
+            execute(target, 'content insert '\
+                            '--uri content://settings/system '\
+                            '--bind name:s:accelerometer_rotation '\
+                            '--bind value:i:{}'.format(acc_mode))
+            execute(target, 'content insert '\
+                            '--uri content://settings/system '\
+                            '--bind name:s:user_rotation '\
+                            '--bind value:i:{}'.format(usr_mode))
         else:
             # Force PORTRAIT mode when activation AUTO rotation
-            target.execute('content insert '\
-                           '--uri content://settings/system '\
-                           '--bind name:s:user_rotation '\
-                           '--bind value:i:{}'.format(usr_mode))
-            target.execute('content insert '\
-                           '--uri content://settings/system '\
-                           '--bind name:s:accelerometer_rotation '\
-                           '--bind value:i:{}'.format(acc_mode))
+            execute(target, 'content insert '\
+                            '--uri content://settings/system '\
+                            '--bind name:s:user_rotation '\
+                            '--bind value:i:{}'.format(usr_mode))
+            execute(target, 'content insert '\
+                            '--uri content://settings/system '\
+                            '--bind name:s:accelerometer_rotation '\
+                            '--bind value:i:{}'.format(acc_mode))
 
     @staticmethod
     def set_brightness(target, auto=True, percent=None):
@@ -73,20 +73,20 @@ class Screen(object):
         # Force manual brightness if a percent specified
         if percent:
             bri_mode = 0
-        target.execute('content insert '\
-                       '--uri content://settings/system '\
-                       '--bind name:s:screen_brightness_mode '\
-                       '--bind value:i:{}'.format(bri_mode))
+        execute(target, 'content insert '\
+                        '--uri content://settings/system '\
+                        '--bind name:s:screen_brightness_mode '\
+                        '--bind value:i:{}'.format(bri_mode))
         if bri_mode == 0:
             if percent<0 or percent>100:
                 msg = "Screen brightness {} out of range (0,100)"\
                       .format(percent)
                 raise ValueError(msg)
             value = 255 * percent / 100
-            target.execute('content insert '\
-                           '--uri content://settings/system '\
-                           '--bind name:s:screen_brightness '\
-                           '--bind value:i:{}'.format(value))
+            execute(target, 'content insert '\
+                            '--uri content://settings/system '\
+                            '--bind name:s:screen_brightness '\
+                            '--bind value:i:{}'.format(value))
             log.info('Set brightness: %d%%', percent)
         else:
             log.info('Set brightness: AUTO')
@@ -99,10 +99,10 @@ class Screen(object):
         log = logging.getLogger('Screen')
         dim_mode = 1 if auto else 0
         dim_mode_str = 'ON' if auto else 'OFF'
-        target.execute('content insert '\
-                       '--uri content://settings/system '\
-                       '--bind name:s:dim_screen '\
-                       '--bind value:i:{}'.format(dim_mode))
+        execute(target, 'content insert '\
+                        '--uri content://settings/system '\
+                        '--bind name:s:dim_screen '\
+                        '--bind value:i:{}'.format(dim_mode))
         log.info('Dim screen mode: %s', dim_mode_str)
 
     @staticmethod
@@ -115,10 +115,10 @@ class Screen(object):
             msg = "Screen timeout {}: cannot be negative".format(seconds)
             raise ValueError(msg)
         value = seconds * 1000
-        target.execute('content insert '\
-                       '--uri content://settings/system '\
-                       '--bind name:s:screen_off_timeout '\
-                       '--bind value:i:{}'.format(value))
+        execute(target, 'content insert '\
+                        '--uri content://settings/system '\
+                        '--bind name:s:screen_off_timeout '\
+                        '--bind value:i:{}'.format(value))
         log.info('Screen timeout: %d [s]', seconds)
 
     @staticmethod
@@ -137,7 +137,7 @@ class Screen(object):
         """
         Get screen density of the device.
         """
-        return target.execute('getprop ro.sf.lcd_density')
+        return execute(target, 'getprop ro.sf.lcd_density')
 
     @staticmethod
     def set_screen(target, on=True):
@@ -152,7 +152,8 @@ class Screen(object):
     @staticmethod
     def unlock(target):
        Screen.set_screen(target, on=True)
-       sleep(1)
+       # Sleep on the target, so that unlocking can be batched
+       execute(target, 'sleep 1')
        System.menu(target)
        System.home(target)
 
@@ -161,9 +162,9 @@ class Screen(object):
         log = logging.getLogger('Screen')
         if not on:
             log.info('Setting doze always on OFF')
-            target.execute('settings put secure doze_always_on 0')
+            execute(target, 'settings put secure doze_always_on 0')
             return
         log.info('Setting doze always on ON')
-        target.execute('settings put secure doze_always_on 1')
+        execute(target, 'settings put secure doze_always_on 1')
 
 # vim :set tabstop=4 shiftwidth=4 expandtab
@@ -0,0 +1,337 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Persistent shell sessions on Android targets"""
+
+from contextlib import contextmanager
+import logging
+import os
+import select
+import subprocess
+import threading
+import time
+import uuid
+
+from devlib import TargetError
+from devlib.exception import TimeoutError
+from devlib.utils.android import AM_START_ERROR
+from devlib.utils.misc import escape_single_quotes
+
+class ShellSession(object):
+    """
+    Shell kept running to execute commands without spawning a new one each time
+
+    Commands are written to the standard input of the shell, each followed by
+    the echo of a sentinel with its exit code which delimits its output. The
+    sentinel is quoted in the commands so that it is not matched when the
+    shell, e.g. on a terminal, echoes its input. Many
+    commands can be written at once and their outputs read afterwards, so that
+    a sequence of commands costs a single round trip to the target, see
+    :meth:`batch`.
+
+    :param command: Command spawning the shell, e.g. ``['adb', 'shell']``
+    :type command: list(str)
+    """
+
+    def __init__(self, command):
+        self.command = command
+        self._log = logging.getLogger('ShellSession')
+        self._lock = threading.RLock()
+        session_id = uuid.uuid4().hex
+        self._sentinel = 'LISA_SHELL_{}'.format(session_id)
+        self._echo_sentinel = 'echo "\nLISA_""SHELL_{}$?"'.format(session_id)
+        self._buffer = ''
+        self._batch = None
+        self._is_root = None
+
+        self._log.debug('Opening shell: %s', ' '.join(command))
+        self._proc = subprocess.Popen(command, stdin=subprocess.PIPE,
+                                      stdout=subprocess.PIPE,
+                                      stderr=subprocess.STDOUT,
+                                      close_fds=True)
+
+    def alive(self):
+        """
+        Check if the shell is still running
+        """
+        return self._proc.poll() is None
+
+    def close(self):
+        """
+        Terminate the shell
+        """
+        if not self.alive():
+            return
+        try:
+            self._proc.stdin.close()
+        except IOError:
+            pass
+        for _ in range(10):
+            if not self.alive():
+                return
+            time.sleep(0.1)
+        self._proc.kill()
+        self._proc.wait()
+
+    @property
+    def is_root(self):
+        """
+        Whether the shell runs as root, i.e. as_root commands need no su
+        """
+        if self._is_root is None:
+            [(output, _)] = self._run([('id -u', False)])
+            self._is_root = output.strip() == '0'
+        return self._is_root
+
+    def execute(self, command, as_root=False, check_exit_code=True,
+                timeout=None, on_error=None):
+        """
+        Execute a command in the shell
+
+        Within a :meth:`batch` the command is only queued, and None is
+        returned.
+
+        :param command: Command to execute
+        :type command: str
+
+        :param as_root: Execute the command through su if the shell is not
+                        running as root
+        :type as_root: bool
+
+        :param check_exit_code: Raise a TargetError if the command fails
+        :type check_exit_code: bool
+
+        :param timeout: Seconds to wait for the command to complete, forever
+                        by default. The shell is closed on a timeout.
+        :type timeout: int
+
+        :param on_error: Called with the TargetError of a failed command
+                         instead of raising it
+        :type on_error: callable
+
+        :returns: the output of the command
+        """
+        with self._lock:
+            if self._batch is not None:
+                self._batch.append((command, as_root, check_exit_code,
+                                    on_error))
+                return None
+            [output] = self._execute([(command, as_root, check_exit_code,
+                                       on_error)], timeout)
+            return output
+
+    @contextmanager
+    def batch(self, timeout=None):
+        """
+        Execute all the commands issued in a with block in a single round trip
+
+        The commands are sent when the block exits, and their errors are
+        raised then. Nested batches are sent with the outermost one. The
+        commands queued by a block raising an exception are not sent.
+
+        :param timeout: Seconds to wait for all the commands to complete
+        :type timeout: int
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield
+                return
+            self._batch = []
+            try:
+                yield
+                commands = self._batch
+            finally:
+                self._batch = None
+            if commands:
+                self._execute(commands, timeout)
+
+    def _execute(self, commands, timeout):
+        results = self._run([(command, as_root)
+                             for command, as_root, _, _ in commands],
+                            timeout)
+
+        # All the outputs are read before raising, to keep the shell in sync
+        outputs = []
+        for (command, _, check_exit_code, on_error), (output, exit_code) \
+                in zip(commands, results):
+            outputs.append(output)
+            if not check_exit_code:
+                continue
+            if exit_code != '0':
+                message = ('Got exit code {}\nfrom target command: {}\n'
+                           'OUTPUT: {}').format(exit_code, command, output)
+            elif AM_START_ERROR.findall(output):
+                message = 'Could not start activity; got the following:\n{}'\
+                          .format(AM_START_ERROR.findall(output)[0])
+            else:
+                continue
+            if on_error is None:
+                raise TargetError(message)
+            on_error(TargetError(message))
+        return outputs
+
+    def _run(self, commands, timeout=None):
+        """
+        Write all the commands at once, then read their outputs and exit codes
+        """
+        if any(as_root for _, as_root in commands) and not self.is_root:
+            commands = [("echo '{}' | su".format(escape_single_quotes(command))
+                         if as_root else command, as_root)
+                        for command, as_root in commands]
+
+        script = ''.join('({}) </dev/null; {}\n'.format(
+            command, self._echo_sentinel) for command, _ in commands)
+        for command, _ in commands:
+            self._log.debug('shell %s', command)
+        try:
+            self._proc.stdin.write(script)
+            self._proc.stdin.flush()
+        except IOError as e:
+            raise TargetError('Shell [{}] terminated: {}'.format(
+                ' '.join(self.command), e))
+
+        deadline = time.time() + timeout if timeout else None
+        return [self._read_result(command, deadline)
+                for command, _ in commands]
+
+    def _read_result(self, command, deadline):
+        end = '\n' + self._sentinel
+        while True:
+            idx = self._buffer.find(end)
+            eol = self._buffer.find('\n', idx + len(end)) if idx >= 0 else -1
+            if eol >= 0:
+                break
+            self._buffer += self._read(command, deadline)
+
+        output = self._buffer[:idx]
+        if output.endswith('\r'):
+            output = output[:-1]
+        exit_code = self._buffer[idx + len(end):eol].strip()
+        self._buffer = self._buffer[eol + 1:]
+        return output.replace('\r\n', '\n'), exit_code
+
+    def _read(self, command, deadline):
+        fd = self._proc.stdout.fileno()
+        wait = None if deadline is None else max(0, deadline - time.time())
+        ready, _, _ = select.select([fd], [], [], wait)
+        if not ready:
+            # The shell is out of sync with the commands sent
+            output = self._buffer
+            self._buffer = ''
+            self.close()
+            raise TimeoutError(command, output)
+        data = os.read(fd, 4096)
+        if not data:
+            raise TargetError('Shell [{}] terminated'.format(
+                ' '.join(self.command)))
+        return data
+
+# Shell sessions of the targets, see shell_session
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+def open_session(target, command=None):
+    """
+    Open the persistent shell session of a target, closing any previous one
+
+    :param target: instance of devlib Android target
+    :type target: devlib.target.AndroidTarget
+
+    :param command: Command spawning the shell, ``adb shell`` on the target's
+                    device by default
+    :type command: list(str)
+    """
+    if command is None:
+        command = ['adb']
+        if target.adb_name:
+            command += ['-s', target.adb_name]
+        command += ['shell']
+
+    with _sessions_lock:
+        session = _sessions.pop(target, None)
+        if session:
+            session.close()
+        session = ShellSession(command)
+        _sessions[target] = session
+    return session
+
+def shell_session(target):
+    """
+    Get the persistent shell session of a target, opened on first use
+
+    :param target: instance of devlib Android target
+    :type target: devlib.target.AndroidTarget
+    """
+    with _sessions_lock:
+        session = _sessions.get(target)
+        if session is not None and session.alive():
+            return session
+        command = session.command if session else None
+    return open_session(target, command)
+
+def close_sessions():
+    """
+    Close the shell sessions of all the targets
+    """
+    with _sessions_lock:
+        for session in _sessions.itervalues():
+            session.close()
+        _sessions.clear()
+
+def _has_session(target):
+    return target in _sessions or hasattr(target, 'adb_name')
+
+def execute(target, command, as_root=False, check_exit_code=True,
+            timeout=None, on_error=None):
+    """
+    Execute a command in the shell session of a target
+
+    Targets not connected via adb execute the command as usual.
+
+    :param target: instance of devlib Android target
+    :type target: devlib.target.AndroidTarget
+
+    See :meth:`ShellSession.execute` for the other parameters.
+    """
+    if _has_session(target):
+        return shell_session(target).execute(
+            command, as_root=as_root, check_exit_code=check_exit_code,
+            timeout=timeout, on_error=on_error)
+    try:
+        return target.execute(command, as_root=as_root, timeout=timeout,
+                              check_exit_code=check_exit_code)
+    except TargetError as e:
+        if on_error is None:
+            raise
+        on_error(e)
+
+@contextmanager
+def batch(target, timeout=None):
+    """
+    Execute the commands issued on a target in a with block in a single round
+    trip, see :meth:`ShellSession.batch`
+
+    :param target: instance of devlib Android target
+    :type target: devlib.target.AndroidTarget
+    """
+    if not _has_session(target):
+        yield
+        return
+    with shell_session(target).batch(timeout):
+        yield
+
+# vim :set tabstop=4 shiftwidth=4 expandtab
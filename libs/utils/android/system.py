@@ -18,17 +18,40 @@
 import logging
 
 from devlib.utils.android import adb_command
-from devlib import TargetError
 import os
 import pexpect as pe
 
+import shell
+from shell import execute
+
 GET_FRAMESTATS_CMD = 'shell dumpsys gfxinfo {} > {}'
 
+TRACING_ON = '/d/tracing/tracing_on'
+
 class System(object):
     """
     Collection of Android related services
     """
 
+    @staticmethod
+    def batch(target, timeout=None):
+        """
+        Execute the commands of the helpers called in a with block in a single
+        round trip to the target
+
+        The commands run in the persistent shell of the target, see
+        :class:`ShellSession`. They are sent when the block exits, and their
+        errors are raised then; the helpers called in the block return None
+        instead of their output.
+
+        :param target: instance of devlib Android target
+        :type target: devlib.target.AndroidTarget
+
+        :param timeout: seconds to wait for all the commands to complete
+        :type timeout: int
+        """
+        return shell.batch(target, timeout)
+
     @staticmethod
     def systrace_start(target, trace_file, time=None,
                        events=['gfx', 'view', 'sched', 'freq', 'idle'],
@@ -38,7 +61,7 @@ class System(object):
 
         # Android needs good TGID caching support, until atrace has it,
         # just increase the cache size to avoid missing TGIDs (and also comms)
-        target.target.execute("echo 8192 > /sys/kernel/debug/tracing/saved_cmdlines_size")
+        execute(target.target, "echo 8192 > /sys/kernel/debug/tracing/saved_cmdlines_size")
 
         # Override systrace defaults from target conf
         if conf and ('systrace' in conf):
@@ -51,14 +74,14 @@ class System(object):
             if 'extra_events' in conf['systrace']:
                 for ev in conf['systrace']['extra_events']:
                     log.info("systrace_start: Enabling extra ftrace event {}".format(ev))
-                    ev_file = target.target.execute("ls /sys/kernel/debug/tracing/events/*/{}/enable".format(ev))
+                    ev_file = execute(target.target, "ls /sys/kernel/debug/tracing/events/*/{}/enable".format(ev))
                     cmd = "echo 1 > {}".format(ev_file)
-                    target.target.execute(cmd, as_root=True)
+                    execute(target.target, cmd, as_root=True)
             if 'event_triggers' in conf['systrace']:
                 for ev in conf['systrace']['event_triggers'].keys():
-                    tr_file = target.target.execute("ls /sys/kernel/debug/tracing/events/*/{}/trigger".format(ev))
+                    tr_file = execute(target.target, "ls /sys/kernel/debug/tracing/events/*/{}/trigger".format(ev))
                     cmd = "echo {} > {}".format(conf['systrace']['event_triggers'][ev], tr_file)
-                    target.target.execute(cmd, as_root=True, check_exit_code=False)
+                    execute(target.target, cmd, as_root=True, check_exit_code=False)
 
         # Check which systrace binary is available under CATAPULT_HOME
         for systrace in ['systrace.py', 'run_systrace.py']:
@@ -90,6 +113,26 @@ class System(object):
     def systrace_wait(target, systrace_output):
         systrace_output.wait()
 
+    @staticmethod
+    def wait_tracing_on(target, timeout=None):
+        """
+        Wait for tracing to be enabled, e.g. by systrace starting
+
+        The tracing state is polled on the target, so waiting costs a single
+        round trip.
+
+        :param target: instance of devlib Android target
+        :type target: devlib.target.AndroidTarget
+
+        :param timeout: seconds to wait, forever by default
+        :type timeout: int
+
+        :raises TargetError: if the tracing state cannot be read
+        """
+        execute(target, '[ -r {0} ] || exit 1; '
+                        'while [ "$(cat {0})" != 1 ]; do sleep 0.1; done'\
+                        .format(TRACING_ON), timeout=timeout)
+
     @staticmethod
     def set_airplane_mode(target, on=True):
         """
@@ -98,27 +141,29 @@ class System(object):
         ap_mode = 1 if on else 0
         ap_state = 'true' if on else 'false'
 
-        try:
-            target.execute('settings put global airplane_mode_on {}'\
-                           .format(ap_mode), as_root=True)
-            target.execute('am broadcast '\
-                           '-a android.intent.action.AIRPLANE_MODE '\
-                           '--ez state {}'\
-                           .format(ap_state), as_root=True)
-        except TargetError:
+        def warn(error):
             log = logging.getLogger('System')
             log.warning('Failed to toggle airplane mode, permission denied.')
 
+        execute(target, 'settings put global airplane_mode_on {} && '\
+                        'am broadcast '\
+                        '-a android.intent.action.AIRPLANE_MODE '\
+                        '--ez state {}'\
+                        .format(ap_mode, ap_state),
+                as_root=True, on_error=warn)
+
     @staticmethod
     def _set_svc(target, cmd, on=True):
         mode = 'enable' if on else 'disable'
-        try:
-            target.execute('svc {} {}'.format(cmd, mode), as_root=True)
-        except TargetError:
+
+        def warn(error):
             log = logging.getLogger('System')
             log.warning('Failed to toggle {} mode, permission denied.'\
                         .format(cmd))
 
+        execute(target, 'svc {} {}'.format(cmd, mode), as_root=True,
+                on_error=warn)
+
     @staticmethod
     def set_mobile_data(target, on=True):
         """
@@ -148,8 +193,8 @@ class System(object):
         :param apk_name: name of the apk
         :type apk_name: str
         """
-        target.execute('monkey -p {} -c android.intent.category.LAUNCHER 1'\
-                      .format(apk_name))
+        execute(target, 'monkey -p {} -c android.intent.category.LAUNCHER 1'\
+                       .format(apk_name))
 
     @staticmethod
     def start_activity(target, apk_name, activity_name):
@@ -162,7 +207,7 @@ class System(object):
         :param activity_name: name of the activity to launch
         :type activity_name: str
         """
-        target.execute('am start -n {}/{}'.format(apk_name, activity_name))
+        execute(target, 'am start -n {}/{}'.format(apk_name, activity_name))
 
     @staticmethod
     def start_action(target, action, action_args=''):
@@ -175,7 +220,7 @@ class System(object):
         :param action_args: arguments for the activity
         :type action_args: str
         """
-        target.execute('am start -a {} {}'.format(action, action_args))
+        execute(target, 'am start -a {} {}'.format(action, action_args))
 
     @staticmethod
     def screen_always_on(target, enable=True):
@@ -190,7 +235,7 @@ class System(object):
 
         log = logging.getLogger('System')
         log.info('Setting screen always on to {}'.format(param))
-        target.execute('svc power stayon {}'.format(param))
+        execute(target, 'svc power stayon {}'.format(param))
 
     @staticmethod
     def force_stop(target, apk_name, clear=False):
@@ -206,9 +251,9 @@ class System(object):
         :param clear: clear application data
         :type clear: bool
         """
-        target.execute('am force-stop {}'.format(apk_name))
+        execute(target, 'am force-stop {}'.format(apk_name))
         if clear:
-            target.execute('pm clear {}'.format(apk_name))
+            execute(target, 'pm clear {}'.format(apk_name))
 
     @staticmethod
     def tap(target, x, y, absolute=False):
@@ -233,7 +278,7 @@ class System(object):
             x = w * x / 100
             y = h * y / 100
 
-        target.execute('input tap {} {}'.format(x, y))
+        execute(target, 'input tap {} {}'.format(x, y))
 
     @staticmethod
     def vswipe(target, y_low_pct, y_top_pct, duration='', swipe_up=True):
@@ -264,8 +309,8 @@ class System(object):
             y1 = h * y_low_pct / 100
             y2 = h * y_top_pct / 100
 
-        target.execute('input swipe {} {} {} {} {}'\
-                       .format(x, y1, x, y2, duration))
+        execute(target, 'input swipe {} {} {} {} {}'\
+                        .format(x, y1, x, y2, duration))
 
     @staticmethod
     def hswipe(target, x_left_pct, x_right_pct, duration='', swipe_right=True):
@@ -295,8 +340,8 @@ class System(object):
         else:
             x1 = w * x_right_pct / 100
             x2 = w * x_left_pct / 100
-        target.execute('input swipe {} {} {} {} {}'\
-                       .format(x1, y, x2, y, duration))
+        execute(target, 'input swipe {} {} {} {} {}'\
+                        .format(x1, y, x2, y, duration))
 
     @staticmethod
     def menu(target):
@@ -306,7 +351,7 @@ class System(object):
         :param target: instance of devlib Android target
         :type target: devlib.target.AndroidTarget
         """
-        target.execute('input keyevent KEYCODE_MENU')
+        execute(target, 'input keyevent KEYCODE_MENU')
 
     @staticmethod
     def home(target):
@@ -316,7 +361,7 @@ class System(object):
         :param target: instance of devlib Android target
         :type target: devlib.target.AndroidTarget
         """
-        target.execute('input keyevent KEYCODE_HOME')
+        execute(target, 'input keyevent KEYCODE_HOME')
 
     @staticmethod
     def back(target):
@@ -326,7 +371,7 @@ class System(object):
         :param target: instance of devlib Android target
         :type target: devlib.target.AndroidTarget
         """
-        target.execute('input keyevent KEYCODE_BACK')
+        execute(target, 'input keyevent KEYCODE_BACK')
 
     @staticmethod
     def wakeup(target):
@@ -336,7 +381,7 @@ class System(object):
         :param target: instance of devlib Android target
         :type target: devlib.target.AndroidTarget
         """
-        target.execute('input keyevent KEYCODE_WAKEUP')
+        execute(target, 'input keyevent KEYCODE_WAKEUP')
 
     @staticmethod
     def sleep(target):
@@ -346,7 +391,7 @@ class System(object):
         :param target: instance of devlib Android target
         :type target: devlib.target.AndroidTarget
         """
-        target.execute('input keyevent KEYCODE_SLEEP')
+        execute(target, 'input keyevent KEYCODE_SLEEP')
 
     @staticmethod
     def volume(target, times=1, direction='down'):
@@ -364,9 +409,9 @@ class System(object):
         """
         for i in range(times):
             if direction == 'up':
-                target.execute('input keyevent KEYCODE_VOLUME_UP')
+                execute(target, 'input keyevent KEYCODE_VOLUME_UP')
             elif direction == 'down':
-                target.execute('input keyevent KEYCODE_VOLUME_DOWN')
+                execute(target, 'input keyevent KEYCODE_VOLUME_DOWN')
 
     @staticmethod
     def wakelock(target, name='lisa', take=False):
@@ -383,7 +428,7 @@ class System(object):
         :type take: bool
         """
         path = '/sys/power/wake_lock' if take else '/sys/power/wake_unlock'
-        target.execute('echo {} > {}'.format(name, path))
+        execute(target, 'echo {} > {}'.format(name, path))
 
     @staticmethod
     def gfxinfo_reset(target, apk_name):
@@ -396,7 +441,7 @@ class System(object):
         :param apk_name: name of the apk
         :type apk_name: str
         """
-        target.execute('dumpsys gfxinfo {} reset'.format(apk_name))
+        execute(target, 'dumpsys gfxinfo {} reset'.format(apk_name))
 
     @staticmethod
     def surfaceflinger_reset(target, apk_name):
@@ -409,7 +454,7 @@ class System(object):
         :param apk_name: name of the apk
         :type apk_name: str
         """
-        target.execute('dumpsys SurfaceFlinger {} reset'.format(apk_name))
+        execute(target, 'dumpsys SurfaceFlinger {} reset'.format(apk_name))
 
     @staticmethod
     def logcat_reset(target):
@@ -419,7 +464,7 @@ class System(object):
         :param target: instance of devlib Android target
         :type target: devlib.target.AndroidTarget
         """
-        target.execute('logcat -c')
+        execute(target, 'logcat -c')
 
     @staticmethod
     def gfxinfo_get(target, apk_name, out_file):
@@ -492,7 +537,7 @@ class System(object):
         :param event_count: number of events to generate
         :type event_count: int
         """
-        target.execute('monkey -p {} {}'.format(apk_name, event_count))
+        execute(target, 'monkey -p {} {}'.format(apk_name, event_count))
 
     @staticmethod
     def list_packages(target, apk_filter=''):
@@ -507,8 +552,8 @@ class System(object):
         """
         packages = []
 
-        pkgs = target.execute('cmd package list packages {}'\
-                              .format(apk_filter.lower()))
+        pkgs = execute(target, 'cmd package list packages {}'\
+                               .format(apk_filter.lower()))
         for pkg in pkgs.splitlines():
             packages.append(pkg.replace('package:', ''))
         packages.sort()
@@ -530,12 +575,12 @@ class System(object):
         """
         packages = {}
 
-        pkgs = target.execute('cmd package list packages {}'\
-                              .format(apk_filter.lower()))
+        pkgs = execute(target, 'cmd package list packages {}'\
+                               .format(apk_filter.lower()))
         for pkg in pkgs.splitlines():
             pkg = pkg.replace('package:', '')
             # Lookup for additional APK information
-            apk = target.execute('pm path {}'.format(pkg))
+            apk = execute(target, 'pm path {}'.format(pkg))
             apk = apk.replace('package:', '')
             packages[pkg] = {
                 'apk' : apk.strip()
@@ -19,9 +19,9 @@ import logging
 import os
 import re
 import webbrowser
-import time
 
 from gfxinfo import GfxInfo
+from logcat import LogcatWatcher
 from surfaceflinger import SurfaceFlinger
 
 from . import System
@@ -122,11 +122,7 @@ class Workload(object):
 
     def post_collect_start_cgroup(self):
         # Since systrace starts asynchronously, wait for trace to start
-        while True:
-            if self._te.target.execute('cat /d/tracing/tracing_on')[0] == "0":
-                time.sleep(0.1)
-                continue
-            break
+        System.wait_tracing_on(self._te.target)
 
         self.trace_cgroup('schedtune', '')           # root
         self.trace_cgroup('schedtune', 'top-app')
@@ -140,6 +136,21 @@ class Workload(object):
         self.trace_cgroup('cpuset', 'background')
         self.trace_cgroup('cpuset', 'system-background')
 
+    def _logcat(self, filterspecs):
+        """
+        Get a watcher of the target logcat
+
+        :param filterspecs: logcat filter specifications, e.g.
+                            ``'ActivityManager:* *:S'``
+        :type filterspecs: str
+
+        :returns: a :class:`LogcatWatcher`, to be started with the patterns
+                  to watch
+        """
+        logcat_cmd = self._adb('logcat {}'.format(filterspecs))
+        self._log.info('%s', logcat_cmd)
+        return LogcatWatcher(logcat_cmd)
+
     def add_hook(self, hook, hook_fn):
         allowed = ['post_collect_start']
         if hook not in allowed:
@@ -182,11 +193,7 @@ class Workload(object):
                 self._te, self.trace_file, self._trace_time, conf=self._te.conf)
             if 'energy' in self.collect:
                 # Wait for systrace to start before cutting off USB
-                while True:
-                    if self._target.execute('cat /d/tracing/tracing_on')[0] == "0":
-                        time.sleep(0.1)
-                        continue
-                    break
+                System.wait_tracing_on(self._target)
         # Initialize energy meter results
         if 'energy' in self.collect and self._te.emeter:
             self._te.emeter.reset()
@@ -20,7 +20,6 @@ import os
 import logging
 from time import sleep
 
-from subprocess import Popen, PIPE
 
 from android import Screen, Workload, System
 
@@ -94,44 +93,35 @@ class Geekbench(Workload):
         sleep(2)
 
         # Parse logcat output lines to find beginning and end
-        logcat_cmd = self._adb(
-                'logcat ActivityManager:* System.out:I *:S GEEKBENCH_RESULT:*'\
-                .format(self._target.adb_name))
-        self._log.info("%s", logcat_cmd)
-        logcat = Popen(logcat_cmd, shell=True, stdout=PIPE)
-
-        # Click to accept the EULA
-        System.tap(self._target, 73, 55)
-        sleep(1)
-
-        # The main window opened will have the CPU benchmark
-        # Swipe to get the COMPUTE one
-        if test_name.upper() == 'COMPUTE':
-            System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
-
-        # Press the 'RUN <test_name> BENCHMARK' button
-        System.tap(self._target, 73, 72)
-
-        while True:
-
-            # read next logcat line (up to max 1024 chars)
-            message = logcat.stdout.readline(1024)
+        logcat = self._logcat(
+                'ActivityManager:* System.out:I *:S GEEKBENCH_RESULT:*')
+        logcat.on('start', GEEKBENCH_BENCHMARK_START_RE)
+        logcat.on('end', GEEKBENCH_BENCHMARK_END_RE)
+        with logcat:
+            # Click to accept the EULA
+            System.tap(self._target, 73, 55)
+            sleep(1)
+
+            # The main window opened will have the CPU benchmark
+            # Swipe to get the COMPUTE one
+            if test_name.upper() == 'COMPUTE':
+                System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
+
+            # Press the 'RUN <test_name> BENCHMARK' button
+            System.tap(self._target, 73, 72)
 
             # Benchmark start trigger
-            match = GEEKBENCH_BENCHMARK_START_RE.search(message)
-            if match:
-                # Start tracing
-                self.tracingStart()
-                self._log.debug("Benchmark started!")
+            logcat.wait('start')
+            # Start tracing
+            self.tracingStart()
+            self._log.debug("Benchmark started!")
 
             # Benchmark end trigger
-            match = GEEKBENCH_BENCHMARK_END_RE.search(message)
-            if match:
-                # Stop tracing
-                self.tracingStop()
-                remote_result_file = match.group('results_file')
-                self._log.debug("Benchmark finished! Results are in {}".format(remote_result_file))
-                break
+            match = logcat.wait('end')
+            # Stop tracing
+            self.tracingStop()
+            remote_result_file = match.group('results_file')
+            self._log.debug("Benchmark finished! Results are in {}".format(remote_result_file))
 
         # Get Geekbench Results file
         target_result_file = self._target.path.basename(remote_result_file)
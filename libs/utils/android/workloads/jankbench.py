@@ -19,7 +19,6 @@ import re
 import os
 import logging
 
-from subprocess import Popen, PIPE
 from time import sleep
 
 from android import Screen, System, Workload
@@ -115,20 +114,22 @@ class Jankbench(Workload):
         except KeyError:
             raise ValueError('Jankbench test [%s] not supported', test_name)
 
-        # Unlock device screen (assume no password required)
-        Screen.unlock(self._target)
+        # Setup the device in a single round trip
+        with System.batch(self._target):
+            # Unlock device screen (assume no password required)
+            Screen.unlock(self._target)
 
-        # Close and clear application
-        System.force_stop(self._target, self.package, clear=True)
+            # Close and clear application
+            System.force_stop(self._target, self.package, clear=True)
 
-        # Set airplane mode
-        System.set_airplane_mode(self._target, on=True)
+            # Set airplane mode
+            System.set_airplane_mode(self._target, on=True)
 
-        # Set min brightness
-        Screen.set_brightness(self._target, auto=False, percent=0)
+            # Set min brightness
+            Screen.set_brightness(self._target, auto=False, percent=0)
 
-        # Force screen in PORTRAIT mode
-        Screen.set_orientation(self._target, portrait=True)
+            # Force screen in PORTRAIT mode
+            Screen.set_orientation(self._target, portrait=True)
 
         # Clear logcat
         self._target.clear_logcat()
@@ -159,44 +160,35 @@ class Jankbench(Workload):
             self.tracingStop()
         else:
             # Parse logcat output lines
-            logcat_cmd = self._adb(
-                    'logcat ActivityManager:* System.out:I *:S BENCH:*'\
-                    .format(self._target.adb_name))
-            self._log.info(logcat_cmd)
-            logcat = Popen(logcat_cmd, shell=True, stdout=PIPE)
+            def log_iteration(match):
+                self._log.debug('Iteration: %2d',
+                                int(match.group('iteration'))+1)
+
+            def log_metrics(match):
+                self._log.info('   Mean: %7.3f JankP: %7.3f StdDev: %7.3f Count Bad: %4d Count Jank: %4d',
+                               float(match.group('mean')),
+                               float(match.group('junk_p')),
+                               float(match.group('std_dev')),
+                               int(match.group('count_bad')),
+                               int(match.group('count_junk')))
+
+            logcat = self._logcat('ActivityManager:* System.out:I *:S BENCH:*')
+            logcat.on('start', JANKBENCH_BENCHMARK_START_RE)
+            logcat.on('done', JANKBENCH_BENCHMARK_DONE_RE)
+            logcat.on('iteration', JANKBENCH_ITERATION_COUNT_RE,
+                      log_iteration)
+            logcat.on('metrics', JANKBENCH_ITERATION_METRICS_RE, log_metrics)
             self._log.debug('Iterations:')
-            while True:
-
-                # read next logcat line (up to max 1024 chars)
-                message = logcat.stdout.readline(1024)
-
+            with logcat:
                 # Benchmark start trigger
-                match = JANKBENCH_BENCHMARK_START_RE.search(message)
-                if match:
-                    self.tracingStart()
-                    self._log.debug('Benchmark started!')
+                logcat.wait('start')
+                self.tracingStart()
+                self._log.debug('Benchmark started!')
 
                 # Benchmark completed trigger
-                match = JANKBENCH_BENCHMARK_DONE_RE.search(message)
-                if match:
-                    self._log.debug('Benchmark done!')
-                    self.tracingStop()
-                    break
-
-                # Iteration completed
-                match = JANKBENCH_ITERATION_COUNT_RE.search(message)
-                if match:
-                    self._log.debug('Iteration: %2d',
-                                    int(match.group('iteration'))+1)
-                # Iteration metrics
-                match = JANKBENCH_ITERATION_METRICS_RE.search(message)
-                if match:
-                    self._log.info('   Mean: %7.3f JankP: %7.3f StdDev: %7.3f Count Bad: %4d Count Jank: %4d',
-                                   float(match.group('mean')),
-                                   float(match.group('junk_p')),
-                                   float(match.group('std_dev')),
-                                   int(match.group('count_bad')),
-                                   int(match.group('count_junk')))
+                logcat.wait('done')
+                self._log.debug('Benchmark done!')
+                self.tracingStop()
 
         # Wait until the database file is available
         db_adb = JANKBENCH_DB_PATH + JANKBENCH_DB_NAME
@@ -207,20 +199,22 @@ class Jankbench(Workload):
         self.db_file = os.path.join(out_dir, JANKBENCH_DB_NAME)
         self._target.pull(db_adb, self.db_file)
 
-        # Stop the benchmark app
-        System.force_stop(self._target, self.package, clear=True)
+        # Restore the device in a single round trip
+        with System.batch(self._target):
+            # Stop the benchmark app
+            System.force_stop(self._target, self.package, clear=True)
 
-        # Go back to home screen
-        System.home(self._target)
+            # Go back to home screen
+            System.home(self._target)
 
-        # Reset initial setup
-        # Set orientation back to auto
-        Screen.set_orientation(self._target, auto=True)
+            # Reset initial setup
+            # Set orientation back to auto
+            Screen.set_orientation(self._target, auto=True)
 
-        # Turn off airplane mode
-        System.set_airplane_mode(self._target, on=False)
+            # Turn off airplane mode
+            System.set_airplane_mode(self._target, on=False)
 
-        # Set brightness back to auto
-        Screen.set_brightness(self._target, auto=True)
+            # Set brightness back to auto
+            Screen.set_brightness(self._target, auto=True)
 
 # vim :set tabstop=4 shiftwidth=4 expandtab
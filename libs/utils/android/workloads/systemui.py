@@ -19,7 +19,6 @@ import re
 import os
 import logging
 
-from subprocess import Popen, PIPE
 from time import sleep
 
 from android import Screen, System, Workload
@@ -126,31 +125,23 @@ class SystemUi(Workload):
         self._log.debug("FINISH string [%s]", finish_logline)
 
         # Parse logcat output lines
-        logcat_cmd = self._adb(
-                'logcat TestRunner:* System.out:I *:S BENCH:*'\
-                .format(self._target.adb_name))
-        self._log.info("%s", logcat_cmd)
+        logcat = self._logcat('TestRunner:* System.out:I *:S BENCH:*')
+        logcat.on('start', SYSTEMUI_BENCHMARK_START_RE)
+        logcat.on('finish', SYSTEMUI_BENCHMARK_FINISH_RE)
 
         command = "nohup am instrument -e iterations {} -e class {}{} -w {}".format(
             iterations, self.test_package, activity, self.test_package)
         self._target.background(command)
 
-        logcat = Popen(logcat_cmd, shell=True, stdout=PIPE)
-        while True:
-            # read next logcat line (up to max 1024 chars)
-            message = logcat.stdout.readline(1024)
-
+        with logcat:
             # Benchmark start trigger
-            match = SYSTEMUI_BENCHMARK_START_RE.search(message)
-            if match:
-                self.tracingStart()
-                self._log.debug("Benchmark started!")
-
-            match = SYSTEMUI_BENCHMARK_FINISH_RE.search(message)
-            if match:
-                self.tracingStop()
-                self._log.debug("Benchmark finished!")
-                break
+            logcat.wait('start')
+            self.tracingStart()
+            self._log.debug("Benchmark started!")
+
+            logcat.wait('finish')
+            self.tracingStop()
+            self._log.debug("Benchmark finished!")
 
         sleep(5)
 
@@ -19,7 +19,6 @@ import re
 import os
 import logging
 
-from subprocess import Popen, PIPE
 from time import sleep
 
 from android import Screen, System, Workload
@@ -97,27 +96,29 @@ class UiBench(Workload):
         self.out_dir = out_dir
         self.collect = collect
 
-        # Unlock device screen (assume no password required)
-        Screen.unlock(self._target)
+        # Setup the device in a single round trip
+        with System.batch(self._target):
+            # Unlock device screen (assume no password required)
+            Screen.unlock(self._target)
 
-        # Close and clear application
-        System.force_stop(self._target, self.package, clear=True)
+            # Close and clear application
+            System.force_stop(self._target, self.package, clear=True)
 
-        # Set airplane mode
-        System.set_airplane_mode(self._target, on=True)
+            # Set airplane mode
+            System.set_airplane_mode(self._target, on=True)
 
-        # Set min brightness
-        Screen.set_brightness(self._target, auto=False, percent=0)
+            # Set min brightness
+            Screen.set_brightness(self._target, auto=False, percent=0)
 
-        # Start the main view of the app which must be running
-        # to reset the frame statistics.
-        System.monkey(self._target, self.package)
+            # Start the main view of the app which must be running
+            # to reset the frame statistics.
+            System.monkey(self._target, self.package)
 
-        # Force screen in PORTRAIT mode
-        Screen.set_orientation(self._target, portrait=True)
+            # Force screen in PORTRAIT mode
+            Screen.set_orientation(self._target, portrait=True)
 
-        # Reset frame statistics
-        System.gfxinfo_reset(self._target, self.package)
+            # Reset frame statistics
+            System.gfxinfo_reset(self._target, self.package)
         sleep(1)
 
         # Clear logcat
@@ -128,29 +129,19 @@ class UiBench(Workload):
         UIBENCH_BENCHMARK_START_RE = re.compile(start_logline)
         self._log.debug("START string [%s]", start_logline)
 
-        # Parse logcat output lines
-        logcat_cmd = self._adb(
-                'logcat TestRunner:* System.out:I *:S BENCH:*'\
-                .format(self._target.adb_name))
-        self._log.info("%s", logcat_cmd)
-
         # Run benchmark with a lot of iterations to avoid finishing before duration_s elapses
         command = "nohup am instrument -e iterations 1000000 -e class {}{} -w {}".format(
             self.test_package, activity, self.test_package)
         self._target.background(command)
 
-        logcat = Popen(logcat_cmd, shell=True, stdout=PIPE)
-        while True:
-
-            # read next logcat line (up to max 1024 chars)
-            message = logcat.stdout.readline(1024)
-
+        # Parse logcat output lines
+        logcat = self._logcat('TestRunner:* System.out:I *:S BENCH:*')
+        logcat.on('start', UIBENCH_BENCHMARK_START_RE)
+        with logcat:
             # Benchmark start trigger
-            match = UIBENCH_BENCHMARK_START_RE.search(message)
-            if match:
-                self.tracingStart()
-                self._log.debug("Benchmark started!")
-                break
+            logcat.wait('start')
+            self.tracingStart()
+            self._log.debug("Benchmark started!")
 
         # Run the workload for the required time
         self._log.info('Benchmark [%s] started, waiting %d [s]',
@@ -164,15 +155,17 @@ class UiBench(Workload):
         self.db_file = os.path.join(out_dir, "framestats.txt")
         System.gfxinfo_get(self._target, self.package, self.db_file)
 
-        # Close and clear application
-        System.force_stop(self._target, self.package, clear=True)
+        # Restore the device in a single round trip
+        with System.batch(self._target):
+            # Close and clear application
+            System.force_stop(self._target, self.package, clear=True)
 
-        # Go back to home screen
-        System.home(self._target)
+            # Go back to home screen
+            System.home(self._target)
 
-        # Switch back to original settings
-        Screen.set_orientation(self._target, auto=True)
-        System.set_airplane_mode(self._target, on=False)
-        Screen.set_brightness(self._target, auto=True)
+            # Switch back to original settings
+            Screen.set_orientation(self._target, auto=True)
+            System.set_airplane_mode(self._target, on=False)
+            Screen.set_brightness(self._target, auto=True)
 
 # vim :set tabstop=4 shiftwidth=4 expandtab
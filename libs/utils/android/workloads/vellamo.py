@@ -22,7 +22,6 @@ import copy
 import logging
 from time import sleep
 
-from subprocess import Popen, PIPE
 
 from android import Screen, System, Workload
 
@@ -117,49 +116,40 @@ class Vellamo(Workload):
         self._log.debug("END string [%s]", end_logline)
 
         # Parse logcat output lines
-        logcat_cmd = self._adb(
-                'logcat ActivityManager:* System.out:I *:S BENCH:*'\
-                .format(self._target.adb_name))
-        self._log.info("%s", logcat_cmd)
+        logcat = self._logcat('ActivityManager:* System.out:I *:S BENCH:*')
+        logcat.on('start', VELLAMO_BENCHMARK_START_RE)
+        logcat.on('end', VELLAMO_BENCHMARK_END_RE)
 
         # Start the activity
         System.start_activity(self._target, self.package, self.activity)
-        logcat = Popen(logcat_cmd, shell=True, stdout=PIPE)
-        sleep(2)
-        # Accept EULA
-        System.tap(self._target, 80, 86)
-        sleep(1)
-        # Click Let's Roll
-        System.tap(self._target, 50, 67)
-        sleep(1)
-        # Skip Arrow
-        System.tap(self._target, 46, 78)
-        # Run Workload
-        System.tap(self._target, test_x, test_y)
-        # Skip instructions
-        System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
-        System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
-        System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
-        self._log.info("Vellamo - {} started!".format(test_name.upper()))
-
-        while True:
-
-            # read next logcat line (up to max 1024 chars)
-            message = logcat.stdout.readline(1024)
+        with logcat:
+            sleep(2)
+            # Accept EULA
+            System.tap(self._target, 80, 86)
+            sleep(1)
+            # Click Let's Roll
+            System.tap(self._target, 50, 67)
+            sleep(1)
+            # Skip Arrow
+            System.tap(self._target, 46, 78)
+            # Run Workload
+            System.tap(self._target, test_x, test_y)
+            # Skip instructions
+            System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
+            System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
+            System.hswipe(self._target, 10, 80, duration=100, swipe_right=False)
+            self._log.info("Vellamo - {} started!".format(test_name.upper()))
 
             # Benchmark start trigger
-            if VELLAMO_BENCHMARK_START_RE.search(message):
-                # Start tracing
-                self.tracingStart()
-                self._log.debug("Benchmark started!")
-
-            elif VELLAMO_BENCHMARK_END_RE.search(message):
-                # Stop tracing
-                self.tracingStop()
-                break
-
-            else:
-                continue
+            logcat.wait('start')
+            # Start tracing
+            self.tracingStart()
+            self._log.debug("Benchmark started!")
+
+            # Benchmark end trigger
+            logcat.wait('end')
+            # Stop tracing
+            self.tracingStop()
 
         # Gather scores file from the device
         db_file = os.path.join(out_dir, VELLAMO_SCORE_NAME)
@@ -19,6 +19,9 @@ import devlib
 import json
 import os
 import psutil
+import shutil
+import tempfile
+import threading
 import time
 import logging
 
@@ -30,6 +33,7 @@ import numpy as np
 import pandas as pd
 
 from bart.common.Utils import area_under_curve
+from energy_markers import ENERGY_MARKER
 
 # Default energy measurements for each board
 DEFAULT_ENERGY_METER = {
@@ -60,6 +64,8 @@ DEFAULT_ENERGY_METER = {
 EnergyReport = namedtuple('EnergyReport',
                           ['channels', 'report_file', 'data_frame'])
 
+TRACE_MARKER_FILE = '/sys/kernel/debug/tracing/trace_marker'
+
 class EnergyMeter(object):
 
     _meter = None
@@ -110,6 +116,21 @@ class EnergyMeter(object):
     def sample(self):
         raise NotImplementedError('Missing implementation')
 
+    def _mark_trace(self, event):
+        """
+        Write an energy meter event to the ftrace buffer
+
+        Meters configured with ``"trace_markers" : True`` call this when they
+        start and stop sampling, so that their samples can be aligned with the
+        trace. See :class:`EnergyAnalysis`.
+
+        :param event: "start" or "stop"
+        :type event: str
+        """
+        self._target.write_value(TRACE_MARKER_FILE,
+                                 '{}: event={}'.format(ENERGY_MARKER, event),
+                                 verify=False)
+
     def reset(self):
         raise NotImplementedError('Missing implementation')
 
@@ -117,6 +138,29 @@ class EnergyMeter(object):
         raise NotImplementedError('Missing implementation')
 
 class HWMon(EnergyMeter):
+    """
+    HWMON based EnergyMeter
+
+    By default only the energy counters at :meth:`reset` and :meth:`report`
+    time are read. Adding a ``sampling`` section to the energy meter
+    configuration starts a loop on the target at :meth:`reset` which reads all
+    the counters periodically, so that :meth:`report` can also produce a
+    ``samples.csv`` time series:
+
+    ::
+
+        "emeter" : {
+            "instrument" : "hwmon",
+            # Mark the start and stop of sampling in the trace
+            "trace_markers" : True,
+            "sampling" : {
+                # Time between polls of the counters
+                "period_s" : 0.1,
+                # Number of polls kept; older ones are overwritten
+                "buffer_size" : 36000,
+            },
+        },
+    """
 
     def __init__(self, target, conf=None, res_dir=None):
         super(HWMon, self).__init__(target, res_dir)
@@ -127,6 +171,12 @@ class HWMon(EnergyMeter):
         # Energy readings
         self.readings = {}
 
+        # Background sampling
+        conf = conf or {}
+        self._sampling = conf.get('sampling')
+        self._sampler = None
+        self._trace_markers = conf.get('trace_markers', False)
+
         if 'hwmon' not in self._target.modules:
             self._log.info('HWMON module not enabled')
             self._log.warning('Energy sampling disabled by configuration')
@@ -171,6 +221,13 @@ class HWMon(EnergyMeter):
         for channel in self._hwmon.active_channels:
             self._log.info('   %s', channel.label)
 
+        if self._sampling is not None:
+            self._sampler = _HWMonSampler(
+                self._target, self._hwmon.active_channels,
+                self._sampling.get('period_s', 0.1),
+                self._sampling.get('buffer_size', 36000))
+            self._log.info('Sampling energy counters every %.3f[s]',
+                           self._sampler.period_s)
 
     def sample(self):
         if self._hwmon is None:
@@ -198,15 +255,30 @@ class HWMon(EnergyMeter):
     def reset(self):
         if self._hwmon is None:
             return
+        if self._sampler:
+            self._sampler.stop()
         self.sample()
         for site in self.readings:
             self.readings[site]['delta'] = 0
             self.readings[site]['total'] = 0
         self._log.debug('RESET: %s', self.readings)
+        if self._sampler:
+            self._sampler.start()
+            if self._trace_markers:
+                self._mark_trace('start')
 
-    def report(self, out_dir, out_file='energy.json'):
+    def report(self, out_dir, out_file='energy.json', out_samples='samples.csv'):
         if self._hwmon is None:
             return (None, None)
+        df = None
+        if self._sampler:
+            if self._trace_markers:
+                self._mark_trace('stop')
+            self._sampler.stop()
+            df = self._sampler.get_data_frame(
+                {site: self.readings[site]['last'] for site in self.readings},
+                {site: channel for channel, site in self._channels.iteritems()})
+            self._sampler.write_csv(df, os.path.join(out_dir, out_samples))
         # Retrive energy consumption data
         nrg = self.sample()
         # Reformat data for output generation
@@ -225,19 +297,238 @@ class HWMon(EnergyMeter):
         with open(nrg_file, 'w') as ofile:
             json.dump(clusters_nrg, ofile, sort_keys=True, indent=4)
 
-        return EnergyReport(clusters_nrg, nrg_file, None)
+        return EnergyReport(clusters_nrg, nrg_file, df)
+
+class _HWMonSampler(object):
+    """
+    Internal class. Samples HWMON energy counters from a loop on the target.
+
+    The loop is started with :meth:`devlib.Target.background` and prints the
+    target time followed by all the counters at every period. A host thread
+    parses its output into a preallocated ring buffer of ``buffer_size``
+    samples. The loop does not go through :meth:`devlib.Target.execute`, so
+    sampling goes on while the connection is busy running the workload (e.g.
+    on SSH, which serialises commands).
+    """
+
+    SCRIPT = 'hwmon_sampler.sh'
+
+    def __init__(self, target, channels, period_s, buffer_size):
+        self._target = target
+        self._channels = list(channels)
+        self.period_s = period_s
+        self._log = logging.getLogger('EnergyMeter')
+
+        self._convert = [devlib.HwmonInstrument.measure_map[c.sensor.kind][1]
+                         for c in self._channels]
+        self._script = self._install_script()
+
+        # Each row holds the target time of a sample followed by the value of
+        # each channel
+        self._buffer = np.empty((buffer_size, 1 + len(self._channels)))
+        self._count = 0
+        self._start_time = None
+        self._proc = None
+        self._pid = None
+        self._thread = None
+
+    def _install_script(self):
+        # Printing the PID first allows stopping the loop on the target, the
+        # shell is not killed along with the SSH client
+        script = '\n'.join([
+            'echo $$',
+            'while echo $(date +%s.%N) $(cat {}); do'.format(' '.join(
+                c.sensor.get_file('input') for c in self._channels)),
+            '    sleep $1',
+            'done',
+            ''
+        ])
+        path = self._target.path.join(self._target.working_directory,
+                                      self.SCRIPT)
+        fd, host_path = tempfile.mkstemp(suffix='.sh')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                f.write(script)
+            self._target.push(host_path, path)
+        finally:
+            os.remove(host_path)
+        return path
+
+    def _parse(self, line):
+        fields = line.split()
+        if len(fields) != 1 + len(self._convert):
+            raise ValueError('unexpected output "{}"'.format(line.strip()))
+        timestamp = float(fields[0])
+        if self._start_time is None:
+            self._start_time = timestamp
+        row = self._buffer[self._count % len(self._buffer)]
+        row[0] = timestamp - self._start_time
+        for i, (convert, value) in enumerate(zip(self._convert, fields[1:])):
+            row[i + 1] = convert(int(value))
+        self._count += 1
+
+    def _run(self, stdout):
+        for line in iter(stdout.readline, ''):
+            try:
+                self._parse(line)
+            except ValueError as e:
+                self._log.error('Failed to sample HWMON counters: %s', e)
+
+    def start(self):
+        """Start sampling, discarding any previously collected samples"""
+        self.stop()
+        self._count = 0
+        self._start_time = None
+        self._proc = self._target.background(
+            'sh {} {}'.format(self._script, self.period_s))
+        try:
+            self._pid = int(self._proc.stdout.readline())
+        except ValueError:
+            error = self._proc.stderr.read().strip()
+            self._proc.wait()
+            self._proc = None
+            raise RuntimeError(
+                'Failed to start HWMON sampling: {}'.format(error))
+        self._thread = threading.Thread(target=self._run,
+                                        args=(self._proc.stdout,),
+                                        name='HWMonSampler')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop sampling, keeping the collected samples"""
+        if self._proc is None:
+            return
+        try:
+            self._target.kill(self._pid)
+        except devlib.TargetError as e:
+            self._log.warning('Failed to stop HWMON sampling: %s', e)
+            self._proc.kill()
+        # The output ends once the loop is killed
+        self._thread.join()
+        self._proc.wait()
+        self._proc = None
+        self._thread = None
+
+    def get_data_frame(self, baseline, names):
+        """
+        Get the collected samples as a DataFrame
+
+        :param baseline: Dict mapping HWMON sites to the counter value to
+                         subtract from their samples
+        :param names: Dict mapping HWMON sites to the name of their column
+
+        :returns: DataFrame indexed by the time since sampling started, with a
+                  ``(name, 'energy')`` column with the energy used since the
+                  start and a ``(name, 'power')`` column with the mean power
+                  since the previous sample for each channel
+        """
+        size = len(self._buffer)
+        if self._count > size:
+            self._log.warning('HWMON sampling buffer overflowed, '
+                              'dropping the oldest %d samples',
+                              self._count - size)
+            data = np.roll(self._buffer, -(self._count % size), axis=0)
+        else:
+            data = self._buffer[:self._count]
+
+        index = data[:, 0]
+        columns = {}
+        for i, chan in enumerate(self._channels):
+            if chan.site not in names:
+                continue
+            name = names[chan.site]
+            nrg = data[:, i + 1] - baseline.get(chan.site, 0)
+            columns[(name, 'energy')] = nrg
+            interval = np.ediff1d(index, to_begin=index[:1])
+            columns[(name, 'power')] = (np.ediff1d(nrg, to_begin=nrg[:1]) /
+                                        interval.clip(min=1e-6))
+        df = pd.DataFrame(columns, index=index)
+        return df[sorted(columns)]
+
+    @staticmethod
+    def write_csv(df, path):
+        """
+        Write samples in the format of the continuous energy meters
+
+        That is, with one ``SITE_measure`` column per channel and measure,
+        plus a ``time`` column since HWMON samples are not evenly spaced.
+        """
+        out = pd.DataFrame(df.values, index=df.index,
+                           columns=['_'.join(c) for c in df.columns])
+        out.to_csv(path, index_label='time')
 
 class _DevlibContinuousEnergyMeter(EnergyMeter):
-    """Common functionality for devlib Instruments in CONTINUOUS mode"""
+    """Common functionality for devlib Instruments in CONTINUOUS mode
+
+    If ``trace_markers`` is set in the energy meter configuration, the start
+    and stop of sampling are marked in the trace (see
+    :meth:`EnergyMeter._mark_trace`).
+
+    By default :meth:`report` loads all the collected samples into a
+    DataFrame. Long captures can be processed in constant memory by adding a
+    ``streaming`` section to the energy meter configuration:
+
+    ::
+
+        "emeter" : {
+            "instrument" : "monsoon",
+            "conf" : { ... },
+            # Mark the start and stop of sampling in the trace
+            "trace_markers" : True,
+            "streaming" : {
+                # Number of CSV rows to load at a time
+                "chunk_size" : 100000,
+                # If non-zero, save the mean of every N samples to a binary
+                # file for plotting
+                "downsample" : 100,
+            },
+        },
+    """
+
+    def __init__(self, target, conf, res_dir):
+        super(_DevlibContinuousEnergyMeter, self).__init__(target, res_dir)
+
+        self._streaming = conf.get('streaming')
+        if self._streaming is True:
+            self._streaming = {}
+        self._trace_markers = conf.get('trace_markers', False)
 
     def reset(self):
         self._instrument.start()
+        if self._trace_markers:
+            self._mark_trace('start')
+
+    def report(self, out_dir, out_energy='energy.json', out_samples='samples.csv',
+               out_downsampled='samples_downsampled.npy'):
+        """
+        Stop the instrument and compute the energy used by each channel
 
-    def report(self, out_dir, out_energy='energy.json', out_samples='samples.csv'):
+        :param out_dir: Output directory where to store results
+        :type out_dir: str
+
+        :param out_energy: File name where to save energy data
+        :type out_energy: str
+
+        :param out_samples: File name where to save the samples collected by
+                            the instrument
+        :type out_samples: str
+
+        :param out_downsampled: File name where to save downsampled samples,
+                                only used in streaming mode
+        :type out_downsampled: str
+
+        :returns: :class:`EnergyReport`. In streaming mode, its ``data_frame``
+                  holds the downsampled samples, or is None if downsampling is
+                  disabled.
+        """
+        if self._trace_markers:
+            self._mark_trace('stop')
         self._instrument.stop()
 
         csv_path = os.path.join(out_dir, out_samples)
         csv_data = self._instrument.get_data(csv_path)
+        sample_period = 1. / self._instrument.sample_rate_hz
         with open(csv_path) as f:
             # Each column in the CSV will be headed with 'SITE_measure'
             # (e.g. 'BAT_power'). Convert that to a list of ('SITE', 'measure')
@@ -252,21 +543,31 @@ class _DevlibContinuousEnergyMeter(EnergyMeter):
                     'Expected {}, found {}'.format(sorted(headers),
                                                    sorted(exp_headers)))
             columns = [tuple(h.rsplit('_', 1)) for h in headers]
-            # Passing `names` means read_csv doesn't expect to find headers in
-            # the CSV (i.e. expects every line to hold data). This works because
-            # we have already consumed the first line of `f`.
-            df = pd.read_csv(f, names=columns)
-
-        sample_period = 1. / self._instrument.sample_rate_hz
-        df.index = np.linspace(0, sample_period * len(df), num=len(df))
-
-        if df.empty:
-            raise RuntimeError('No energy data collected')
 
-        channels_nrg = {}
-        for site, measure in df:
-            if measure == 'power':
-                channels_nrg[site] = area_under_curve(df[site]['power'])
+            if self._streaming is not None:
+                channels_nrg, df = integrate_samples_csv(
+                    f, columns, sample_period,
+                    chunk_size=self._streaming.get('chunk_size', 100000),
+                    downsample=self._streaming.get('downsample', 0))
+                if df is not None:
+                    save_samples_npy(
+                        df, os.path.join(out_dir, out_downsampled))
+            else:
+                # Passing `names` means read_csv doesn't expect to find headers
+                # in the CSV (i.e. expects every line to hold data). This works
+                # because we have already consumed the first line of `f`.
+                df = pd.read_csv(f, names=columns)
+
+        if self._streaming is None:
+            df.index = np.linspace(0, sample_period * len(df), num=len(df))
+
+            if df.empty:
+                raise RuntimeError('No energy data collected')
+
+            channels_nrg = {}
+            for site, measure in df:
+                if measure == 'power':
+                    channels_nrg[site] = area_under_curve(df[site]['power'])
 
         # Dump data as JSON file
         nrg_file = '{}/{}'.format(out_dir, out_energy)
@@ -275,10 +576,108 @@ class _DevlibContinuousEnergyMeter(EnergyMeter):
 
         return EnergyReport(channels_nrg, nrg_file, df)
 
+def integrate_samples_csv(f, columns, sample_period, chunk_size=100000,
+                          downsample=0):
+    """
+    Integrate the power channels of a devlib instrument CSV chunk by chunk
+
+    Gives the same energy values as loading the whole file in
+    :meth:`_DevlibContinuousEnergyMeter.report`, i.e. trapezoidal integration
+    over ``np.linspace(0, sample_period * N, N)`` for N samples, skipping empty
+    values, while holding only ``chunk_size`` rows in memory at a time.
+
+    :param f: File object positioned at the first line of samples (i.e. after
+              the CSV headers)
+    :param columns: List of ``(site, measure)`` tuples naming the columns
+    :param sample_period: Time between samples, in seconds
+    :param chunk_size: Number of rows to load at a time
+    :param downsample: If non-zero, also build a DataFrame holding the mean of
+                       every ``downsample`` consecutive samples
+
+    :returns: Tuple ``(channels_nrg, df)`` where ``channels_nrg`` maps each
+              site with a power measure to its energy, and ``df`` is the
+              downsampled DataFrame (with the same columns as the full one would
+              have) or None if ``downsample`` is 0.
+    """
+    if downsample:
+        # Keep downsampling blocks from straddling chunks
+        chunk_size = max(chunk_size // downsample, 1) * downsample
+
+    power_cols = [c for c in columns if c[1] == 'power']
+    # For each power column, the integral in units of sample index and the
+    # last valid (index, value) pair, to join the curve across chunks.
+    areas = {c: 0. for c in power_cols}
+    last = {c: None for c in power_cols}
+    blocks = []
+    count = 0
+
+    for chunk in pd.read_csv(f, names=columns, chunksize=chunk_size):
+        idx = np.arange(count, count + len(chunk))
+        count += len(chunk)
+
+        for col in power_cols:
+            values = chunk[col].values.astype(float)
+            valid = ~np.isnan(values)
+            x, y = idx[valid], values[valid]
+            if last[col] is not None:
+                x = np.concatenate(([last[col][0]], x))
+                y = np.concatenate(([last[col][1]], y))
+            if len(x):
+                areas[col] += np.trapz(y, x)
+                last[col] = (x[-1], y[-1])
+
+        if downsample:
+            block = chunk.groupby(idx // downsample).mean()
+            block.index = block.index * downsample
+            blocks.append(block)
+
+    if not count:
+        raise RuntimeError('No energy data collected')
+
+    # Same time step as np.linspace(0, sample_period * count, num=count)
+    step = sample_period * count / (count - 1) if count > 1 else 0.
+    channels_nrg = {site: areas[(site, measure)] * step
+                    for site, measure in power_cols}
+
+    df = None
+    if downsample:
+        df = pd.concat(blocks)
+        df.index = df.index * step
+
+    return channels_nrg, df
+
+def save_samples_npy(df, path):
+    """
+    Save an energy samples DataFrame as a compact binary NumPy file
+
+    The file holds a structured array with a ``time`` field followed by a
+    ``SITE_measure`` field for each column, using 32-bit floats for the
+    measurements. Use :func:`load_samples_npy` to read it back.
+    """
+    names = ['_'.join(c) for c in df.columns]
+    dtype = [('time', np.float64)] + [(n, np.float32) for n in names]
+    data = np.empty(len(df), dtype=dtype)
+    data['time'] = df.index.values
+    for name, col in zip(names, df.columns):
+        data[name] = df[col].values
+    np.save(path, data)
+
+def load_samples_npy(path):
+    """
+    Load a file saved by :func:`save_samples_npy` as a DataFrame
+
+    :returns: DataFrame indexed by time, with ``(site, measure)`` columns
+    """
+    data = np.load(path)
+    names = [n for n in data.dtype.names if n != 'time']
+    df = pd.DataFrame({tuple(n.rsplit('_', 1)): data[n] for n in names},
+                      index=data['time'])
+    return df[[tuple(n.rsplit('_', 1)) for n in names]]
+
 class AEP(_DevlibContinuousEnergyMeter):
 
     def __init__(self, target, conf, res_dir):
-        super(AEP, self).__init__(target, res_dir)
+        super(AEP, self).__init__(target, conf, res_dir)
 
         # Configure channels for energy measurements
         self._log.info('AEP configuration')
@@ -301,7 +700,7 @@ class Monsoon(_DevlibContinuousEnergyMeter):
     """
 
     def __init__(self, target, conf, res_dir):
-        super(Monsoon, self).__init__(target, res_dir)
+        super(Monsoon, self).__init__(target, conf, res_dir)
 
         self._instrument = devlib.MonsoonInstrument(self._target, **conf['conf'])
         self._instrument.reset()
@@ -320,6 +719,10 @@ _acme_install_instructions = '''
 class ACME(EnergyMeter):
     """
     BayLibre's ACME board based EnergyMeter
+
+    A dedicated iio-capture process is run for each channel. The meter keeps
+    track of the processes it starts, so iio-capture instances left over by
+    other sessions are only looked for once, when the meter is created.
     """
 
     def __init__(self, target, conf, res_dir):
@@ -332,6 +735,8 @@ class ACME(EnergyMeter):
         })
         self._iiocapturebin = iioc.get('iio-capture', 'iio-capture')
         self._hostname = iioc.get('ip_address', 'baylibre-acme.local')
+        # Time allowed for iio-capture to connect and start sampling
+        self._start_timeout = iioc.get('start_timeout_s', 5)
 
         self._channels = conf.get('channel_map', {
             'CH0': '0'
@@ -348,12 +753,15 @@ class ACME(EnergyMeter):
         # Check if iio-capture binary is available
         try:
             p = Popen([self._iiocapturebin, '-h'], stdout=PIPE, stderr=STDOUT)
+            p.communicate()
         except:
             self._log.error('iio-capture binary [%s] not available',
                             self._iiocapturebin)
             self._log.warning(_acme_install_instructions)
             raise RuntimeError('Missing iio-capture binary')
 
+        self._kill_stale_captures()
+
     def sample(self):
         raise NotImplementedError('Not available for ACME')
 
@@ -363,36 +771,133 @@ class ACME(EnergyMeter):
     def _str(self, channel):
         return '{} ({})'.format(channel, self._iio_device(channel))
 
-    def reset(self):
+    def _csv_file(self, channel):
+        return os.path.join(self._res_dir, 'samples_{}.csv'.format(channel))
+
+    def _kill_stale_captures(self):
         """
-        Reset energy meter and start sampling from channels specified in the
-        target configuration.
+        Kill iio-capture instances for our channels not started by this meter
         """
-        # Terminate already running iio-capture instance (if any)
-        wait_for_termination = 0
+        stale = []
         for proc in psutil.process_iter():
-            if self._iiocapturebin not in proc.cmdline():
+            try:
+                cmdline = proc.cmdline()
+            except psutil.Error:
+                continue
+            if self._iiocapturebin not in cmdline:
                 continue
             for channel in self._channels:
-                if self._iio_device(channel) in proc.cmdline():
+                if self._iio_device(channel) in cmdline:
                     self._log.debug('Killing previous iio-capture for [%s]',
                                      self._iio_device(channel))
-                    self._log.debug(proc.cmdline())
+                    self._log.debug(cmdline)
                     proc.kill()
-                    wait_for_termination = 2
+                    stale.append(proc)
 
         # Wait for previous instances to be killed
-        sleep(wait_for_termination)
+        psutil.wait_procs(stale, timeout=2)
+
+    def _stop_captures(self):
+        """
+        Terminate the iio-capture instances started by this meter
+
+        All the instances are signalled before waiting for any of them, so that
+        they shut down concurrently.
+
+        :returns: Dict mapping each channel whose iio-capture was still running
+                  or exited cleanly to its output
+        """
+        running = {}
+        for channel in self._channels:
+            proc = self._iio.get(self._channels[channel])
+            if proc is None:
+                continue
+            if proc.poll() is None:
+                proc.terminate()
+                running[channel] = proc
+            elif proc.returncode == 0:
+                running[channel] = proc
+            else:
+                # iio-capture has terminated already with an error
+                self._log.error('%s terminated for %s',
+                                self._iiocapturebin, self._str(channel))
+                out, _ = proc.communicate()
+                self._log.error('[%s]', out)
+
+        outputs = {}
+        for channel, proc in running.iteritems():
+            out, _ = proc.communicate()
+            outputs[channel] = out
+
+        self._iio = {}
+        return outputs
+
+    def _wait_started(self):
+        """
+        Wait for all iio-capture instances to start sampling
+
+        An instance is considered started once it has created its CSV file,
+        which iio-capture only does after connecting to the device. The
+        samples themselves are buffered, so the file may still be empty.
+        Raises RuntimeError if any of them fails or does not start in time,
+        after terminating all of them.
+        """
+        pending = set(self._channels)
+        deadline = time.time() + self._start_timeout
+        while pending and time.time() < deadline:
+            for channel in list(pending):
+                ch_id = self._channels[channel]
+
+                self._iio[ch_id].poll()
+                if self._iio[ch_id].returncode is not None:
+                    self._log.error('Failed to run %s for %s',
+                                     self._iiocapturebin, self._str(channel))
+                    self._log.warning('\n\n'\
+                        '  Make sure there are no iio-capture processes\n'\
+                        '  connected to %s and device %s\n',
+                        self._hostname, self._str(channel))
+                    out, _ = self._iio[ch_id].communicate()
+                    self._log.error('Output: [%s]', out.strip())
+                    self._iio[ch_id] = None
+                    self._stop_captures()
+                    raise RuntimeError('iio-capture connection error')
+
+                if self._csv_started(channel):
+                    self._log.debug('Started %s on %s...',
+                                    self._iiocapturebin, self._str(channel))
+                    pending.remove(channel)
+
+            if pending:
+                sleep(0.01)
+
+        if pending:
+            for channel in pending:
+                self._log.error('%s did not start on %s after %d[s]',
+                                self._iiocapturebin, self._str(channel),
+                                self._start_timeout)
+            self._stop_captures()
+            raise RuntimeError('iio-capture start timeout')
+
+    def _csv_started(self, channel):
+        """Check whether iio-capture has created a channel CSV"""
+        return os.path.exists(self._csv_file(channel))
+
+    def reset(self):
+        """
+        Reset energy meter and start sampling from channels specified in the
+        target configuration.
+        """
+        # Terminate already running iio-capture instances (if any)
+        self._stop_captures()
 
         # Start iio-capture for all channels required
         for channel in self._channels:
             ch_id = self._channels[channel]
 
             # Setup CSV file to collect samples for this channel
-            csv_file = '{}/{}'.format(
-                self._res_dir,
-                'samples_{}.csv'.format(channel)
-            )
+            csv_file = self._csv_file(channel)
+            if os.path.exists(csv_file):
+                os.remove(csv_file)
 
             # Start a dedicated iio-capture instance for this channel
             self._iio[ch_id] = Popen([self._iiocapturebin, '-n',
@@ -402,28 +907,8 @@ class ACME(EnergyMeter):
                                        self._iio_device(channel)],
                                        stdout=PIPE, stderr=STDOUT)
 
-        # Wait few milliseconds before to check if there is any output
-        sleep(1)
-
-        # Check that all required channels have been started
-        for channel in self._channels:
-            ch_id = self._channels[channel]
-
-            self._iio[ch_id].poll()
-            if self._iio[ch_id].returncode:
-                self._log.error('Failed to run %s for %s',
-                                 self._iiocapturebin, self._str(channel))
-                self._log.warning('\n\n'\
-                    '  Make sure there are no iio-capture processes\n'\
-                    '  connected to %s and device %s\n',
-                    self._hostname, self._str(channel))
-                out, _ = self._iio[ch_id].communicate()
-                self._log.error('Output: [%s]', out.strip())
-                self._iio[ch_id] = None
-                raise RuntimeError('iio-capture connection error')
-
-        self._log.debug('Started %s on %s...',
-                        self._iiocapturebin, self._str(channel))
+        # Wait for all the channels to be sampling
+        self._wait_started()
 
     def report(self, out_dir, out_energy='energy.json'):
         """
@@ -437,28 +922,11 @@ class ACME(EnergyMeter):
         """
         channels_nrg = {}
         channels_stats = {}
+        outputs = self._stop_captures()
         for channel in self._channels:
-            ch_id = self._channels[channel]
-
-            if self._iio[ch_id] is None:
+            if channel not in outputs:
                 continue
-
-            self._iio[ch_id].poll()
-            if self._iio[ch_id].returncode:
-                # returncode not None means that iio-capture has terminated
-                # already, so there must have been an error
-                self._log.error('%s terminated for %s',
-                                self._iiocapturebin, self._str(channel))
-                out, _ = self._iio[ch_id].communicate()
-                self._log.error('[%s]', out)
-                self._iio[ch_id] = None
-                continue
-
-            # kill process and get return
-            self._iio[ch_id].terminate()
-            out, _ = self._iio[ch_id].communicate()
-            self._iio[ch_id].wait()
-            self._iio[ch_id] = None
+            out = outputs[channel]
 
             self._log.debug('Completed IIOCapture for %s...',
                             self._str(channel))
@@ -481,8 +949,9 @@ class ACME(EnergyMeter):
             self._log.debug(nrg)
 
             # Save CSV samples file to out_dir
-            os.system('mv {}/samples_{}.csv {}'
-                      .format(self._res_dir, channel, out_dir))
+            csv_file = self._csv_file(channel)
+            shutil.move(csv_file,
+                        os.path.join(out_dir, os.path.basename(csv_file)))
 
             # Add channel's energy to return results
             channels_nrg['{}'.format(channel)] = nrg['energy']
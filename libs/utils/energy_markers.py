@@ -0,0 +1,28 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Trace markers written by energy meters
+
+Kept apart from the energy meters so that parsing a trace does not need the
+energy meter dependencies.
+"""
+
+# Name of the trace marker event written by energy meters when they start and
+# stop sampling, see EnergyMeter._mark_trace
+ENERGY_MARKER = 'lisa_energy_marker'
+
+# vim :set tabstop=4 shiftwidth=4 expandtab
@@ -18,8 +18,10 @@
 from collections import namedtuple, OrderedDict
 from itertools import product
 import logging
+import multiprocessing
 import operator
 import re
+import threading
 
 import pandas as pd
 import numpy as np
@@ -62,6 +64,36 @@ def read_multiple_oneline_files(target, glob_patterns):
 
     return dict(zip(paths, contents))
 
+# State of the worker processes used by
+# EnergyModel._find_placement_candidates_parallel
+_placement_worker = {}
+
+# Pool of EnergyModel._find_placement_candidates_parallel, kept across calls:
+# tuple (energy_model, processes, pool, best_power)
+_placement_pool = None
+_placement_pool_lock = threading.Lock()
+
+def _init_placement_worker(energy_model, best_power):
+    _placement_worker.update(energy_model=energy_model, best_power=best_power)
+
+def _search_placement_prefix(args):
+    capacities, tasks, prefix = args
+    w = _placement_worker
+    return w['energy_model']._find_placement_candidates(
+        capacities, tasks, prefix, w['best_power'])
+
+def _lookup_states(active_states, freqs, attr):
+    """
+    Get an attribute of the active states at each of an array of frequencies
+    """
+    keys = np.array(active_states.keys(), dtype=float)
+    values = np.array([getattr(s, attr) for s in active_states.values()])
+    matches = freqs[:, np.newaxis] == keys
+    if not matches.any(axis=1).all():
+        missing = freqs[~matches.any(axis=1)]
+        raise KeyError('No active state for frequency {}'.format(missing[0]))
+    return values[matches.argmax(axis=1)]
+
 class EnergyModelCapacityError(Exception):
     """Used by :meth:`EnergyModel.get_optimal_placements`"""
     pass
@@ -311,6 +343,12 @@ class EnergyModel(object):
     highest available frequency.
     """
 
+    placement_pool_min_candidates = 1 << 16
+    """Number of candidate placements from which
+    :meth:`get_optimal_placements` uses its ``processes``; smaller searches
+    run faster in the calling process.
+    """
+
     def __init__(self, root_node, root_power_domain, freq_domains):
         self.cpus = root_node.cpus
         if self.cpus != tuple(range(len(self.cpus))):
@@ -623,7 +661,139 @@ class EnergyModel(object):
         return self._estimate_from_active_time(cpu_active_time,
                                                freqs, idle_states, combine=True)
 
-    def get_optimal_placements(self, capacities):
+    def estimate_from_cpu_util_series(self, cpu_utils, index=None):
+        """
+        Estimate the energy usage of the system under a series of utilization
+        distributions
+
+        Equivalent to calling :meth:`estimate_from_cpu_util` on each row of
+        ``cpu_utils`` with the default frequencies and idle states, but
+        vectorised over the rows so it can be applied to the utilization of a
+        whole trace.
+
+        :param cpu_utils: Array with a row for each utilization distribution
+                          and a column for each CPU, see
+                          :ref:`cpu_utils <cpu-utils>`
+        :param index: Index of the returned DataFrame, e.g. the time of each
+                      row. Default is a range index.
+
+        :returns: A DataFrame with a row for each row of ``cpu_utils`` and a
+                  column with the power of each system component, keyed like
+                  the dict returned by :meth:`estimate_from_cpu_util`
+        """
+        cpu_utils = np.asarray(cpu_utils, dtype=float)
+        if cpu_utils.ndim != 2 or cpu_utils.shape[1] != len(self.cpus):
+            raise ValueError(
+                'cpu_utils must have a column per CPU ({}), shape is {}'.format(
+                    len(self.cpus), cpu_utils.shape))
+
+        # Lowest frequency providing enough capacity to each CPU alone, or its
+        # max frequency if none does
+        ideal_freqs = np.empty(cpu_utils.shape)
+        for cpu, node in enumerate(self.cpu_nodes):
+            freqs = np.array(node.active_states.keys(), dtype=float)
+            caps = np.array([s.capacity for s in node.active_states.values()])
+            fits = caps >= cpu_utils[:, cpu, np.newaxis]
+            ideal_freqs[:, cpu] = np.where(
+                fits.any(axis=1),
+                np.where(fits, freqs, np.inf).min(axis=1), freqs.max())
+
+        # Rectify the frequencies among domains
+        freqs = np.empty(cpu_utils.shape)
+        for domain in self.freq_domains:
+            freqs[:, domain] = ideal_freqs[:, domain].max(axis=1)[:, np.newaxis]
+
+        cpu_active_time = np.empty(cpu_utils.shape)
+        for cpu, node in enumerate(self.cpu_nodes):
+            assert (cpu,) == node.cpus
+            caps = _lookup_states(node.active_states, freqs[:, cpu], 'capacity')
+            cpu_active_time[:, cpu] = np.minimum(cpu_utils[:, cpu] / caps, 1.0)
+
+        assert np.all((0.0 <= cpu_active_time) & (cpu_active_time <= 1.0))
+
+        # Idle states only depend on which CPUs are active, so only guess them
+        # once for each combination
+        cpus_active, active_idx = [], np.empty(0, dtype=int)
+        if len(cpu_utils):
+            cpus_active, active_idx = np.unique(cpu_utils != 0, axis=0,
+                                                return_inverse=True)
+        idle_states = [self.guess_idle_states(list(active))
+                       for active in cpus_active]
+
+        ret = OrderedDict()
+        for node in self.root.iter_nodes():
+            if not node.active_states or not node.idle_states:
+                continue
+
+            cpus = tuple(node.cpus)
+            power = _lookup_states(node.active_states, freqs[:, cpus[0]],
+                                   'power')
+            active_time = cpu_active_time[:, cpus].max(axis=1)
+            active_power = power * active_time
+
+            _idle_power = np.array([
+                max(node.idle_states[states[c]] for c in cpus)
+                for states in idle_states])[active_idx]
+            idle_power = _idle_power * (1 - active_time)
+
+            ret[cpus] = active_power + idle_power
+
+        return pd.DataFrame(np.column_stack(ret.values()), index=index,
+                            columns=ret.keys())
+
+    def _find_placement_candidates(self, capacities, tasks, prefix=(),
+                                   best_power=None):
+        """Helper for get_optimal_placements
+
+        Search the placements of ``tasks`` where the first ``len(prefix)`` tasks
+        are already placed on the CPUs listed in ``prefix``.
+
+        If ``best_power`` is given, it must be a shared
+        :class:`multiprocessing.Value` holding the lowest power estimate found
+        so far by any search. Candidates that are worse than it are dropped, and
+        it is lowered whenever a better candidate is found.
+
+        :returns: Dict mapping ``cpu_utils`` tuples to their estimated power.
+        """
+        candidates = {}
+        excluded = set()
+        for cpus in product(self.cpus, repeat=len(tasks) - len(prefix)):
+            util = [0 for _ in self.cpus]
+            for task, cpu in zip(tasks, prefix + cpus):
+                util[cpu] += capacities[task]
+            util = tuple(util)
+
+            # Filter out candidate placements that have tasks greater than max
+            # or that we have already determined that we cannot place.
+            if (any(u > self.capacity_scale for u in util) or util in excluded):
+                continue
+
+            if util not in candidates:
+                freqs, overutilized = self._guess_freqs(util)
+                if overutilized:
+                    # This isn't a valid placement
+                    excluded.add(util)
+                    continue
+
+                power = sum(self.estimate_from_cpu_util(util, freqs=freqs)
+                            .values())
+                if best_power is not None:
+                    # The bound only decreases, so a stale unlocked read is
+                    # enough to discard most candidates
+                    if power > best_power.get_obj().value:
+                        excluded.add(util)
+                        continue
+                    with best_power.get_lock():
+                        if power > best_power.value:
+                            # Another search already found something better
+                            excluded.add(util)
+                            continue
+                        best_power.value = power
+                candidates[util] = power
+
+        return candidates
+
+    def get_optimal_placements(self, capacities, processes=None):
         """Find the optimal distribution of work for a set of tasks
 
         Find a list of candidates which are estimated to be optimal in terms of
@@ -645,18 +815,29 @@ class EnergyModel(object):
 
         .. note::
             This is a brute force search taking time exponential wrt. the number
-            of tasks.
+            of tasks. Use ``processes`` to spread large searches over several
+            host CPUs.
 
         :param capacities: Dict mapping tasks to expected utilization
                            values. These tasks are assumed not to change; they
                            have a single static utilization value. A set of
                            single-phase periodic RT-App tasks is an example of a
                            suitable workload for this model.
+        :param processes: Number of worker processes to partition the search
+                          across, if it has at least
+                          :attr:`placement_pool_min_candidates` candidates.
+                          The placements of the first few tasks are split
+                          between the workers, which share the best power
+                          estimate found so far to discard worse candidates
+                          early. The workers are kept for the next searches
+                          with the same model and number of processes. By
+                          default the search runs in the calling process. The
+                          result does not depend on this value.
         :returns: List of ``cpu_utils`` items representing distributions of work
                   under optimal task placements, see
                   :ref:`cpu_utils <cpu-utils>`. Multiple task placements
                   that result in the same CPU utilizations are considered
-                  equivalent.
+                  equivalent. The list is sorted.
         """
         tasks = capacities.keys()
 
@@ -665,29 +846,12 @@ class EnergyModel(object):
             '%14s - Searching %d configurations for optimal task placement...',
             'EnergyModel', num_candidates)
 
-        candidates = {}
-        excluded = []
-        for cpus in product(self.cpus, repeat=len(tasks)):
-            placement = {task: cpu for task, cpu in zip(tasks, cpus)}
-
-            util = [0 for _ in self.cpus]
-            for task, cpu in placement.items():
-                util[cpu] += capacities[task]
-            util = tuple(util)
-
-            # Filter out candidate placements that have tasks greater than max
-            # or that we have already determined that we cannot place.
-            if (any(u > self.capacity_scale for u in util) or util in excluded):
-                continue
-
-            if util not in candidates:
-                freqs, overutilized = self._guess_freqs(util)
-                if overutilized:
-                    # This isn't a valid placement
-                    excluded.append(util)
-                else:
-                    power = self.estimate_from_cpu_util(util, freqs=freqs)
-                    candidates[util] = sum(power.values())
+        if processes and processes > 1 and \
+           num_candidates >= self.placement_pool_min_candidates:
+            candidates = self._find_placement_candidates_parallel(
+                capacities, tasks, processes)
+        else:
+            candidates = self._find_placement_candidates(capacities, tasks)
 
         if not candidates:
             # The system can't provide full throughput to this workload.
@@ -697,11 +861,57 @@ class EnergyModel(object):
 
         # Whittle down to those that give the lowest energy estimate
         min_power = min(p for p in candidates.itervalues())
-        ret = [u for u, p in candidates.iteritems() if p == min_power]
+        ret = sorted(u for u, p in candidates.iteritems() if p == min_power)
 
         self._log.debug('%14s - Done', 'EnergyModel')
         return ret
 
+    def _find_placement_candidates_parallel(self, capacities, tasks,
+                                            processes):
+        """
+        Helper for get_optimal_placements, running the search in a process pool
+
+        The search space is partitioned by the CPUs assigned to the first few
+        tasks, making enough partitions to keep all the workers busy.
+        """
+        prefix_len = 0
+        while (prefix_len < len(tasks) and
+               len(self.cpus) ** prefix_len < processes * 4):
+            prefix_len += 1
+        prefixes = list(product(self.cpus, repeat=prefix_len))
+
+        global _placement_pool
+        with _placement_pool_lock:
+            if _placement_pool is None or _placement_pool[0] is not self or \
+               _placement_pool[1] != processes:
+                if _placement_pool is not None:
+                    _placement_pool[2].terminate()
+                # Workers are forked, so the model and the shared bound are
+                # inherited rather than pickled.
+                best_power = multiprocessing.Value('d', float('inf'))
+                pool = multiprocessing.Pool(
+                    processes, initializer=_init_placement_worker,
+                    initargs=(self, best_power))
+                _placement_pool = (self, processes, pool, best_power)
+            _, _, pool, best_power = _placement_pool
+
+            best_power.value = float('inf')
+            try:
+                results = pool.map(_search_placement_prefix,
+                                   [(capacities, tasks, prefix)
+                                    for prefix in prefixes])
+            except:
+                pool.terminate()
+                _placement_pool = None
+                raise
+
+        # Later partitions may have kept candidates that were only beaten
+        # afterwards; those are filtered out by the caller.
+        candidates = {}
+        for result in results:
+            candidates.update(result)
+        return candidates
+
     @classmethod
     def _find_core_groups(cls, target):
         """
@@ -45,6 +45,9 @@ FTRACE_EVENTS_DEFAULT = ['sched:*']
 FTRACE_BUFSIZE_DEFAULT = 10240
 OUT_PREFIX = 'results'
 LATEST_LINK = 'results_latest'
+RTAPP_CALIB_CACHE_DEFAULT = 'rtapp-calib.json'
+RTAPP_CALIB_TOLERANCE_PCT = 10
+RTAPP_CALIB_PROBE_S = 0.1
 
 basepath = os.path.dirname(os.path.realpath(__file__))
 basepath = basepath.replace('/libs/utils', '')
@@ -108,6 +111,13 @@ class TestEnv(ShareState):
             calibrate RT-App on the target. A message will be logged with
             a value that can be copied here to avoid having to re-run
             calibration on subsequent tests.
+        **rtapp-calib-cache**
+            Host file caching RT-App calibration values, keyed by target,
+            kernel version and CPUs max frequency. Cached values are checked
+            by calibrating one CPU per frequency domain, and only the domains
+            which do not match are calibrated again. Defaults to
+            ``$LISA_HOME/results/rtapp-calib.json``, set to ``null`` to
+            always calibrate all the CPUs.
         **tftp**
             Directory path containing kernels and DTB images for the
             target. LISA does *not* manage this TFTP server, it must be
@@ -804,7 +814,7 @@ class TestEnv(ShareState):
                 }
         else:
             self._log.info('Calibrating RTApp...')
-            self._calib = RTA.calibrate(self.target)
+            self._calib = self._calibrate_rtapp(force)
 
         self._log.info('Using RT-App calibration values:')
         self._log.info('   %s',
@@ -812,6 +822,105 @@ class TestEnv(ShareState):
                                        for key in sorted(self._calib)) + "}")
         return self._calib
 
+    def _calibrate_rtapp(self, force=False):
+        cache_file = self.conf.get('rtapp-calib-cache',
+                os.path.join(self.LISA_HOME, OUT_PREFIX,
+                             RTAPP_CALIB_CACHE_DEFAULT))
+        if not cache_file:
+            return RTA.calibrate(self.target)
+
+        cache = {}
+        if os.path.isfile(cache_file):
+            try:
+                with open(cache_file) as fh:
+                    cache = json.load(fh)
+            except ValueError:
+                self._log.warning('Ignoring corrupted RTApp calibration '
+                                  'cache [%s]', cache_file)
+
+        key = self._calib_cache_key()
+        calib = {int(cpu): pload
+                 for cpu, pload in cache.get(key, {}).iteritems()}
+        if not calib or force:
+            calib = RTA.calibrate(self.target)
+        else:
+            stale_cpus, probe = self._calib_stale_cpus(calib)
+            if not stale_cpus:
+                self._log.info('Using cached RTApp calibration from [%s]',
+                               cache_file)
+                return calib
+            # The probed CPUs need no further calibration
+            calib.update((cpu, probe[cpu]) for cpu in stale_cpus
+                         if cpu in probe)
+            stale_cpus = [cpu for cpu in stale_cpus if cpu not in probe]
+            if stale_cpus:
+                self._log.info('Calibrating RTApp on CPUs %s...', stale_cpus)
+                calib.update(RTA.calibrate(self.target, stale_cpus))
+
+        # Replace the cache atomically, other sessions may be reading it
+        cache[key] = calib
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir and not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        tmp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+        with open(tmp_file, 'w') as fh:
+            json.dump(cache, fh, sort_keys=True, indent=4)
+        os.rename(tmp_file, cache_file)
+        return calib
+
+    def _calib_cache_key(self):
+        """
+        Identify the target, kernel and CPUs max frequency of a calibration
+        """
+        target = self.conf.get('device', self.conf.get('host', self.ip))
+        max_freqs = [self.target.cpufreq.get_max_frequency(cpu)
+                     for cpu in self.target.list_online_cpus()]
+        return '{}:{}:{}'.format(
+            target, self.target.kernel_version,
+            ','.join(str(freq) for freq in max_freqs))
+
+    def _calib_stale_cpus(self, calib):
+        """
+        Get the CPUs whose cached calibration does not match the target
+
+        The first CPU of each frequency domain is probed with a calibration
+        workload of RTAPP_CALIB_PROBE_S, one CPU after the other. All the CPUs
+        of a domain are stale if the probed value is not within
+        RTAPP_CALIB_TOLERANCE_PCT of the cached one.
+
+        :returns: tuple (stale_cpus, probe), with the sorted list of stale
+                  CPUs and the dict of probed calibration values
+        """
+        online_cpus = self.target.list_online_cpus()
+        domains = [[cpu for cpu in domain if cpu in online_cpus]
+                   for domain in self.target.cpufreq.iter_domains()]
+        domains = [domain for domain in domains if domain]
+
+        stale_cpus = []
+        probe_cpus = []
+        for domain in domains:
+            if all(cpu in calib for cpu in domain):
+                probe_cpus.append(domain[0])
+            else:
+                stale_cpus.extend(domain)
+        probe = {}
+        if probe_cpus:
+            probe = RTA.calibrate(self.target, probe_cpus,
+                                  duration_s=RTAPP_CALIB_PROBE_S)
+
+        for domain in domains:
+            cpu = domain[0]
+            if cpu not in probe:
+                continue
+            error_pct = 100. * abs(probe[cpu] - calib[cpu]) / calib[cpu]
+            self._log.debug('CPU%d calibration: cached %d, probed %d',
+                            cpu, calib[cpu], probe[cpu])
+            if error_pct > RTAPP_CALIB_TOLERANCE_PCT:
+                self._log.info('CPU%d calibration changed by %.0f%%',
+                               cpu, error_pct)
+                stale_cpus.extend(domain)
+        return sorted(stale_cpus), probe
+
     def resolv_host(self, host=None):
         """
         Resolve a host name or IP address to a MAC address
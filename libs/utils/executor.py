@@ -18,14 +18,24 @@
 from bart.common.Analyzer import Analyzer
 import collections
 from collections import namedtuple
+from contextlib import contextmanager
 import datetime
 import gzip
 import json
+from multiprocessing import Pool
 import os
+import pandas as pd
+import random
 import re
+import shutil
+import signal
+import stat
+import tarfile
+import threading
 import time
 import trappy
 from devlib import TargetError
+from devlib.utils.misc import isiterable, list_to_ranges
 
 # Configure logging
 import logging
@@ -33,6 +43,9 @@ import logging
 # Add JSON parsing support
 from conf import JsonConf
 
+from results import RTAppRun, Stats
+from target_script import TargetScript
+from trace import Trace
 import wlgen
 
 from devlib import TargetError
@@ -165,7 +178,75 @@ class Executor():
           **iterations**
             Number of iterations for each workload/conf combination. Default
             is 1.
+
+          **order**
+            Order of the experiments. The target configurations using the
+            same kernel (and DTB) are grouped together, starting with the
+            installed kernel, to minimise the number of kernel installs and
+            reboots. Otherwise the declaration order is kept, unless
+            specified:
+
+            "conf"
+              Default. Run all the iterations of all the workloads of a
+              target configuration before moving to the next one. Each
+              kernel is installed at most once.
+            "interleaved"
+              Run one iteration of every (conf, wload) before starting the
+              next iteration. The kernel groups are only kept together within
+              each round, so every round installs each kernel once. Every
+              other round runs the target configurations in reverse order, so
+              that consecutive rounds share a kernel and a target
+              configuration.
+            "random"
+              Like "interleaved", with the target configurations of a kernel
+              and the workloads shuffled in each round.
+
+          **seed**
+            Seed of the random "order". Default is a random seed.
+
+          **planning_costs**
+            Optional. Overrides of :attr:`planning_costs_s` used to estimate
+            the campaign duration.
+
+          **postprocess**
+            Optional. Process the results of each experiment on the host while
+            the target runs the next ones. Dict with keys:
+
+            processes
+              Number of host worker processes. Default is the number of host
+              CPUs.
+
+            For each experiment, the collected trace is parsed (which leaves
+            the trace-cmd report output next to trace.dat for later
+            :class:`Trace` objects to reuse), rt-app performance stats are
+            computed into the experiment's performance.json and the stats of
+            the power of each channel of the energy meter samples.csv are
+            saved in power_stats.json. :meth:`run` returns once all the
+            experiments have been processed.
     :type experiments_conf: dict
+
+    :param resume: Resume a campaign interrupted in the same results
+        directory. The state of each (conf, wload, iteration) experiment is
+        recorded in ``experiments.json`` in the results directory as soon as
+        its artefacts have been collected. With resume, experiments whose
+        recorded files are all still present are not run again, and target
+        configurations with no experiment left to run are not applied.
+        Use the "results_dir" TestEnv setting to get the same results
+        directory across runs.
+    :type resume: bool
+
+    :param shard: Tuple (index, count). Only run the experiments of the
+        index-th of count contiguous blocks of target configurations, taken
+        in declaration order with the configurations using the same kernel
+        (and DTB) grouped together. Used by :class:`ExecutorFarm` to split a
+        campaign across targets, each target applying its own configurations
+        only.
+    :type shard: tuple(int, int)
+
+    The duration of each phase of the target configuration, workload setup
+    and experiments is recorded in a timings.json file in each experiment
+    out_dir, and in the results folder for the whole campaign, together with
+    a summary by phase. Use :meth:`span` to time additional phases.
     """
 
     critical_tasks = {
@@ -184,11 +265,28 @@ class Executor():
     freeze when using freeeze_userspace.
     """
 
-    def __init__(self, test_env, experiments_conf):
+    planning_costs_s = {
+        'kernel'     : 180,
+        'conf'       : 5,
+        'wload'      : 5,
+        'experiment' : 10,
+    }
+    """
+    Estimated durations used to plan the experiments: installing a kernel and
+    rebooting, applying a target configuration, setting up a workload and the
+    overhead of running an experiment, on top of the workload "duration".
+    """
+
+    def __init__(self, test_env, experiments_conf, resume=False, shard=None):
         # Initialize globals
         self._default_cgroup = None
         self._cgroup = None
 
+        # Timings of the campaign phases
+        self._spans = []
+        self._exp_spans = None
+        self._span_context = {}
+
         # Setup logging
         self._log = logging.getLogger('Executor')
 
@@ -239,6 +337,23 @@ class Executor():
 
         self._log.info('Total: %d experiments', self._exp_count)
 
+        self._shard = shard
+        if shard:
+            self._shard_tags = self._shard_confs(*shard)
+            self._log.info('Running shard %d of %d of the experiments, '
+                           'target configurations: %s', shard[0] + 1, shard[1],
+                           ', '.join(sorted(self._shard_tags)) or 'none')
+
+        # Load the state of a previous execution of the campaign
+        self._manifest_file = os.path.join(self.te.res_dir, 'experiments.json')
+        self._manifest = {}
+        self._resume = resume
+        if resume and os.path.isfile(self._manifest_file):
+            with open(self._manifest_file) as fh:
+                self._manifest = json.load(fh)
+            self._log.info('Resuming campaign, %d experiments completed',
+                           len(self._manifest))
+
         self._log.info('Results will be collected under:')
         self._log.info('      %s', self.te.res_dir)
 
@@ -247,38 +362,187 @@ class Executor():
             self._log.info('rt-app workloads found, installing tool on target')
             self.te.install_tools(['rt-app'])
 
+    def plan(self):
+        """
+        Get the order in which the experiments will run
+
+        :returns: tuple (schedule, duration_s), where schedule is the list of
+                  (conf, wload_name, iteration) tuples to run and duration_s
+                  the estimated duration of the campaign. Experiments
+                  completed in a resumed campaign are not included.
+        """
+        order = self._experiments_conf.get('order', 'conf')
+        if order not in ('conf', 'interleaved', 'random'):
+            raise ValueError('Configuration error: unsupported "order" '
+                             '[{}]'.format(order))
+        rng = random.Random(self._experiments_conf.get('seed'))
+
+        # Group target configurations by kernel, the installed one first
+        groups = collections.OrderedDict()
+        groups[(self.te.kernel, self.te.dtb)] = []
+        for tc in self._experiments_conf['confs']:
+            groups.setdefault(self._kernel_key(tc), []).append(tc)
+        groups = [confs for confs in groups.values() if confs]
+
+        wloads = list(self._experiments_conf['wloads'])
+        iterations = range(1, self._iterations + 1)
+        if order == 'conf':
+            rounds = [[(tc, wl_idx, itr_idx)
+                       for confs in groups for tc in confs
+                       for wl_idx in wloads for itr_idx in iterations]]
+        else:
+            rounds = []
+            for itr_idx in iterations:
+                round_groups = groups if itr_idx % 2 else \
+                               [confs[::-1] for confs in groups[::-1]]
+                experiments = []
+                for confs in round_groups:
+                    if order == 'random':
+                        confs = rng.sample(confs, len(confs))
+                    for tc in confs:
+                        if order == 'random':
+                            wloads = rng.sample(wloads, len(wloads))
+                        experiments.extend((tc, wl_idx, itr_idx)
+                                           for wl_idx in wloads)
+                rounds.append(experiments)
+
+        schedule = [exp for experiments in rounds for exp in experiments
+                    if self._in_shard(*exp) and not self._completed(*exp)]
+        return schedule, self._estimate_duration(schedule)
+
+    def _estimate_duration(self, schedule):
+        costs = dict(self.planning_costs_s)
+        costs.update(self._experiments_conf.get('planning_costs', {}))
+
+        duration = 0
+        kernel = (self.te.kernel, self.te.dtb)
+        current = None
+        wloads = set()
+        for tc, wl_idx, _ in schedule:
+            if tc is not current:
+                current = tc
+                duration += costs['conf']
+                if self._kernel_key(tc) != kernel:
+                    kernel = self._kernel_key(tc)
+                    duration += costs['kernel']
+            if (tc['tag'], wl_idx) not in wloads:
+                wloads.add((tc['tag'], wl_idx))
+                duration += costs['wload']
+            wlspec = self._experiments_conf['wloads'][wl_idx]
+            duration += costs['experiment']
+            duration += wlspec.get('conf', {}).get('duration') or 0
+        return duration
+
+    def _shard_confs(self, index, count):
+        """
+        Get the tags of the target configurations of a shard
+
+        The installed kernel is not taken into account, so that all the
+        targets of a farm agree on the split.
+        """
+        groups = collections.OrderedDict()
+        for tc in self._experiments_conf['confs']:
+            groups.setdefault(self._kernel_key(tc), []).append(tc)
+        confs = [tc for group in groups.values() for tc in group]
+        return set(tc['tag'] for pos, tc in enumerate(confs)
+                   if pos * count // len(confs) == index)
+
+    def _in_shard(self, tc, wl_idx, itr_idx):
+        return not self._shard or tc['tag'] in self._shard_tags
+
+    @staticmethod
+    def _kernel_key(tc):
+        return (tc.get('kernel'), tc.get('dtb'))
+
     def run(self):
         self._print_section('Experiments execution')
 
+        schedule, duration = self.plan()
+        self._log.info('Running %d experiments, estimated duration: %s',
+                       len(schedule),
+                       datetime.timedelta(seconds=int(duration)))
+
         self.experiments = []
+        self._collect_thread = None
+        self._wloads = {}
+        self._postprocess_init()
 
-        # Run all the configured experiments
-        exp_idx = 0
+        # Experiments completed in a previous run of the campaign. Their
+        # workloads are configured without configuring the target nor pushing
+        # anything to it, with the same run folder
+        self.te.run_dir = os.path.join(
+                self.target.working_directory, TGT_RUN_DIR)
         for tc in self._experiments_conf['confs']:
-            # TARGET: configuration
-            if not self._target_configure(tc):
-                continue
             for wl_idx in self._experiments_conf['wloads']:
-                # TEST: configuration
-                wload, test_dir = self._wload_init(tc, wl_idx)
                 for itr_idx in range(1, self._iterations + 1):
-                    exp = Experiment(
-                        wload_name=wl_idx,
-                        wload=wload,
-                        conf=tc,
-                        iteration=itr_idx,
-                        out_dir=os.path.join(test_dir, str(itr_idx)))
-                    self.experiments.append(exp)
-
-                    # WORKLOAD: execution
-                    self._wload_run(exp_idx, exp)
-                    exp_idx += 1
-            self._target_cleanup(tc)
+                    if self._completed(tc, wl_idx, itr_idx):
+                        self._log.info('Experiment [%s:%s] %d/%d already '
+                                       'completed', tc['tag'], wl_idx,
+                                       itr_idx, self._iterations)
+                        self._experiment_add(tc, wl_idx, itr_idx)
+
+        # Run all the planned experiments
+        current = None
+        failed_confs = set()
+        for exp_idx, (tc, wl_idx, itr_idx) in enumerate(schedule):
+            if tc['tag'] in failed_confs:
+                continue
 
+            # TARGET: configuration
+            if tc is not current:
+                if current is not None:
+                    self._target_cleanup(current)
+                current = None
+                if not self._target_configure(tc):
+                    failed_confs.add(tc['tag'])
+                    continue
+                current = tc
+                # Configuring the target may reboot it, e.g. to install the
+                # kernel of the next round, which wipes the run folder
+                pushed = set()
+
+            # WORKLOAD: execution
+            exp = self._experiment_add(tc, wl_idx, itr_idx)
+            # Push the workload files once the target is configured, the
+            # configuration may mount the run folder
+            if wl_idx not in pushed:
+                self._span_context = {'conf' : tc['tag'], 'wload' : wl_idx}
+                with self.span('wload_push'):
+                    exp.wload.push()
+                pushed.add(wl_idx)
+            wlspec = self._experiments_conf['wloads'][wl_idx]
+            self._cgroup = wlspec.get('cgroup', self._default_cgroup)
+            self._wload_run(exp_idx, exp)
+
+        if current is not None:
+            self._target_cleanup(current)
+
+        self._span_context = {}
+        with self.span('collect_wait'):
+            self._collect_wait()
         self._print_section('Experiments execution completed')
+        with self.span('postprocess_wait'):
+            self._postprocess_wait()
+        self._timings_report()
         self._log.info('Results available in:')
         self._log.info('      %s', self.te.res_dir)
 
+    def _experiment_add(self, tc, wl_idx, itr_idx):
+        # TEST: configuration, once per workload and target configuration
+        key = (tc['tag'], wl_idx)
+        if key not in self._wloads:
+            self._wloads[key] = self._wload_init(tc, wl_idx)
+        wload, test_dir = self._wloads[key]
+
+        exp = Experiment(
+            wload_name=wl_idx,
+            wload=wload,
+            conf=tc,
+            iteration=itr_idx,
+            out_dir=os.path.join(test_dir, str(itr_idx)))
+        self.experiments.append(exp)
+        return exp
+
 
 ################################################################################
 # Target Configuration
@@ -308,13 +572,17 @@ class Executor():
         # Setup the rootfs for the experiments
         self._setup_rootfs(tc)
 
-    def _setup_sched_features(self, tc):
+    def _setup_sched_features(self, tc, script=None):
         if 'sched_features' not in tc:
             self._log.debug('Scheduler features configuration not provided')
             return
         feats = tc['sched_features'].split(",")
         for feat in feats:
             self._log.info('Set scheduler feature: %s', feat)
+            if script:
+                script.execute('echo {0} > {1} && grep -qw {0} {1}'.format(
+                    feat, '/sys/kernel/debug/sched_features'))
+                continue
             self.target.execute('echo {} > /sys/kernel/debug/sched_features'.format(feat),
                                 as_root=True)
 
@@ -349,7 +617,7 @@ class Executor():
                                 "This is probably fine.")
             self._old_selinux_mode = None
 
-    def _setup_cpufreq(self, tc):
+    def _setup_cpufreq(self, tc, script=None):
         if 'cpufreq' not in tc:
             self._log.warning('cpufreq governor not specified, '
                               'using currently configured governor')
@@ -359,7 +627,13 @@ class Executor():
         self._log.info('Configuring all CPUs to use [%s] cpufreq governor',
                        cpufreq['governor'])
 
-        self.target.cpufreq.set_all_governors(cpufreq['governor'])
+        if script:
+            cpus = self.target.list_online_cpus()
+            for cpu in cpus:
+                script.write_value(CPUFREQ_PATH.format(cpu, 'scaling_governor'),
+                                   cpufreq['governor'])
+        else:
+            self.target.cpufreq.set_all_governors(cpufreq['governor'])
 
         if 'freqs' in cpufreq:
             if cpufreq['governor'] != 'userspace':
@@ -367,17 +641,36 @@ class Executor():
             self._log.info(r'%14s - CPU frequencies: %s',
                     'CPUFreq', str(cpufreq['freqs']))
             for cpu, freq in cpufreq['freqs'].iteritems():
+                if script:
+                    script.write_value(
+                        CPUFREQ_PATH.format(cpu, 'scaling_setspeed'), freq)
+                    continue
                 self.target.cpufreq.set_frequency(cpu, freq)
 
         if 'params' in cpufreq:
             self._log.info('governor params: %s', str(cpufreq['params']))
             for cpu in self.target.list_online_cpus():
+                if script:
+                    self._script_governor_tunables(
+                        script, cpu, cpufreq['governor'], cpufreq['params'])
+                    continue
                 self.target.cpufreq.set_governor_tunables(
                         cpu,
                         cpufreq['governor'],
                         **cpufreq['params'])
 
-    def _setup_cgroups(self, tc):
+    def _script_governor_tunables(self, script, cpu, governor, params):
+        # Tunables are either per-CPU or global, depending on the governor
+        for tunable, value in params.iteritems():
+            path = CPUFREQ_PATH.format(cpu, '{}/{}'.format(governor, tunable))
+            script.append('if [ -e {} ]; then'.format(path))
+            script.write_value(path, value)
+            script.append('else')
+            script.write_value('/sys/devices/system/cpu/cpufreq/{}/{}'\
+                               .format(governor, tunable), value)
+            script.append('fi')
+
+    def _setup_cgroups(self, tc, script=None):
         if 'cgroups' not in tc:
             return True
         # Setup default CGroup to run tasks into
@@ -395,10 +688,10 @@ class Executor():
                                   kind)
                 errors = True
                 continue
-            self._setup_controller(tc, controller)
+            self._setup_controller(tc, controller, script)
         return not errors
 
-    def _setup_controller(self, tc, controller):
+    def _setup_controller(self, tc, controller, script=None):
         kind = controller.kind
         # Configure each required groups for that controller
         errors = False
@@ -414,16 +707,28 @@ class Executor():
                                   kind, name)
                 errors = True
                 continue
-            self._setup_group(tc, group)
+            self._setup_group(tc, group, script)
         return not errors
 
-    def _setup_group(self, tc, group):
+    def _setup_group(self, tc, group, script=None):
         kind = group.controller.kind
         name = group.name
         # Configure each required attribute
-        group.set(**tc['cgroups']['conf'][kind][name])
-
-    def _setup_files(self, tc):
+        attrs = tc['cgroups']['conf'][kind][name]
+        if not script:
+            group.set(**attrs)
+            return
+        # The kernel normalises some attribute values (e.g. CPU lists), so
+        # only check that the writes succeed
+        for attr, value in attrs.iteritems():
+            if isiterable(value):
+                value = list_to_ranges(value)
+            if not group.controller._noprefix:
+                attr = '{}.{}'.format(kind, attr)
+            script.write_value(self.target.path.join(group.directory, attr),
+                               value, verify=False)
+
+    def _setup_files(self, tc, script=None):
         if 'files' not in tc:
             self._log.debug('\'files\' Configuration block not provided')
             return True
@@ -434,6 +739,9 @@ class Executor():
                 name = name[1:]
             self._log.info('File Write(check=%s): \'%s\' -> \'%s\'',
                          check, value, name)
+            if script:
+                script.write_value(name, value, True, check)
+                continue
             try:
                 self.target.write_value(name, value, True)
             except TargetError:
@@ -444,14 +752,42 @@ class Executor():
         return False
 
     def _target_configure(self, tc):
+        self._span_context = {'conf' : tc['tag']}
         self._print_header(
                 'configuring target for [{}] experiments'\
                 .format(tc['tag']))
-        self._setup_kernel(tc)
-        self._setup_sched_features(tc)
-        self._setup_cpufreq(tc)
-        self._setup_files(tc)
-        return self._setup_cgroups(tc)
+        with self.span('setup_kernel'):
+            self._setup_kernel(tc)
+        try:
+            with self.span('setup_script'):
+                return self._target_configure_script(tc)
+        except TargetError as e:
+            self._log.warning('Batched target configuration failed: %s', e)
+            self._log.warning('Configuring target one setting at a time')
+        with self.span('setup_commands'):
+            self._setup_sched_features(tc)
+            self._setup_cpufreq(tc)
+            self._setup_files(tc)
+            return self._setup_cgroups(tc)
+
+    def _target_configure_script(self, tc):
+        """
+        Apply a target configuration with a single script
+
+        Writes are read back and checked by the script, which stops at the
+        first error.
+
+        :raises: TargetError if the script failed
+        """
+        script = TargetScript(self.te, 'lisa_target_conf.sh')
+        self._setup_sched_features(tc, script)
+        self._setup_cpufreq(tc, script)
+        self._setup_files(tc, script)
+        result = self._setup_cgroups(tc, script)
+        if script.commands:
+            script.push()
+            script.run(as_root=True)
+        return result
 
     def _target_conf_flag(self, tc, flag):
         if 'flags' not in tc:
@@ -560,7 +896,7 @@ class Executor():
                         wl_idx, calibration = self.te.calibration())
             rtapp.conf(kind='profile', params=params, loadref=loadref,
                        cpus=cpus, run_dir=self.te.run_dir,
-                       duration=conf.get('duration'))
+                       duration=conf.get('duration'), push=False)
             return rtapp
 
         if conf['class'] == 'periodic':
@@ -573,7 +909,7 @@ class Executor():
                         wl_idx, calibration = self.te.calibration())
             rtapp.conf(kind='profile', params=params, loadref=loadref,
                        cpus=cpus, run_dir=self.te.run_dir,
-                       duration=conf.get('duration'))
+                       duration=conf.get('duration'), push=False)
             return rtapp
 
         if conf['class'] == 'custom':
@@ -583,7 +919,7 @@ class Executor():
                     params=conf['json'],
                     duration=conf['duration'],
                     loadref=loadref,
-                    cpus=cpus, run_dir=self.te.run_dir)
+                    cpus=cpus, run_dir=self.te.run_dir, push=False)
             return rtapp
 
         raise ValueError('unsupported \'class\' value for [{}] '
@@ -596,12 +932,12 @@ class Executor():
 
         if conf['class'] == 'messaging':
             perf_bench = wlgen.PerfMessaging(self.target, wl_idx)
-            perf_bench.conf(**conf['params'])
+            perf_bench.conf(push=False, **conf['params'])
             return perf_bench
 
         if conf['class'] == 'pipe':
             perf_bench = wlgen.PerfPipe(self.target, wl_idx)
-            perf_bench.conf(**conf['params'])
+            perf_bench.conf(push=False, **conf['params'])
             return perf_bench
 
         raise ValueError('unsupported "class" value for [{}] '
@@ -633,25 +969,37 @@ class Executor():
 
     def _wload_init(self, tc, wl_idx):
         tc_idx = tc['tag']
+        self._span_context = {'conf' : tc_idx, 'wload' : wl_idx}
 
         # Configure the test workload
         wlspec = self._experiments_conf['wloads'][wl_idx]
-        wload = self._wload_conf(wl_idx, wlspec)
+        with self.span('wload_conf'):
+            wload = self._wload_conf(wl_idx, wlspec)
 
-        # Keep track of platform configuration
+        # Keep the target information of a resumed campaign, the target may
+        # not be configured for this test
         test_dir = '{}/{}:{}:{}'\
             .format(self.te.res_dir, wload.wtype, tc_idx, wl_idx)
-        os.makedirs(test_dir)
-        self.te.platform_dump(test_dir)
+        if self._resume and \
+           os.path.isfile(os.path.join(test_dir, 'kernel.version')):
+            return wload, test_dir
+        if not os.path.isdir(test_dir):
+            os.makedirs(test_dir)
+
+        # Keep track of platform configuration
+        with self.span('platform_dump'):
+            self.te.platform_dump(test_dir)
 
         # Keep track of kernel configuration and version
-        config = self.target.config
-        with gzip.open(os.path.join(test_dir, 'kernel.config'), 'wb') as fh:
-            fh.write(config.text)
-        output = self.target.execute('{} uname -a'\
-                .format(self.target.busybox))
-        with open(os.path.join(test_dir, 'kernel.version'), 'w') as fh:
-            fh.write(output)
+        with self.span('kernel_config'):
+            config = self.target.config
+            with gzip.open(os.path.join(test_dir, 'kernel.config'),
+                           'wb') as fh:
+                fh.write(config.text)
+            output = self.target.execute('{} uname -a'\
+                    .format(self.target.busybox))
+            with open(os.path.join(test_dir, 'kernel.version'), 'w') as fh:
+                fh.write(output)
 
         return wload, test_dir
 
@@ -660,58 +1008,185 @@ class Executor():
         wload = experiment.wload
         tc_idx = tc['tag']
 
+        start = time.time()
+        self._exp_spans = []
+        self._span_context = {'conf' : tc_idx,
+                              'wload' : experiment.wload_name,
+                              'iteration' : experiment.iteration}
+
         self._print_title('Experiment {}/{}, [{}:{}] {}/{}'\
                 .format(exp_idx, self._exp_count,
                         tc_idx, experiment.wload_name,
                         experiment.iteration, self._iterations))
 
-        # Setup local results folder
+        # Setup local results folder, removing leftovers of an interrupted run
         self._log.debug('out_dir set to [%s]', experiment.out_dir)
-        os.system('mkdir -p ' + experiment.out_dir)
+        if os.path.isdir(experiment.out_dir):
+            shutil.rmtree(experiment.out_dir)
+        os.makedirs(experiment.out_dir)
 
         # Freeze all userspace tasks that we don't need for running tests
         need_thaw = False
         if self._target_conf_flag(tc, 'freeze_userspace'):
-            need_thaw = self._freeze_userspace()
+            with self.span('freeze'):
+                need_thaw = self._freeze_userspace()
+
+        # Wait for the artefacts of the previous experiment, so that their
+        # transfer does not disturb the measurements of this one
+        with self.span('collect_wait'):
+            self._collect_wait()
 
         # FTRACE: start (if a configuration has been provided)
         if self.te.ftrace and self._target_conf_flag(tc, 'ftrace'):
             self._log.warning('FTrace events collection enabled')
-            self.te.ftrace.start()
+            with self.span('ftrace_start'):
+                self.te.ftrace.start()
 
         # ENERGY: start sampling
         if self.te.emeter:
-            self.te.emeter.reset()
+            with self.span('emeter_reset'):
+                self.te.emeter.reset()
 
-        # WORKLOAD: Run the configured workload
-        wload.run(out_dir=experiment.out_dir, cgroup=self._cgroup)
+        # WORKLOAD: Run the configured workload, its output files are
+        # collected together with the trace
+        with self.span('wload_run'):
+            wload.run(out_dir=experiment.out_dir, cgroup=self._cgroup,
+                      pull_output=False)
 
         # ENERGY: collect measurements
         if self.te.emeter:
-            self.te.emeter.report(experiment.out_dir)
+            with self.span('emeter_report'):
+                self.te.emeter.report(experiment.out_dir)
 
         # FTRACE: stop and collect measurements
-        if self.te.ftrace and self._target_conf_flag(tc, 'ftrace'):
-            self.te.ftrace.stop()
-
-            trace_file = experiment.out_dir + '/trace.dat'
-            self.te.ftrace.get_trace(trace_file)
-            self._log.info('Collected FTrace binary trace:')
-            self._log.info('   %s',
-                           trace_file.replace(self.te.res_dir, '<res_dir>'))
+        trace = bool(self.te.ftrace) and self._target_conf_flag(tc, 'ftrace')
+        if trace:
+            with self.span('ftrace_stop'):
+                self.te.ftrace.stop()
 
             stats_file = experiment.out_dir + '/trace_stat.json'
-            self.te.ftrace.get_stats(stats_file)
+            with self.span('ftrace_stats'):
+                self.te.ftrace.get_stats(stats_file)
             self._log.info('Collected FTrace function profiling:')
             self._log.info('   %s',
                            stats_file.replace(self.te.res_dir, '<res_dir>'))
 
         # Unfreeze the tasks we froze
         if need_thaw:
-            self._thaw_userspace()
+            with self.span('thaw'):
+                self._thaw_userspace()
+
+        # Transfer the trace and workload output files while the next
+        # experiment is being set up
+        with self.span('collect_start'):
+            self._collect_start(exp_idx, experiment, trace)
+
+        self._add_span('experiment', start, time.time() - start)
+        self._write_timings(experiment.out_dir, self._exp_spans)
+        self._exp_spans = None
 
         self._print_footer()
 
+    def _collect_start(self, exp_idx, experiment, trace):
+        files = experiment.wload.getTargetFiles()
+        if not files and not trace:
+            self._experiment_done(experiment)
+            return
+
+        # Archive all the artefacts on the target, in a folder specific to
+        # this experiment so that the next one can start right away
+        stage_dir = self.target.path.join(self.target.working_directory,
+                                          'lisa_exp_{}'.format(exp_idx))
+        archive = stage_dir + '.tar'
+        commands = ['rm -rf {0}'.format(stage_dir),
+                    'mkdir -p {0}'.format(stage_dir)]
+        if files:
+            commands.append('cp {} {}'.format(' '.join(files), stage_dir))
+        if trace:
+            commands.append('{} extract -o {}/trace.dat'.format(
+                self.te.ftrace.target_binary, stage_dir))
+        commands.append('cd {} && {} tar -cf {} .'.format(
+            stage_dir, self.target.busybox, archive))
+        commands.append('chmod 666 {}'.format(archive))
+
+        # Fail on the first command failing, always removing the staging
+        # folder
+        self.target.execute('({}); ret=$?; rm -rf {}; exit $ret'.format(
+            ' && '.join(commands), stage_dir), as_root=True)
+
+        self._collect_thread = _CollectThread(self.target, archive,
+                                              experiment)
+        self._collect_thread.start()
+
+    def _collect_wait(self):
+        """
+        Wait for the artefacts of the last experiment to be available locally
+
+        This is a barrier for any step needing the experiment files on the
+        host, e.g. post-processing.
+        """
+        if self._collect_thread is not None:
+            collect, self._collect_thread = self._collect_thread, None
+            collect.join()
+            self.target.remove(collect.archive, as_root=True)
+            if collect.error:
+                raise collect.error
+            for name in collect.names:
+                self._log.info('Collected [%s]', name)
+            self._add_collect_span(collect)
+            self._experiment_done(collect.experiment)
+
+    def _experiment_done(self, experiment):
+        self._checkpoint(experiment)
+        self._postprocess_start(experiment)
+
+################################################################################
+# Campaign Checkpointing
+################################################################################
+
+    @staticmethod
+    def _manifest_key(tc, wl_idx, itr_idx):
+        return '{}:{}:{}'.format(tc['tag'], wl_idx, itr_idx)
+
+    def _completed(self, tc, wl_idx, itr_idx):
+        """
+        Check if an experiment completed in a previous run of the campaign,
+        and that all its files are still there, with the same size
+        """
+        entry = self._manifest.get(self._manifest_key(tc, wl_idx, itr_idx))
+        if entry is None:
+            return False
+        out_dir = entry['out_dir']
+        for name, size in entry['files'].iteritems():
+            path = os.path.join(out_dir, name)
+            if not os.path.isfile(path) or os.path.getsize(path) != size:
+                self._log.warning('Experiment [%s] file [%s] missing or '
+                                  'changed, running it again', out_dir, name)
+                del self._manifest[self._manifest_key(tc, wl_idx, itr_idx)]
+                return False
+        return True
+
+    def _checkpoint(self, experiment):
+        """
+        Record the completion of an experiment in the campaign manifest
+        """
+        out_dir = experiment.out_dir
+        files = {}
+        for root, _, names in os.walk(out_dir):
+            for name in names:
+                path = os.path.join(root, name)
+                files[os.path.relpath(path, out_dir)] = os.path.getsize(path)
+
+        key = self._manifest_key(experiment.conf, experiment.wload_name,
+                                 experiment.iteration)
+        self._manifest[key] = {'out_dir' : out_dir, 'files' : files}
+
+        # Replace the manifest atomically, it must always be consistent
+        tmp_file = self._manifest_file + '.tmp'
+        with open(tmp_file, 'w') as fh:
+            json.dump(self._manifest, fh, indent=4, sort_keys=True)
+        os.rename(tmp_file, self._manifest_file)
+
     def _freeze_userspace(self):
         if 'cgroups' not in self.target.modules:
             raise RuntimeError(
@@ -733,6 +1208,134 @@ class Executor():
         self._log.info('Un-freezing userspace tasks')
         self.te.target.cgroups.freeze(thaw=True)
 
+################################################################################
+# Timings
+################################################################################
+
+    @contextmanager
+    def span(self, name):
+        """
+        Time a phase of the campaign
+
+        The span is recorded with the target configuration, workload and
+        iteration being processed, if any. Tests can time their own steps
+        with::
+
+            with self.executor.span('my_step'):
+                ...
+
+        :param name: Name of the phase
+        :type name: str
+        """
+        start = time.time()
+        try:
+            yield
+        finally:
+            self._add_span(name, start, time.time() - start)
+
+    def _add_span(self, name, start, duration):
+        span = dict(self._span_context, name=name, start=start,
+                    duration_s=duration)
+        self._spans.append(span)
+        if self._exp_spans is not None:
+            self._exp_spans.append(span)
+
+    def _add_collect_span(self, collect):
+        # The artefacts are pulled in the background, after the experiment
+        # timings have been written
+        experiment = collect.experiment
+        span = {'name' : 'collect_pull', 'start' : collect.start,
+                'duration_s' : collect.duration,
+                'conf' : experiment.conf['tag'],
+                'wload' : experiment.wload_name,
+                'iteration' : experiment.iteration}
+        self._spans.append(span)
+
+        timings_file = os.path.join(experiment.out_dir, 'timings.json')
+        spans = []
+        if os.path.isfile(timings_file):
+            with open(timings_file) as fh:
+                spans = json.load(fh)
+        self._write_timings(experiment.out_dir, spans + [span])
+
+    @staticmethod
+    def _write_timings(out_dir, spans):
+        with open(os.path.join(out_dir, 'timings.json'), 'w') as fh:
+            json.dump(spans, fh, indent=4, sort_keys=True)
+
+    def _timings_report(self):
+        """
+        Log and save the time spent in each phase of the campaign
+        """
+        summary = {}
+        for span in self._spans:
+            stats = summary.setdefault(span['name'], {
+                'count' : 0, 'total_s' : 0.0, 'max_s' : 0.0})
+            stats['count'] += 1
+            stats['total_s'] += span['duration_s']
+            stats['max_s'] = max(stats['max_s'], span['duration_s'])
+        for stats in summary.itervalues():
+            stats['avg_s'] = stats['total_s'] / stats['count']
+
+        timings_file = os.path.join(self.te.res_dir, 'timings.json')
+        with open(timings_file, 'w') as fh:
+            json.dump({'spans' : self._spans, 'summary' : summary}, fh,
+                      indent=4, sort_keys=True)
+
+        self._log.info('Time spent by phase:')
+        for name, stats in sorted(summary.iteritems(),
+                                  key=lambda item: -item[1]['total_s']):
+            self._log.info('   %-16s %9.3f [s] total, %4d x %8.3f [s] avg',
+                           name, stats['total_s'], stats['count'],
+                           stats['avg_s'])
+
+################################################################################
+# Host Post-processing
+################################################################################
+
+    def _postprocess_init(self):
+        self._postprocess_pool = None
+        self._postprocess_jobs = []
+
+        conf = self._experiments_conf.get('postprocess')
+        if conf is None:
+            return
+        processes = conf.get('processes')
+        self._log.info('Post-processing results on host while running '
+                       'experiments')
+        self._postprocess_pool = Pool(processes,
+                                      initializer=_postprocess_worker_init)
+
+    def _postprocess_start(self, experiment):
+        if self._postprocess_pool is None:
+            return
+
+        events = None
+        if self.te.ftrace and self._target_conf_flag(experiment.conf, 'ftrace'):
+            events = self.te.ftrace.events
+        job = self._postprocess_pool.apply_async(
+            _postprocess_experiment,
+            (experiment.out_dir, experiment.wload.wtype,
+             self.te.platform, events))
+        self._postprocess_jobs.append((experiment, job))
+
+    def _postprocess_wait(self):
+        if self._postprocess_pool is None:
+            return
+
+        self._log.info('Waiting for results post-processing to complete...')
+        self._postprocess_pool.close()
+        self._postprocess_pool.join()
+        self._postprocess_pool = None
+
+        for experiment, job in self._postprocess_jobs:
+            try:
+                job.get()
+            except Exception as e:
+                self._log.warning('Post-processing of [%s] failed: %s',
+                                  experiment.out_dir, e)
+        self._postprocess_jobs = []
+
 ################################################################################
 # Utility Functions
 ################################################################################
@@ -762,6 +1365,198 @@ class Executor():
 # Globals
 ################################################################################
 
+class ExecutorFarm(object):
+    """
+    Run a campaign of experiments concurrently on several identical targets
+
+    The experiments are split across one :class:`Executor` per target, which
+    run in their own threads. Each target runs all the experiments of its
+    share of the target configurations, see the shard parameter of
+    :class:`Executor`, so targets are idle when there are fewer target
+    configurations than targets. Each target keeps its results in the results
+    folder of its TestEnv, and a merged view of the campaign, with the same
+    layout as the results folder of a single Executor, is built in the farm
+    results folder. That folder can be used with :class:`Results` and
+    :class:`Report`.
+
+    :param test_envs: TestEnv of each target. Each must have its own results
+        folder.
+    :type test_envs: list(TestEnv)
+
+    :param experiments_conf: Experiments configuration, see :class:`Executor`
+    :type experiments_conf: dict or str
+
+    :param res_dir: Folder for the merged view of the results. Defaults to a
+        timestamped "farm_" folder next to the first TestEnv results folder.
+    :type res_dir: str
+
+    :param resume: Resume an interrupted campaign, see :class:`Executor`
+    :type resume: bool
+
+    :ivar experiments: List of :class:`Experiment` s executed by all the
+        targets, with out_dir in the merged view. Only available after
+        :meth:`run` has been called.
+    """
+
+    executor_class = Executor
+    """Class of the executor used for each target"""
+
+    def __init__(self, test_envs, experiments_conf, res_dir=None,
+                 resume=False):
+        self._log = logging.getLogger('ExecutorFarm')
+
+        res_dirs = [te.res_dir for te in test_envs]
+        if len(set(res_dirs)) != len(res_dirs):
+            raise ValueError('Each TestEnv must have its own results folder')
+
+        if res_dir is None:
+            res_dir = datetime.datetime.now().strftime(
+                os.path.join(os.path.dirname(res_dirs[0]),
+                             'farm_%Y%m%d_%H%M%S'))
+        self.res_dir = res_dir
+
+        self.executors = [
+            self.executor_class(te, experiments_conf, resume=resume,
+                                shard=(idx, len(test_envs)))
+            for idx, te in enumerate(test_envs)]
+
+    def run(self):
+        errors = [None] * len(self.executors)
+
+        def run_executor(idx):
+            try:
+                self.executors[idx].run()
+            except Exception as e:
+                self._log.exception('Execution on target %d failed', idx)
+                errors[idx] = e
+
+        threads = [threading.Thread(target=run_executor, args=(idx,),
+                                    name='Executor{}'.format(idx))
+                   for idx in range(len(self.executors))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.experiments = self._merge()
+        self._log.info('Merged results available in:')
+        self._log.info('      %s', self.res_dir)
+
+        for error in errors:
+            if error is not None:
+                raise error
+
+    def _merge(self):
+        """
+        Link the results of all the targets into the farm results folder
+
+        :returns: list of the executed experiments, with out_dir in the farm
+                  results folder
+        """
+        experiments = []
+        for executor in self.executors:
+            for exp in getattr(executor, 'experiments', []):
+                out_dir = os.path.join(
+                    self.res_dir, os.path.relpath(exp.out_dir,
+                                                  executor.te.res_dir))
+                test_dir = os.path.dirname(out_dir)
+                if not os.path.isdir(test_dir):
+                    os.makedirs(test_dir)
+
+                # Link the experiment and the files describing the target
+                src_test_dir = os.path.dirname(os.path.abspath(exp.out_dir))
+                links = [(os.path.abspath(exp.out_dir), out_dir)]
+                links += [(os.path.join(src_test_dir, name),
+                           os.path.join(test_dir, name))
+                          for name in os.listdir(src_test_dir)
+                          if os.path.isfile(os.path.join(src_test_dir, name))]
+                for src, dst in links:
+                    if os.path.lexists(dst):
+                        if os.path.islink(dst):
+                            continue
+                        os.remove(dst)
+                    os.symlink(src, dst)
+
+                experiments.append(exp._replace(out_dir=out_dir))
+        return experiments
+
+class _CollectThread(threading.Thread):
+    """
+    Pull an archive of experiment artefacts from the target and extract it
+    into the experiment out_dir
+    """
+
+    def __init__(self, target, archive, experiment):
+        super(_CollectThread, self).__init__(name='Collect')
+        self.daemon = True
+        self.target = target
+        self.archive = archive
+        self.experiment = experiment
+        self.names = []
+        self.error = None
+
+    def run(self):
+        out_dir = self.experiment.out_dir
+        local_archive = os.path.join(out_dir, os.path.basename(self.archive))
+        self.start = time.time()
+        try:
+            self.target.pull(self.archive, local_archive)
+            tar = tarfile.open(local_archive)
+            try:
+                self.names = [os.path.normpath(m.name)
+                              for m in tar.getmembers() if m.isfile()]
+                tar.extractall(out_dir)
+            finally:
+                tar.close()
+            os.remove(local_archive)
+        except Exception as e:
+            self.error = e
+        self.duration = time.time() - self.start
+
+def _postprocess_worker_init():
+    """
+    Initialize an Executor post-processing worker process
+
+    Workers are forked from a process connected to the target: close the
+    inherited sockets and terminals (e.g. of ssh, telnet or adb server
+    connections) so that workers can neither use them nor keep them open.
+    The pool itself communicates through pipes. Interrupts are left to the
+    parent process.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if not os.path.isdir('/proc/self/fd'):
+        return
+    for fd in os.listdir('/proc/self/fd'):
+        fd = int(fd)
+        if fd <= 2:
+            continue
+        try:
+            mode = os.fstat(fd).st_mode
+        except OSError:
+            continue
+        if stat.S_ISSOCK(mode) or os.isatty(fd):
+            os.close(fd)
+
+def _postprocess_experiment(out_dir, wtype, platform, events):
+    """
+    Host post-processing of an experiment, run in an Executor worker process
+    """
+    if events and os.path.isfile(os.path.join(out_dir, 'trace.dat')):
+        Trace(platform, out_dir, events)
+    if wtype == 'rtapp':
+        RTAppRun(os.path.basename(out_dir), out_dir)
+
+    samples_file = os.path.join(out_dir, 'samples.csv')
+    if os.path.isfile(samples_file):
+        samples = pd.read_csv(samples_file)
+        stats = {}
+        for column in samples.columns:
+            if column.endswith('_power'):
+                channel = column.rsplit('_', 1)[0]
+                stats[channel] = Stats(samples[column].dropna()).get()
+        with open(os.path.join(out_dir, 'power_stats.json'), 'w') as fh:
+            json.dump(stats, fh, indent=4, sort_keys=True)
+
 # Regular expression for comments
 JSON_COMMENTS_RE = re.compile(
     '(^)?[^\S\n]*/(?:\*(.*?)\*/[^\S\n]*|/[^\n]*)($)?',
@@ -770,6 +1565,7 @@ JSON_COMMENTS_RE = re.compile(
 
 # Target specific paths
 TGT_RUN_DIR = 'run_dir'
+CPUFREQ_PATH = '/sys/devices/system/cpu/cpu{}/cpufreq/{}'
 
 # Logging formatters
 FMT_SECTION = r'{:#<80}'.format('')
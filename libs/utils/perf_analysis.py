@@ -27,8 +27,7 @@ import sys
 import trappy
 import logging
 
-# Regexp to match an rt-app generated logfile
-TASK_NAME_RE = re.compile('.*\/rt-app-(.+)-[0-9]+.log')
+from rtapp_log import TASK_NAME_RE, load_rtapp_log, rtapp_task_name
 
 class PerfAnalysis(object):
 
@@ -54,11 +53,7 @@ class PerfAnalysis(object):
         self.datadir = datadir
 
     def __taskNameFromLog(self, logfile):
-        tname_match = re.search(TASK_NAME_RE, logfile)
-        if tname_match is None:
-            raise ValueError('The logfile [{0:s}] is not from rt-app'\
-                    .format(logfile))
-        return tname_match.group(1)
+        return rtapp_task_name(logfile)
 
     def __logfileFromTaskName(self, taskname):
         for logfile in glob.glob(
@@ -99,6 +94,9 @@ class PerfAnalysis(object):
     def __loadRTAData(self, datadir, tasks):
         """
         Load peformance data of an rt-app workload
+
+        Every sample of the logs is loaded, including the first one, see
+        :func:`rtapp_log.load_rtapp_log`.
         """
 
         if tasks is None:
@@ -112,22 +110,20 @@ class PerfAnalysis(object):
             # Lookup for specified rt-app task logfile into specified datadir
             for task in tasks:
                 logfile = self.__logfileFromTaskName(task)
-                self.perf_data[task_name] = {}
-                self.perf_data[task_name]['logfile'] = logfile
-                self._log.debug('Found rt-app logfile for task [%s]', task_name)
+                self.perf_data[task] = {}
+                self.perf_data[task]['logfile'] = logfile
+                self._log.debug('Found rt-app logfile for task [%s]', task)
 
         # Load all the found logfile into a dataset
         for task in self.perf_data.keys():
             self._log.debug('Loading dataframe for task [%s]...', task)
-            df = pd.read_table(self.logfile(task),
-                    sep='\s+',
-                    skiprows=1,
-                    header=0,
-                    usecols=[1,2,3,4,7,8,9,10],
-                    names=[
-                        'Cycles', 'Run' ,'Period', 'Timestamp',
-                        'Slack', 'CRun', 'CPeriod', 'WKPLatency'
-                    ])
+            df = load_rtapp_log(self.logfile(task))
+            df = df[['perf', 'run', 'period', 'start',
+                     'slack', 'c_run', 'c_period', 'wu_lat']]
+            df.columns = [
+                'Cycles', 'Run' ,'Period', 'Timestamp',
+                'Slack', 'CRun', 'CPeriod', 'WKPLatency'
+            ]
             # Normalize time to [s] with origin on the first event
             start_time = df['Timestamp'][0]/1e6
             df['Time'] = df['Timestamp']/1e6 - start_time
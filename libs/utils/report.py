@@ -22,6 +22,7 @@ import json
 import math
 import numpy as np
 import os
+import pandas as pd
 import re
 import sys
 import logging
@@ -35,7 +36,26 @@ from results import Results
 DEFAULT_COMPARE = [(r'base_', r'test_')]
 
 class Report(object):
+    """
+    Compare the results of test configurations against base configurations
 
+    The results are loaded from results.json into :attr:`df`, a DataFrame
+    with one row per workload type, workload, configuration and metric. The
+    comparisons of each test configuration with each base configuration of
+    the same workload are computed into :attr:`comparisons`.
+
+    :param results_dir: Folder containing the experiments results
+    :type results_dir: str
+
+    :param compare: List of (base, test) regexps matching the configurations
+                    to compare
+    :type compare: list(tuple(str, str))
+
+    :param formats: How to report the comparisons: 'relative' or 'absolute'
+                    tables, or 'csv' and 'parquet' to export
+                    :attr:`comparisons` into the results folder
+    :type formats: list(str)
+    """
 
     def __init__(self, results_dir, compare=None, formats=['relative']):
         self.results_json = results_dir + '/results.json'
@@ -68,9 +88,116 @@ class Report(object):
             test_rexp = re.compile(test_rexp, re.DOTALL)
             self.compare.append((base_rexp, test_rexp))
 
+        self.df = self._results_df(self.results)
+        self.comparisons = self._compare(self.df)
+
+        # Export the comparisons
+        if 'csv' in formats:
+            self.to_csv(os.path.join(results_dir, 'report.csv'))
+        if 'parquet' in formats:
+            self.to_parquet(os.path.join(results_dir, 'report.parquet'))
+
         # Report all supported workload classes
-        self.__rtapp_report(formats)
-        self.__default_report(formats)
+        if 'absolute' in formats or 'relative' in formats or \
+           not set(formats).intersection(EXPORT_FORMATS):
+            self.__rtapp_report(formats)
+            self.__default_report(formats)
+
+    def to_csv(self, path):
+        """
+        Save :attr:`comparisons` into a CSV file
+        """
+        self._log.info('Save comparisons into [%s]...', path)
+        self.comparisons.to_csv(path, index=False)
+
+    def to_parquet(self, path):
+        """
+        Save :attr:`comparisons` into a Parquet file
+
+        Requires either the pyarrow or fastparquet package.
+        """
+        self._log.info('Save comparisons into [%s]...', path)
+        self.comparisons.to_parquet(path, index=False)
+
+    ############################### DATAFRAMES #################################
+
+    @staticmethod
+    def _results_df(results):
+        """
+        Flatten results.json into a DataFrame with a column for each stat
+        """
+        rows = [dict(stats, wtype=wtype, wload=wload, conf=conf,
+                     metric='{}.{}'.format(group, metric))
+                for wtype, wloads in results.iteritems()
+                for wload, confs in wloads.iteritems()
+                for conf, groups in confs.iteritems()
+                for group, metrics in groups.iteritems()
+                for metric, stats in metrics.iteritems()]
+        columns = ['wtype', 'wload', 'conf', 'metric']
+        df = pd.DataFrame(rows)
+        if df.empty:
+            return pd.DataFrame(columns=columns + ['avg', 'max'])
+        stats = sorted(set(df.columns) - set(columns))
+        return df[columns + stats].sort_values(columns)\
+                 .reset_index(drop=True)
+
+    def _compare(self, df):
+        """
+        Compare the metrics of each test configuration with each base
+        configuration of the same workload
+
+        :returns: a DataFrame with the base and test configurations, the
+                  index in :attr:`compare` of the first regexps matching
+                  them, their average and max value of each metric, and the
+                  absolute (test - base) and relative (in percent of base)
+                  deltas of the averages. The rows are sorted in the order
+                  of the text reports.
+        """
+        keys = ['wtype', 'wload', 'metric']
+        values = df[keys + ['conf', 'avg', 'max']]
+        comparisons = []
+        for cmp_idx, (base_rexp, test_rexp) in enumerate(self.compare):
+            bases = values[values.conf.apply(
+                lambda conf: bool(base_rexp.match(conf)))]
+            tests = values[values.conf.apply(
+                lambda conf: bool(test_rexp.match(conf)))]
+            comparisons.append(bases.merge(tests, on=keys,
+                                           suffixes=('_base', '_test'))
+                                    .assign(compare=cmp_idx))
+
+        columns = ['wtype', 'wload', 'base', 'test', 'compare', 'metric',
+                   'base_avg', 'test_avg', 'base_max', 'test_max']
+        if not comparisons:
+            return pd.DataFrame(columns=columns + ['delta', 'delta_pct'])
+        cmp_df = pd.concat(comparisons).rename(columns={
+            'conf_base' : 'base', 'conf_test' : 'test',
+            'avg_base' : 'base_avg', 'avg_test' : 'test_avg',
+            'max_base' : 'base_max', 'max_test' : 'test_max'})
+        cmp_df = cmp_df[cmp_df.base != cmp_df.test][columns]\
+                 .drop_duplicates(['wtype', 'wload', 'base', 'test', 'metric'])
+
+        cmp_df['delta'] = cmp_df.test_avg - cmp_df.base_avg
+        cmp_df['delta_pct'] = 100.0 * cmp_df.delta / \
+                              cmp_df.base_avg.where(cmp_df.base_avg != 0)
+        return cmp_df.sort_values(['wtype', 'wload', 'base', 'compare',
+                                   'test', 'metric'])\
+                     .reset_index(drop=True)
+
+    def _compare_rows(self, wtype):
+        """
+        Iterate over the comparisons of a workload type in the order of
+        :attr:`comparisons`, one row per (wload, base, test) with a column
+        for each metric
+        """
+        cmp_df = self.comparisons[self.comparisons.wtype == wtype]
+        if cmp_df.empty:
+            return
+        table = cmp_df.set_index(['wload', 'base', 'test', 'metric'])\
+                      [['base_avg', 'test_avg', 'base_max', 'test_max']]\
+                      .unstack('metric')
+        pairs = cmp_df.drop_duplicates(['wload', 'base', 'test'])
+        for wload, base, test in zip(pairs.wload, pairs.base, pairs.test):
+            yield wload, base, test, table.loc[(wload, base, test)]
 
     ############################### REPORT RTAPP ###############################
 
@@ -108,52 +235,38 @@ class Report(object):
                         'LITTLE', 'big', 'Total',
                         'PerfIndex', 'NegSlacks', 'EDP1', 'EDP2', 'EDP3')
 
-        # For each test
-        _results = self.results['rtapp']
-        for tid in sorted(_results.keys()):
-            new_test = True
-            # For each configuration...
-            for base_idx in sorted(_results[tid].keys()):
-                # Which matches at least on base regexp
-                for (base_rexp, test_rexp) in self.compare:
-                    if not base_rexp.match(base_idx):
-                        continue
-                    # Look for a configuration which matches the test regexp
-                    for test_idx in sorted(_results[tid].keys()):
-                        if test_idx == base_idx:
-                            continue
-                        if new_test:
-                            print '{:-<37s}+{:-<35s}+{:-<56s}+'\
-                                    .format('','', '')
-                            self.__rtapp_reference(tid, base_idx)
-                            new_test = False
-                        if test_rexp.match(test_idx) == None:
-                            continue
-                        self.__rtapp_compare(tid, base_idx, test_idx, formats)
+        # For each test, compare each test configuration with its base
+        prev_tid = None
+        for tid, base_idx, test_idx, row in self._compare_rows('rtapp'):
+            if tid != prev_tid:
+                print '{:-<37s}+{:-<35s}+{:-<56s}+'\
+                        .format('','', '')
+                self.__rtapp_reference(tid, base_idx, row)
+                prev_tid = tid
+            self.__rtapp_compare(tid, base_idx, test_idx, row, formats)
 
         print ''
 
-    def __rtapp_reference(self, tid, base_idx):
-        _results = self.results['rtapp']
-
+    def __rtapp_reference(self, tid, base_idx, row):
         self._log.debug('Test %s: compare against [%s] base',
                         tid, base_idx)
         res_line = '{0:12s}: {1:22s} | '.format(tid, base_idx)
 
         # Dump all energy metrics
         for cpus in ['LITTLE', 'big', 'Total']:
-            res_base = _results[tid][base_idx]['energy'][cpus]['avg']
+            res_base = row['base_avg']['energy.' + cpus]
             # Dump absolute values
             res_line += ' {0:10.3f}'.format(res_base)
         res_line += ' |'
 
         # If available, dump also performance results
-        if 'performance' not in _results[tid][base_idx].keys():
+        if 'performance.perf_avg' not in row['base_avg'] or \
+           pd.isnull(row['base_avg']['performance.perf_avg']):
             print res_line
             return
 
         for pidx in ['perf_avg', 'slack_pct', 'edp1', 'edp2', 'edp3']:
-            res_base = _results[tid][base_idx]['performance'][pidx]['avg']
+            res_base = row['base_avg']['performance.' + pidx]
 
             self._log.debug('idx: %s, base: %s', pidx, res_base)
 
@@ -170,17 +283,15 @@ class Report(object):
         res_line += ' |'
         print res_line
 
-    def __rtapp_compare(self, tid, base_idx, test_idx, formats):
-        _results = self.results['rtapp']
-
+    def __rtapp_compare(self, tid, base_idx, test_idx, row, formats):
         self._log.debug('Test %s: compare %s with %s',
                         tid, base_idx, test_idx)
         res_line = '{0:12s}:   {1:20s} | '.format(tid, test_idx)
 
         # Dump all energy metrics
         for cpus in ['LITTLE', 'big', 'Total']:
-            res_base = _results[tid][base_idx]['energy'][cpus]['avg']
-            res_test = _results[tid][test_idx]['energy'][cpus]['avg']
+            res_base = row['base_avg']['energy.' + cpus]
+            res_test = row['test_avg']['energy.' + cpus]
             speedup_cnt =  res_test - res_base
             if 'absolute' in formats:
                 res_line += ' {0:10.2f}'.format(speedup_cnt)
@@ -195,13 +306,14 @@ class Report(object):
         res_line += ' |'
 
         # If available, dump also performance results
-        if 'performance' not in _results[tid][base_idx].keys():
+        if 'performance.perf_avg' not in row['base_avg'] or \
+           pd.isnull(row['base_avg']['performance.perf_avg']):
             print res_line
             return
 
         for pidx in ['perf_avg', 'slack_pct', 'edp1', 'edp2', 'edp3']:
-            res_base = _results[tid][base_idx]['performance'][pidx]['avg']
-            res_test = _results[tid][test_idx]['performance'][pidx]['avg']
+            res_base = row['base_avg']['performance.' + pidx]
+            res_test = row['test_avg']['performance.' + pidx]
 
             self._log.debug('idx: %s, base: %s, test: %s',
                             pidx, res_base, res_test)
@@ -218,10 +330,7 @@ class Report(object):
             # Compute difference base-vs-test
             if 'edp' in pidx:
                 speedup_cnt = res_base - res_test
-                if 'absolute':
-                    res_line += ' {0:10.2e}'.format(speedup_cnt)
-                else:
-                    res_line += ' {0:s}'.format(TestColors.rate(speedup_pct))
+                res_line += ' {0:10.2e}'.format(speedup_cnt)
 
         res_line += ' |'
         print res_line
@@ -270,32 +379,17 @@ class Report(object):
 
         # For each default test
         for wtype in wtypes:
-            _results = self.results[wtype]
-            for tid in sorted(_results.keys()):
-                new_test = True
-                # For each configuration...
-                for base_idx in sorted(_results[tid].keys()):
-                    # Which matches at least on base regexp
-                    for (base_rexp, test_rexp) in self.compare:
-                        if not base_rexp.match(base_idx):
-                            continue
-                        # Look for a configuration which matches the test regexp
-                        for test_idx in sorted(_results[tid].keys()):
-                            if test_idx == base_idx:
-                                continue
-                            if new_test:
-                                print '{:-<37s}+{:-<35s}+{:-<56s}+'\
-                                        .format('','', '')
-                                new_test = False
-                            if not test_rexp.match(test_idx):
-                                continue
-                            self.__default_compare(wtype, tid, base_idx, test_idx, formats)
+            prev_tid = None
+            for tid, base_idx, test_idx, row in self._compare_rows(wtype):
+                if tid != prev_tid:
+                    print '{:-<37s}+{:-<35s}+{:-<56s}+'\
+                            .format('','', '')
+                    prev_tid = tid
+                self.__default_compare(tid, base_idx, test_idx, row, formats)
 
         print ''
 
-    def __default_compare(self, wtype, tid, base_idx, test_idx, formats):
-        _results = self.results[wtype]
-
+    def __default_compare(self, tid, base_idx, test_idx, row, formats):
         self._log.debug('Test %s: compare %s with %s',
                         tid, base_idx, test_idx)
         res_comp = '{0:s} vs {1:s}'.format(test_idx, base_idx)
@@ -306,15 +400,15 @@ class Report(object):
 
             # If either base of test have a 0 MAX energy, this measn that
             # energy has not been collected
-            base_max = _results[tid][base_idx]['energy'][cpus]['max']
-            test_max = _results[tid][test_idx]['energy'][cpus]['max']
+            base_max = row['base_max']['energy.' + cpus]
+            test_max = row['test_max']['energy.' + cpus]
             if base_max == 0 or test_max == 0:
                 res_line += ' {0:10s}'.format('NA')
                 continue
 
             # Otherwise, report energy values
-            res_base = _results[tid][base_idx]['energy'][cpus]['avg']
-            res_test = _results[tid][test_idx]['energy'][cpus]['avg']
+            res_base = row['base_avg']['energy.' + cpus]
+            res_test = row['test_avg']['energy.' + cpus]
 
             speedup_cnt =  res_test - res_base
             if 'absolute' in formats:
@@ -328,13 +422,14 @@ class Report(object):
         res_line += ' |'
 
         # If available, dump also performance results
-        if 'performance' not in _results[tid][base_idx].keys():
+        if 'performance.perf_avg' not in row['base_avg'] or \
+           pd.isnull(row['base_avg']['performance.perf_avg']):
             print res_line
             return
 
         for pidx in ['perf_avg', 'ctime_avg', 'edp1', 'edp2', 'edp3']:
-            res_base = _results[tid][base_idx]['performance'][pidx]['avg']
-            res_test = _results[tid][test_idx]['performance'][pidx]['avg']
+            res_base = row['base_avg']['performance.' + pidx]
+            res_test = row['test_avg']['performance.' + pidx]
 
             self._log.debug('idx: %s, base: %s, test: %s',
                             pidx, res_base, res_test)
@@ -368,4 +463,7 @@ class Report(object):
 # List of workload types which can be parsed using the default test parser
 DEFAULT_WTYPES = ['perf_bench_messaging', 'perf_bench_pipe']
 
+# Formats exporting the comparisons into a file
+EXPORT_FORMATS = ['csv', 'parquet']
+
 #vim :set tabstop=4 shiftwidth=4 expandtab
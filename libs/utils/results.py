@@ -18,6 +18,7 @@
 
 import argparse
 import fnmatch as fnm
+import glob
 import json
 import math
 import numpy as np
@@ -27,44 +28,155 @@ import sys
 import logging
 
 from collections import defaultdict
+from multiprocessing import Pool
 from colors import TestColors
+from rtapp_log import load_rtapp_log, rtapp_metrics, rtapp_task_name
 
 
 
 class Results(object):
-
-    def __init__(self, results_dir):
+    """
+    Parse the results of the experiments of a results folder into
+    results.json
+
+    Unless incremental, the results are only parsed if results.json does not
+    exist yet. Incrementally, the runs parsed are recorded in an index, with
+    the size and modification time of their files. When the results are
+    parsed again, only the new or changed runs are parsed, and the tests
+    without changes are copied from the previous results.json.
+
+    :param results_dir: Folder with the results of the experiments
+    :type results_dir: str
+
+    :param processes: Number of processes parsing tests in parallel, the
+                      number of CPUs if None. If 1, tests are parsed in the
+                      calling process.
+    :type processes: int
+
+    :param incremental: Parse the new or changed runs again, keeping the
+                        index of the runs in results_index.json
+    :type incremental: bool
+    """
+
+    def __init__(self, results_dir, processes=1, incremental=False):
         self.results_dir = results_dir
         self.results_json = results_dir + '/results.json'
+        self.results_index = os.path.join(results_dir, RESULTS_INDEX)
         self.results = {}
 
         # Setup logging
         self._log = logging.getLogger('Results')
 
         # Do nothing if results have been already parsed
-        if os.path.isfile(self.results_json):
+        if not incremental and os.path.isfile(self.results_json):
             return
 
+        # Load the results of the previous parsing, if any
+        prev_results = {}
+        index = {}
+        if incremental and os.path.isfile(self.results_json) and \
+           os.path.isfile(self.results_index):
+            with open(self.results_json) as infile:
+                prev_results = json.load(infile)
+            with open(self.results_index) as infile:
+                index = json.load(infile)
+
         # Parse results
         self.base_wls = defaultdict(list)
         self.test_wls = defaultdict(list)
 
         self._log.info('Loading energy/perf data...')
 
+        pool = Pool(processes) if processes != 1 else None
+        jobs = []
+        new_index = {}
         for test_idx in sorted(os.listdir(self.results_dir)):
 
             test_dir = self.results_dir + '/' + test_idx
             if not os.path.isdir(test_dir):
                 continue
+            match = TEST_DIR_RE.search(test_dir)
+            if not match:
+                self._log.debug('Skip folder [%s]', test_dir)
+                continue
+
+            # Keep the results of tests whose runs did not change
+            cached = index.get(test_idx, {})
+            wtype, conf_idx, wload_idx = match.groups()
+            try:
+                res = prev_results[wtype][wload_idx][conf_idx]
+            except KeyError:
+                res = None
+            fingerprints = {run_idx : run['fingerprint']
+                            for run_idx, run in
+                            cached.get('runs', {}).iteritems()}
+            if res is not None and \
+               fingerprints == _test_fingerprints(test_dir):
+                self._log.debug('Unchanged test [%s]', test_idx)
+                _merge_results(self.results,
+                               {wtype : {wload_idx : {conf_idx : res}}})
+                new_index[test_idx] = cached
+                continue
+
+            args = (test_idx, test_dir, cached.get('runs', {}))
+            if pool:
+                jobs.append((test_idx, pool.apply_async(_parse_test, args)))
+            else:
+                jobs.append((test_idx, _parse_test(*args)))
 
-            test = TestFactory.get(test_idx, test_dir, self.results)
-            test.parse()
+        if pool:
+            pool.close()
+            pool.join()
+            jobs = [(test_idx, job.get()) for test_idx, job in jobs]
+
+        self._log.info('Parsed %d new or changed tests', len(jobs))
+        for test_idx, (res, runs) in jobs:
+            _merge_results(self.results, res)
+            new_index[test_idx] = {'runs' : runs}
 
         results_json = self.results_dir + '/results.json'
         self._log.info('Dump perf results on JSON file [%s]...',
                        results_json)
         with open(results_json, 'w') as outfile:
             json.dump(self.results, outfile, indent=4, sort_keys=True)
+        if incremental:
+            with open(self.results_index, 'w') as outfile:
+                json.dump(new_index, outfile, indent=4, sort_keys=True)
+
+def _parse_test(test_idx, test_dir, cached_runs):
+    """
+    Parse the runs of a test, possibly in a Results worker process
+
+    :returns: tuple (results, runs) with the results of the test, and the
+              fingerprint and parsed state of each run
+    """
+    res = {}
+    test = TestFactory.get(test_idx, test_dir, res)
+    runs = test.parse(cached_runs)
+    return res, runs
+
+def _merge_results(results, res):
+    for wtype, wloads in res.iteritems():
+        for wload_idx, confs in wloads.iteritems():
+            results.setdefault(wtype, {}).setdefault(wload_idx, {})\
+                   .update(confs)
+
+def _run_fingerprint(run_dir):
+    """
+    Get the size and modification time of the files parsed for a run
+    """
+    fingerprint = {}
+    for pattern in RUN_FILES:
+        for path in glob.glob(os.path.join(run_dir, pattern)):
+            stat = os.stat(path)
+            fingerprint[os.path.basename(path)] = [stat.st_size,
+                                                   stat.st_mtime]
+    return fingerprint
+
+def _test_fingerprints(test_dir):
+    return {run_idx : _run_fingerprint(os.path.join(test_dir, run_idx))
+            for run_idx in os.listdir(test_dir)
+            if os.path.isdir(os.path.join(test_dir, run_idx))}
 
 ################################################################################
 # Tests processing base classes
@@ -76,6 +188,10 @@ class Test(object):
         self.test_idx = test_idx
         self.test_dir = test_dir
         self.res = res
+
+        # Setup logging
+        self._log = logging.getLogger('Results')
+
         match = TEST_DIR_RE.search(test_dir)
         if not match:
             self._log.error('Results folder not matching naming template')
@@ -99,15 +215,27 @@ class Test(object):
         self.conf_idx = conf_idx
 
         # Energy metrics collected for all tests
-        self.little = []
-        self.total = []
-        self.big = []
+        self.little = StreamingStats()
+        self.total = StreamingStats()
+        self.big = StreamingStats()
+
+    def parse(self, cached_runs={}):
+        """
+        Parse the runs of the test and compute their stats
 
-    def parse(self):
+        :param cached_runs: Runs returned by a previous parsing. The runs
+                            whose files did not change since are not parsed
+                            again.
+        :type cached_runs: dict
+
+        :returns: a dict mapping each run to its fingerprint and its parsed
+                  state
+        """
 
         self._log.info('Processing results from wtype [%s]', self.wtype)
 
         # Parse test's run results
+        runs = {}
         for run_idx in sorted(os.listdir(self.test_dir)):
 
             # Skip all files which are not folders
@@ -115,9 +243,15 @@ class Test(object):
             if not os.path.isdir(run_dir):
                 continue
 
-            run = self.parse_run(run_idx, run_dir)
+            cached = cached_runs.get(run_idx)
+            if cached and cached['fingerprint'] == _run_fingerprint(run_dir):
+                run = ParsedRun(cached['state'])
+            else:
+                run = self.parse_run(run_idx, run_dir)
             self.collect_energy(run)
             self.collect_performance(run)
+            runs[run_idx] = {'fingerprint' : _run_fingerprint(run_dir),
+                             'state' : run.state()}
 
         # Report energy/performance stats over all runs
         self.res[self.wtype][self.wload_idx][self.conf_idx]\
@@ -125,6 +259,8 @@ class Test(object):
         self.res[self.wtype][self.wload_idx][self.conf_idx]\
                 ['performance'] = self.performance()
 
+        return runs
+
     def collect_energy(self, run):
         # Keep track of average energy of each run
         self.little.append(run.little_nrg)
@@ -134,9 +270,9 @@ class Test(object):
     def energy(self):
         # Compute energy stats over all run
         return {
-                'LITTLE' : Stats(self.little).get(),
-                'big'    : Stats(self.big).get(),
-                'Total'  : Stats(self.total).get()
+                'LITTLE' : self.little.get(),
+                'big'    : self.big.get(),
+                'Total'  : self.total.get()
         }
 
 class TestFactory(object):
@@ -147,8 +283,9 @@ class TestFactory(object):
         # Retrive workload class from results folder name
         match = TEST_DIR_RE.search(test_dir)
         if not match:
-            self._log.error('Results folder not matching naming template')
-            self._log.error('Skip parsing of test results [%s]', test_dir)
+            log = logging.getLogger('Results')
+            log.error('Results folder not matching naming template')
+            log.error('Skip parsing of test results [%s]', test_dir)
             return
 
         # Create workload specifi test class
@@ -169,6 +306,9 @@ class Energy(object):
         self.big = 0.0
         self.total = 0.0
 
+        # Setup logging
+        self._log = logging.getLogger('Results')
+
         self._log.debug('Parse [%s]...', nrg_file)
 
         with open(nrg_file, 'r') as infile:
@@ -183,35 +323,50 @@ class Energy(object):
         self._log.debug('Energy LITTLE [%s], big [%s], Total [%s]',
                         self.little, self.big, self.total)
 
+# Percentiles reported by Stats
+STATS_PERCENTILES = [50, 90, 99]
+
 class Stats(object):
+    """
+    Statistics of a list of values
+
+    :param data: Values to compute the statistics of
+    :type data: list(float)
+
+    :param percentiles: Percentiles to report, as p<N> entries
+    :type percentiles: list(int)
 
-    def __init__(self, data):
+    :param bootstrap: Number of resamples used to compute a bootstrap 99%
+                      confidence interval of the average, reported as
+                      boot_c99. Disabled if 0.
+    :type bootstrap: int
+    """
+
+    def __init__(self, data, percentiles=STATS_PERCENTILES, bootstrap=0):
+        values = np.asarray(data, dtype=float)
         self.stats = {}
-        self.stats['count'] = len(data)
-        self.stats['min']   = min(data)
-        self.stats['max']   = max(data)
-        self.stats['avg']   = sum(data)/len(data)
-        std = Stats.stdev(data)
-        c99 = Stats.ci99(data, std)
+        self.stats['count'] = len(values)
+        if not len(values):
+            return
+        self.stats['min']   = values.min()
+        self.stats['max']   = values.max()
+        self.stats['avg']   = values.mean()
+        std = Stats.stdev(values)
+        c99 = Stats.ci99(values, std)
         self.stats['std']   = std
         self.stats['c99']   = c99
+        for pct, value in zip(percentiles,
+                              np.percentile(values, percentiles)):
+            self.stats['p{}'.format(pct)] = value
+        if bootstrap:
+            self.stats['boot_c99'] = Stats.bootstrap_ci99(values, bootstrap)
 
     def get(self):
         return self.stats
 
     @staticmethod
     def stdev(values):
-        sum1 = 0
-        sum2 = 0
-        for value in values:
-            sum1 += value
-            sum2 += math.pow(value, 2)
-        # print 'sum1: {}, sum2: {}'.format(sum1, sum2)
-        avg =  sum1 / len(values)
-        var = (sum2 / len(values)) - (avg * avg)
-        # print 'avg: {} var: {}'.format(avg, var)
-        std = math.sqrt(var)
-        return float(std)
+        return float(np.std(values))
 
     @staticmethod
     def ci99(values, std):
@@ -220,6 +375,94 @@ class Stats(object):
         c99 = 2.58 * ste
         return c99
 
+    @staticmethod
+    def bootstrap_ci99(values, resamples):
+        """
+        Bootstrap 99% confidence interval of the average of values
+
+        :returns: [low, high] bounds of the interval
+        """
+        values = np.asarray(values, dtype=float)
+        rng = np.random.RandomState(0)
+        samples = rng.randint(0, len(values), (resamples, len(values)))
+        avgs = values[samples].mean(axis=1)
+        return list(np.percentile(avgs, [0.5, 99.5]))
+
+class StreamingStats(object):
+    """
+    Statistics of values accumulated without keeping all of them
+
+    Values are added like to a list, with :meth:`append` and :meth:`extend`.
+    Average and variance are updated with Welford's algorithm, and the
+    percentiles are computed on a uniform sample of at most reservoir values,
+    so they are exact until more values are added.
+
+    :param percentiles: Percentiles to report, as p<N> entries
+    :type percentiles: list(int)
+
+    :param reservoir: Maximum number of values kept for the percentiles
+    :type reservoir: int
+    """
+
+    def __init__(self, percentiles=STATS_PERCENTILES, reservoir=4096):
+        self.percentiles = percentiles
+        self.count = 0
+        self.min = float('inf')
+        self.max = float('-inf')
+        self.avg = 0.0
+        self._m2 = 0.0
+        self._reservoir = np.empty(reservoir)
+        self._rng = np.random.RandomState(0)
+
+    def append(self, value):
+        self.extend([value])
+
+    def extend(self, values):
+        values = np.asarray(values, dtype=float)
+        count = len(values)
+        if not count:
+            return
+
+        # Merge the mean and sum of squared differences of the new values
+        avg = values.mean()
+        delta = avg - self.avg
+        total = self.count + count
+        self.avg += delta * count / total
+        self._m2 += ((values - avg) ** 2).sum() + \
+                    delta ** 2 * self.count * count / total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+        # Reservoir sampling: the i-th value replaces a random kept value
+        # with probability size / i
+        size = len(self._reservoir)
+        kept = max(0, min(size - self.count, count))
+        self._reservoir[self.count:self.count + kept] = values[:kept]
+        if kept < count:
+            seen = np.arange(self.count + kept, total) + 1
+            idx = (self._rng.random_sample(len(seen)) * seen).astype(int)
+            replace = idx < size
+            self._reservoir[idx[replace]] = values[kept:][replace]
+        self.count = total
+
+    def get(self):
+        stats = {'count' : self.count}
+        if not self.count:
+            return stats
+        std = math.sqrt(self._m2 / self.count)
+        stats.update({
+            'min' : self.min,
+            'max' : self.max,
+            'avg' : self.avg,
+            'std' : std,
+            'c99' : 2.58 * std / math.sqrt(self.count),
+        })
+        kept = self._reservoir[:min(self.count, len(self._reservoir))]
+        for pct, value in zip(self.percentiles,
+                              np.percentile(kept, self.percentiles)):
+            stats['p{}'.format(pct)] = value
+        return stats
+
 
 ################################################################################
 # Run processing base classes
@@ -231,7 +474,10 @@ class Run(object):
         self.run_idx = run_idx
         self.nrg = None
 
-        self._log.debug('Parse [%s]...', 'Run', run_dir)
+        # Setup logging
+        self._log = logging.getLogger('Results')
+
+        self._log.debug('Parse [%s]...', run_dir)
 
         # Energy stats
         self.little_nrg = 0
@@ -245,6 +491,25 @@ class Run(object):
             self.total_nrg = self.nrg.total
             self.big_nrg = self.nrg.big
 
+    def state(self):
+        """
+        Get the parsed stats of the run, which can be restored with
+        :class:`ParsedRun` to collect them without parsing the run again
+        """
+        return {attr : value for attr, value in vars(self).iteritems()
+                if not attr.startswith('_') and attr != 'nrg'}
+
+class ParsedRun(object):
+    """
+    Run restored from the state returned by :meth:`Run.state`
+    """
+
+    def __init__(self, state):
+        self.__dict__.update(state)
+
+    def state(self):
+        return dict(vars(self))
+
 ################################################################################
 # RTApp workload parsing classes
 ################################################################################
@@ -255,11 +520,11 @@ class RTAppTest(Test):
         super(RTAppTest, self).__init__(test_idx, test_dir, res)
 
         # RTApp specific performance metric
-        self.slack_pct = []
-        self.perf_avg = []
-        self.edp1 = []
-        self.edp2 = []
-        self.edp3 = []
+        self.slack_pct = StreamingStats()
+        self.perf_avg = StreamingStats()
+        self.edp1 = StreamingStats()
+        self.edp2 = StreamingStats()
+        self.edp3 = StreamingStats()
 
         self.rtapp_run = {}
 
@@ -292,11 +557,11 @@ class RTAppTest(Test):
 
         # Return oveall stats
         return {
-                'slack_pct' : Stats(self.slack_pct).get(),
-                'perf_avg'  : Stats(self.perf_avg).get(),
-                'edp1'      : Stats(self.edp1).get(),
-                'edp2'      : Stats(self.edp2).get(),
-                'edp3'      : Stats(self.edp3).get(),
+                'slack_pct' : self.slack_pct.get(),
+                'perf_avg'  : self.perf_avg.get(),
+                'edp1'      : self.edp1.get(),
+                'edp2'      : self.edp2.get(),
+                'edp3'      : self.edp3.get(),
         }
 
 
@@ -313,27 +578,32 @@ class RTAppRun(Run):
         self.edp2 = []
         self.edp3 = []
 
-        rta = {}
-
         # Load run's performance of each task
+        logs = {}
         for task_idx in sorted(os.listdir(run_dir)):
 
             if not fnm.fnmatch(task_idx, 'rt-app-*.log'):
                 continue
 
-            # Parse run's performance results
             prf_file = run_dir + '/' + task_idx
-            task = RTAppPerf(prf_file, self.nrg)
+            self._log.debug('Parse [%s]...', prf_file)
+            logs[rtapp_task_name(prf_file)] = load_rtapp_log(prf_file)
+
+        rta = {}
+        if logs:
+            # Compute the performances of all the tasks at once
+            energy = self.nrg.total if self.nrg else None
+            metrics = rtapp_metrics(logs, energy)
 
             # Keep track of average performances of each task
-            self.slack_pct.append(task.prf['slack_pct'])
-            self.perf_avg.append(task.prf['perf_avg'])
-            self.edp1.append(task.prf['edp1'])
-            self.edp2.append(task.prf['edp2'])
-            self.edp3.append(task.prf['edp3'])
+            self.slack_pct = list(metrics.slack_pct)
+            self.perf_avg = list(metrics.perf_avg)
+            self.edp1 = list(metrics.edp1)
+            self.edp2 = list(metrics.edp2)
+            self.edp3 = list(metrics.edp3)
 
             # Keep track of performance stats for each task
-            rta[task.name] = task.prf
+            rta = metrics.to_dict('index')
 
         # Dump per task rtapp stats
         prf_file = os.path.join(run_dir, 'performance.json')
@@ -345,60 +615,24 @@ class RTAppPerf(object):
 
     def __init__(self, perf_file, nrg):
 
-        # Set of exposed attibutes
-        self.prf = {
-                'perf_avg'  : 0,
-                'perf_std'  : 0,
-                'run_sum'   : 0,
-                'slack_sum' : 0,
-                'slack_pct' : 0,
-                'edp1' : 0,
-                'edp2' : 0,
-                'edp3' : 0
-        }
+        # Setup logging
+        self._log = logging.getLogger('Results')
 
         self._log.debug('Parse [%s]...', perf_file)
 
         # Load performance data for each RT-App task
-        self.name = perf_file.split('-')[-2]
-        self.data = np.loadtxt(perf_file, comments='#', unpack=False)
-
-        # Max Slack (i.e. configured/expected slack): period - run
-        max_slack = np.subtract(
-                self.data[:,RTAPP_COL_C_PERIOD], self.data[:,RTAPP_COL_C_RUN])
-
-        # Performance Index: 100 * slack / max_slack
-        perf = np.divide(self.data[:,RTAPP_COL_SLACK], max_slack)
-        perf = np.multiply(perf, 100)
-        self.prf['perf_avg'] = np.mean(perf)
-        self.prf['perf_std'] = np.std(perf)
-        self._log.debug('perf [%s]: %6.2f,%6.2f',
-                        self.name, self.prf['perf_avg'],
-                        self.prf['perf_std'])
-
-        # Negative slacks
-        nslacks = self.data[:,RTAPP_COL_SLACK]
-        nslacks = nslacks[nslacks < 0]
-        self._log.debug('Negative slacks: %s', nslacks)
-        self.prf['slack_sum'] = -nslacks.sum()
-        self._log.debug('Negative slack [%s] sum: %6.2f',
-                        self.name, self.prf['slack_sum'])
-
-        # Slack over run-time
-        self.prf['run_sum'] = np.sum(self.data[:,RTAPP_COL_RUN])
-        self.prf['slack_pct'] = 100 * self.prf['slack_sum'] / self.prf['run_sum']
-        self._log.debug('SlackPct [%s]: %6.2f %%', self.name, self.slack_pct)
-
-        if nrg is None:
-            return
+        self.name = rtapp_task_name(perf_file)
+        df = load_rtapp_log(perf_file)
+        self.data = df.values
 
-        # Computing EDP
-        self.prf['edp1'] = nrg.total * math.pow(self.prf['run_sum'], 1)
-        self._log.debug('EDP1 [%s]: {%6.2f}', self.name, self.prf['edp1'])
-        self.prf['edp2'] = nrg.total * math.pow(self.prf['run_sum'], 2)
-        self._log.debug('EDP2 [%s]: %6.2f', self.name, self.prf['edp2'])
-        self.prf['edp3'] = nrg.total * math.pow(self.prf['run_sum'], 3)
-        self._log.debug('EDP3 [%s]: %6.2f', self.name, self.prf['edp3'])
+        # Exposed attributes: perf_avg, perf_std, run_sum, slack_sum,
+        # slack_pct, edp1, edp2, edp3
+        energy = nrg.total if nrg else None
+        self.prf = rtapp_metrics({self.name : df}, energy).loc[self.name]\
+                   .to_dict()
+        for metric in sorted(self.prf):
+            self._log.debug('%s [%s]: %6.2f',
+                            metric, self.name, self.prf[metric])
 
 
 # Columns of the per-task rt-app log file
@@ -424,11 +658,11 @@ class DefaultTest(Test):
         super(DefaultTest, self).__init__(test_idx, test_dir, res)
 
         # Default performance metric
-        self.ctime_avg = []
-        self.perf_avg = []
-        self.edp1 = []
-        self.edp2 = []
-        self.edp3 = []
+        self.ctime_avg = StreamingStats()
+        self.perf_avg = StreamingStats()
+        self.edp1 = StreamingStats()
+        self.edp2 = StreamingStats()
+        self.edp3 = StreamingStats()
 
     def parse_run(self, run_idx, run_dir):
         return DefaultRun(run_idx, run_dir)
@@ -443,11 +677,11 @@ class DefaultTest(Test):
 
     def performance(self):
         return {
-                'ctime_avg' : Stats(self.ctime_avg).get(),
-                'perf_avg'  : Stats(self.perf_avg).get(),
-                'edp1'      : Stats(self.edp1).get(),
-                'edp2'      : Stats(self.edp2).get(),
-                'edp3'      : Stats(self.edp3).get(),
+                'ctime_avg' : self.ctime_avg.get(),
+                'perf_avg'  : self.perf_avg.get(),
+                'edp1'      : self.edp1.get(),
+                'edp2'      : self.edp2.get(),
+                'edp3'      : self.edp3.get(),
         }
 
 class DefaultRun(Run):
@@ -497,4 +731,10 @@ TEST_DIR_RE = re.compile(
         r'.*/([^:]*):([^:]*):([^:]*)'
     )
 
+# Index of the runs parsed into results.json
+RESULTS_INDEX = 'results_index.json'
+
+# Files of a run which are parsed again when they change
+RUN_FILES = ['energy.json', 'performance.json', 'rt-app-*.log']
+
 #vim :set tabstop=4 shiftwidth=4 expandtab
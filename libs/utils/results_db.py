@@ -0,0 +1,244 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+""" SQLite database of the runs of many results folders """
+
+import datetime
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import numpy as np
+import pandas as pd
+
+from results import Results, RESULTS_INDEX, TEST_DIR_RE
+
+# Metrics of the runs, as named in results.json, for each Run attribute
+ENERGY_METRICS = {
+    'little_nrg' : 'energy.LITTLE',
+    'big_nrg'    : 'energy.big',
+    'total_nrg'  : 'energy.Total',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS campaigns (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    ingested TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS runs (
+    campaign_id INTEGER NOT NULL REFERENCES campaigns(id),
+    wtype TEXT NOT NULL,
+    wload TEXT NOT NULL,
+    conf TEXT NOT NULL,
+    iteration INTEGER,
+    kernel TEXT,
+    date TEXT,
+    metric TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS runs_campaign ON runs(campaign_id);
+CREATE INDEX IF NOT EXISTS runs_wload ON runs(wload, metric);
+CREATE INDEX IF NOT EXISTS runs_conf ON runs(conf, metric);
+CREATE INDEX IF NOT EXISTS runs_iteration ON runs(iteration);
+CREATE INDEX IF NOT EXISTS runs_kernel ON runs(kernel);
+CREATE INDEX IF NOT EXISTS runs_date ON runs(date);
+"""
+
+class ResultsDB(object):
+    """
+    Database of the runs of the experiments of many results folders
+
+    Each run of a results folder is stored with its workload type,
+    workload, configuration, iteration, kernel version and date, and the
+    value of each of its metrics, named as in results.json (e.g.
+    ``energy.Total`` or ``performance.perf_avg``). Runs of rt-app workloads
+    report the average of each metric over the tasks.
+
+    :param db_file: Path of the SQLite database, created if needed
+    :type db_file: str
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        self._log = logging.getLogger('ResultsDB')
+        self._db = sqlite3.connect(db_file)
+        self._db.executescript(SCHEMA)
+
+    def close(self):
+        self._db.close()
+
+    def ingest(self, results_dir, processes=None):
+        """
+        Add the runs of a results folder to the database
+
+        The results folder is parsed with :class:`Results` if needed. The
+        runs previously ingested from the same folder are replaced.
+
+        :param results_dir: Folder with the results of the experiments
+        :type results_dir: str
+
+        :param processes: Number of processes parsing the results, see
+                          :class:`Results`
+        :type processes: int
+
+        :returns: the number of runs ingested
+        """
+        results_dir = os.path.realpath(results_dir)
+        Results(results_dir, processes, incremental=True)
+        with open(os.path.join(results_dir, RESULTS_INDEX)) as infile:
+            index = json.load(infile)
+
+        rows = []
+        nruns = 0
+        for test_idx, test in index.iteritems():
+            test_dir = os.path.join(results_dir, test_idx)
+            wtype, conf, wload = TEST_DIR_RE.search(test_dir).groups()
+            kernel = _kernel_release(test_dir)
+            for run_idx, run in test['runs'].iteritems():
+                iteration = int(run_idx) if run_idx.isdigit() else None
+                date = _run_date(os.path.join(test_dir, run_idx))
+                for metric, value in _run_metrics(run['state']):
+                    rows.append((wtype, wload, conf, iteration, kernel, date,
+                                 metric, value))
+                nruns += 1
+
+        with self._db:
+            cursor = self._db.execute(
+                'SELECT id FROM campaigns WHERE path = ?', (results_dir,))
+            row = cursor.fetchone()
+            if row:
+                campaign_id = row[0]
+                self._db.execute('DELETE FROM runs WHERE campaign_id = ?',
+                                 (campaign_id,))
+                self._db.execute(
+                    'UPDATE campaigns SET ingested = ? WHERE id = ?',
+                    (_now(), campaign_id))
+            else:
+                cursor = self._db.execute(
+                    'INSERT INTO campaigns (path, ingested) VALUES (?, ?)',
+                    (results_dir, _now()))
+                campaign_id = cursor.lastrowid
+            self._db.executemany(
+                'INSERT INTO runs (campaign_id, wtype, wload, conf, '
+                'iteration, kernel, date, metric, value) '
+                'VALUES ({}, ?, ?, ?, ?, ?, ?, ?, ?)'.format(campaign_id),
+                rows)
+
+        self._log.info('Ingested %d runs from [%s]', nruns, results_dir)
+        return nruns
+
+    def campaigns(self):
+        """
+        Get the results folders in the database
+
+        :returns: a DataFrame with the path and ingestion date of each folder
+        """
+        return pd.read_sql_query(
+            'SELECT path, ingested FROM campaigns ORDER BY path', self._db)
+
+    def query(self, wtype=None, wload=None, conf=None, metric=None,
+              kernel=None, since=None, until=None, campaign=None):
+        """
+        Get the runs matching all the given filters
+
+        Filters can be a value, or a list of values to match any of them. An
+        empty list matches no run.
+
+        :param since: Only runs from this date, e.g. '2017-01-31'
+        :type since: str or datetime.datetime
+
+        :param until: Only runs before this date
+        :type until: str or datetime.datetime
+
+        :param campaign: Path of the results folder of the runs
+
+        :returns: a DataFrame with a row for each metric of each matching run,
+                  sorted by date
+        """
+        where = []
+        params = []
+        filters = [('wtype', wtype), ('wload', wload), ('conf', conf),
+                   ('metric', metric), ('kernel', kernel)]
+        if campaign is not None:
+            if isinstance(campaign, basestring):
+                campaign = [campaign]
+            filters.append(('path', [os.path.realpath(path)
+                                     for path in campaign]))
+        for column, value in filters:
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                if not value:
+                    # "IN ()" is a syntax error in SQLite
+                    where.append('0')
+                    continue
+                where.append('{} IN ({})'.format(
+                    column, ', '.join('?' * len(value))))
+                params.extend(value)
+            else:
+                where.append('{} = ?'.format(column))
+                params.append(value)
+        if since is not None:
+            where.append('date >= ?')
+            params.append(str(since))
+        if until is not None:
+            where.append('date < ?')
+            params.append(str(until))
+
+        sql = 'SELECT path AS campaign, wtype, wload, conf, iteration, ' \
+              'kernel, date, metric, value ' \
+              'FROM runs JOIN campaigns ON runs.campaign_id = campaigns.id'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY date, campaign, wload, conf, iteration, metric'
+        return pd.read_sql_query(sql, self._db, params=params)
+
+def _now():
+    return datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+def _run_date(run_dir):
+    return time.strftime('%Y-%m-%d %H:%M:%S',
+                         time.localtime(os.path.getmtime(run_dir)))
+
+def _kernel_release(test_dir):
+    """
+    Get the kernel release from the kernel.version saved by the Executor
+    """
+    version_file = os.path.join(test_dir, 'kernel.version')
+    if not os.path.isfile(version_file):
+        return None
+    with open(version_file) as infile:
+        uname = infile.read().split()
+    # uname -a: <sysname> <nodename> <release> ...
+    return uname[2] if len(uname) > 2 else None
+
+def _run_metrics(state):
+    """
+    Get the metrics of a run from the state saved by :class:`Results`
+    """
+    for attr, value in state.iteritems():
+        if attr == 'run_idx':
+            continue
+        metric = ENERGY_METRICS.get(attr, 'performance.' + attr)
+        if isinstance(value, list):
+            if not value:
+                continue
+            value = np.mean(value)
+        yield metric, float(value)
@@ -0,0 +1,132 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+""" Loader of the per-task log files generated by rt-app """
+
+import logging
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+# Regexp to match an rt-app generated logfile
+TASK_NAME_RE = re.compile('.*\/rt-app-(.+)-[0-9]+.log')
+
+# Columns of the per-task rt-app log file
+RTAPP_COLUMNS = ['idx', 'perf', 'run', 'period', 'start', 'end', 'rel_st',
+                 'slack', 'c_run', 'c_period', 'wu_lat']
+
+# Suffix of the binary copy of a parsed log file
+RTAPP_CACHE_SUFFIX = '.npy'
+
+_log = logging.getLogger('RTAppLog')
+
+def rtapp_task_name(logfile):
+    """
+    Get the name of the task which generated an rt-app log file
+
+    :param logfile: Path of an rt-app-<task>-<idx>.log file
+    :type logfile: str
+    """
+    match = re.search(TASK_NAME_RE, logfile)
+    if match is None:
+        raise ValueError('The logfile [{0:s}] is not from rt-app'\
+                .format(logfile))
+    return match.group(1)
+
+def load_rtapp_log(logfile):
+    """
+    Load the samples of an rt-app log file
+
+    The parsed samples are saved in a binary file next to the log, which is
+    loaded instead of the log as long as it is more recent.
+
+    All the comment lines are skipped and all the samples are kept. The
+    former PerfAnalysis parser skipped the first two lines instead, so it
+    dropped the first sample of the logs with a single comment line.
+
+    :param logfile: Path of the rt-app log file
+    :type logfile: str
+
+    :returns: a DataFrame with a column for each rt-app log column, named
+              as in :data:`RTAPP_COLUMNS`
+    """
+    cache_file = logfile + RTAPP_CACHE_SUFFIX
+    if os.path.isfile(cache_file) and \
+       os.path.getmtime(cache_file) >= os.path.getmtime(logfile):
+        _log.debug('Loading [%s]...', cache_file)
+        data = np.load(cache_file)
+    else:
+        _log.debug('Parsing [%s]...', logfile)
+        data = pd.read_csv(logfile, delim_whitespace=True, comment='#',
+                           header=None, engine='c').values
+        _save_cache(cache_file, data)
+
+    return pd.DataFrame(data, columns=RTAPP_COLUMNS[:data.shape[1]])
+
+def _save_cache(cache_file, data):
+    tmp_file = cache_file + '.tmp'
+    try:
+        with open(tmp_file, 'wb') as fh:
+            np.save(fh, data)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError) as e:
+        _log.debug('Cannot cache [%s]: %s', cache_file, e)
+
+def rtapp_metrics(logs, energy=None):
+    """
+    Compute the performance metrics of the tasks of an rt-app run
+
+    For each task:
+
+    - perf_avg, perf_std: performance index, i.e. 100 * slack / (c_period -
+      c_run), mean and standard deviation
+    - run_sum: total run time
+    - slack_sum: sum of the negative slacks, as a positive number
+    - slack_pct: slack_sum over run_sum, in percent
+    - edp1, edp2, edp3: energy delay products of the run, i.e. energy *
+      run_sum ** N, zero if the energy is not known
+
+    :param logs: Samples of each task, as loaded by :func:`load_rtapp_log`
+    :type logs: dict(str, pandas.DataFrame)
+
+    :param energy: Total energy consumed during the run
+    :type energy: float
+
+    :returns: a DataFrame with a row for each task and a column for each
+              metric
+    """
+    df = pd.concat(logs, names=['task', 'sample'])
+    tasks = df.groupby(level='task')
+
+    perf = 100. * df.slack / (df.c_period - df.c_run)
+    perf = perf.groupby(level='task')
+    nslack = df.slack.where(df.slack < 0, 0).groupby(level='task')
+
+    metrics = pd.DataFrame({
+        'perf_avg'  : perf.mean(),
+        'perf_std'  : perf.std(ddof=0),
+        'run_sum'   : tasks.run.sum(),
+        'slack_sum' : -nslack.sum(),
+    })
+    metrics['slack_pct'] = 100. * metrics.slack_sum / metrics.run_sum
+    run_sum = metrics.run_sum.astype(float)
+    for n in range(1, 4):
+        edp = energy * run_sum ** n if energy is not None else 0
+        metrics['edp{}'.format(n)] = edp
+    return metrics
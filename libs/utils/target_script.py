@@ -16,6 +16,7 @@
 #
 
 import os
+import pipes
 
 SCRIPT_NAME = 'remote_script.sh'
 
@@ -46,13 +47,46 @@ class TargetScript(object):
         self.commands = []
         
     # This is made to look like the devlib Target execute()
-    def execute(self, cmd):
+    def execute(self, cmd, as_root=False):
         """
         Accumulate command for later execution.
 
         :param cmd: Command that would be run on the target
         :type cmd: str
+
+        :param as_root: Ignored, all the commands of the script run with the
+            privileges requested by :meth:`run`
+        :type as_root: bool
+        """
+        self.append(cmd)
+
+    # This is made to look like the devlib Target write_value()
+    def write_value(self, path, value, verify=True, check=True):
+        """
+        Accumulate a write to a file for later execution.
+
+        :param path: Path of the file on the target
+        :type path: str
+
+        :param value: Value to write
+        :type value: str
+
+        :param verify: Read the file back and check it holds the value written
+        :type verify: bool
+
+        :param check: Stop the script with an error if the write or its
+            verification fails. Otherwise the failure is ignored.
+        :type check: bool
         """
+        path = pipes.quote(path)
+        value = pipes.quote(str(value))
+        cmd = 'echo {} > {}'.format(value, path)
+        if verify:
+            cmd += ' && [ "$(cat {})" = {} ]'.format(path, value)
+        if check:
+            cmd += ' || {{ echo Failed to write {} >&2; exit 1; }}'.format(path)
+        else:
+            cmd += ' || true'
         self.append(cmd)
 
     def append(self, cmd):
@@ -105,12 +139,15 @@ class TargetScript(object):
         self._target.push(self._local_path, self._remote_path)
         self._target.execute('chmod +x {}'.format(self._remote_path))
 
-    def run(self):
+    def run(self, as_root=False):
         """
         Run the previously pushed script
+
+        :param as_root: Run the script as root
+        :type as_root: bool
         """
 
         if self._target.file_exists(self._remote_path):
-            self._target.execute(self._remote_path)
+            self._target.execute(self._remote_path, as_root=as_root)
         else:
             raise IOError('Remote script was not found on target device')
@@ -15,19 +15,88 @@
 # limitations under the License.
 #
 
+import atexit
 import os
+import traceback
 import unittest
 import logging
+from collections import OrderedDict
+from multiprocessing import Pool
 
 from bart.sched.SchedAssert import SchedAssert
 from bart.sched.SchedMultiAssert import SchedMultiAssert
-from devlib.utils.misc import memoized
 import wrapt
 
 from env import TestEnv
-from executor import Executor
+from executor import Executor, _postprocess_worker_init
 from trace import Trace
 
+# Memory budget of the traces cached for LisaTest, in MB
+TRACE_CACHE_MB = int(os.environ.get('LISA_TRACE_CACHE_MB', 1024))
+
+class TraceCache(object):
+    """
+    Least recently used cache of the traces parsed by tests
+
+    Along with each trace, the cache keeps the objects built from it (e.g.
+    SchedAssert) so that they are dropped together with the trace. The least
+    recently used traces are dropped when the DataFrames of the cached traces
+    take more than the memory budget. The last trace used is always kept.
+
+    :param max_mb: Memory budget of the cache, in MB
+    :type max_mb: float
+    """
+
+    def __init__(self, max_mb=TRACE_CACHE_MB):
+        self.max_bytes = max_mb * 1024 * 1024
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._log = logging.getLogger('TraceCache')
+
+    def get(self, key, load):
+        """
+        Get a cached trace, loading it on a miss
+
+        :param key: Key of the trace
+        :param load: Function returning the trace to cache for key
+        """
+        if key in self._entries:
+            entry = self._entries.pop(key)
+            self._entries[key] = entry
+            return entry['trace']
+
+        trace = load()
+        size = self._size(trace)
+        self._entries[key] = {'trace' : trace, 'size' : size, 'objects' : {}}
+        self._bytes += size
+        self._log.debug('Cached trace %s: %.1f MB, %.1f MB in total',
+                        key, size / 1e6, self._bytes / 1e6)
+
+        while self._bytes > self.max_bytes and len(self._entries) > 1:
+            old_key, old_entry = self._entries.popitem(last=False)
+            self._bytes -= old_entry['size']
+            self._log.debug('Evicted trace %s', old_key)
+        return trace
+
+    def objects(self, key):
+        """
+        Get the dict of objects built from a cached trace
+        """
+        return self._entries[key]['objects']
+
+    def clear(self):
+        self._entries.clear()
+        self._bytes = 0
+
+    @staticmethod
+    def _size(trace):
+        ftrace = trace.ftrace
+        return sum(getattr(ftrace, event).data_frame
+                   .memory_usage(deep=True).sum()
+                   for event in ftrace.get_filters())
+
+# Traces shared by all the tests of the process
+trace_cache = TraceCache()
 
 class LisaTest(unittest.TestCase):
     """
@@ -56,6 +125,15 @@ class LisaTest(unittest.TestCase):
     experiments_conf = None
     """Override this with a dictionary or JSON path to configure the Executor"""
 
+    experiment_processes = None
+    """
+    Number of processes running :func:`experiment_test` methods on different
+    experiments in parallel. Experiments are tested one at a time in the test
+    process if None. The processes are shared by all the test methods of the
+    class, and terminated by :meth:`tearDownClass`, or at exit if it is
+    overridden without calling it.
+    """
+
     @classmethod
     def _getTestConf(cls):
         if cls.test_conf is None:
@@ -108,6 +186,13 @@ class LisaTest(unittest.TestCase):
         # Execute post-experiments code defined by the test
         cls._experimentsFinalize()
 
+    @classmethod
+    def tearDownClass(cls):
+        pool = cls.__dict__.get('_experiment_pool')
+        if pool is not None:
+            pool.close()
+            del cls._experiment_pool
+
     @classmethod
     def _experimentsInit(cls):
         """
@@ -120,15 +205,15 @@ class LisaTest(unittest.TestCase):
         Code executed after running the experiments
         """
 
-    @memoized
     def get_sched_assert(self, experiment, task):
         """
         Return a SchedAssert over the task provided
         """
-        return SchedAssert(
-            self.get_trace(experiment).ftrace, self.te.topology, execname=task)
+        return self._get_trace_object(
+            experiment, ('sched_assert', task),
+            lambda trace: SchedAssert(trace.ftrace, self.te.topology,
+                                      execname=task))
 
-    @memoized
     def get_multi_assert(self, experiment, task_filter=""):
         """
         Return a SchedMultiAssert over the tasks whose names contain task_filter
@@ -137,16 +222,19 @@ class LisaTest(unittest.TestCase):
         experiment.
         """
         tasks = experiment.wload.tasks.keys()
-        return SchedMultiAssert(self.get_trace(experiment).ftrace,
-                                self.te.topology,
-                                [t for t in tasks if task_filter in t])
+        return self._get_trace_object(
+            experiment, ('multi_assert', task_filter),
+            lambda trace: SchedMultiAssert(
+                trace.ftrace, self.te.topology,
+                [t for t in tasks if task_filter in t]))
 
     def get_trace(self, experiment):
-        if not hasattr(self, "__traces"):
-            self.__traces = {}
-        if experiment.out_dir in self.__traces:
-            return self.__traces[experiment.out_dir]
+        """
+        Return the Trace of an experiment
 
+        Traces are parsed once per process, and kept in :data:`trace_cache`
+        within its memory budget.
+        """
         if ('ftrace' not in experiment.conf['flags']
             or 'ftrace' not in self.test_conf):
             raise ValueError(
@@ -155,24 +243,45 @@ class LisaTest(unittest.TestCase):
 
         events = self.test_conf['ftrace']['events']
         tasks = experiment.wload.tasks.keys()
-        trace = Trace(self.te.platform, experiment.out_dir, events, tasks)
+        return trace_cache.get(
+            self._trace_key(experiment),
+            lambda: Trace(self.te.platform, experiment.out_dir, events, tasks))
+
+    def _trace_key(self, experiment):
+        return (experiment.out_dir,
+                tuple(sorted(self.test_conf['ftrace']['events'])))
+
+    def _get_trace_object(self, experiment, name, build):
+        trace = self.get_trace(experiment)
+        objects = trace_cache.objects(self._trace_key(experiment))
+        if name not in objects:
+            objects[name] = build(trace)
+        return objects[name]
+
+    def get_task_lifetimes(self, experiment):
+        """
+        Get the first and last time each task of the workload ran, and its
+        total runtime
 
-        self.__traces[experiment.out_dir] = trace
-        return trace
+        The table is computed once per trace, see
+        :meth:`TasksAnalysis._dfg_task_lifetimes`.
+        """
+        tasks = experiment.wload.tasks.keys()
+        return self._get_trace_object(
+            experiment, 'task_lifetimes',
+            lambda trace: trace.data_frame.task_lifetimes(tasks))
 
     def get_start_time(self, experiment):
         """
         Get the time at which the experiment workload began executing
         """
-        start_times_dict = self.get_multi_assert(experiment).getStartTime()
-        return min([t["starttime"] for t in start_times_dict.itervalues()])
+        return self.get_task_lifetimes(experiment).first_run.min()
 
     def get_end_time(self, experiment):
         """
         Get the time at which the experiment workload finished executing
         """
-        end_times_dict = self.get_multi_assert(experiment).getEndTime()
-        return max([t["endtime"] for t in end_times_dict.itervalues()])
+        return self.get_task_lifetimes(experiment).last_run.max()
 
     def get_window(self, experiment):
         return (self.get_start_time(experiment), self.get_end_time(experiment))
@@ -184,13 +293,7 @@ class LisaTest(unittest.TestCase):
         Returned as a dict; {"task_name": finish_time, ...}
         """
 
-        end_times = {}
-        ftrace = self.get_trace(experiment).ftrace
-        for task in experiment.wload.tasks.keys():
-            sched_assert = SchedAssert(ftrace, self.te.topology, execname=task)
-            end_times[task] = sched_assert.getEndTime()
-
-        return end_times
+        return self.get_task_lifetimes(experiment).last_run.to_dict()
 
     def _dummy_method(self):
         pass
@@ -212,17 +315,108 @@ def experiment_test(wrapped_test, instance, args, kwargs):
 
     The method will be passed the experiment object and a list of the names of
     tasks that were run as the experiment's workload.
+
+    If the test class sets :attr:`LisaTest.experiment_processes`, the method
+    is called for the different experiments in forked worker processes, each
+    worker always testing the same experiments so that their traces stay
+    cached. The first experiment failing, in the order of the experiments, is
+    reported with the traceback of the worker.
     """
-    for experiment in instance.executor.experiments:
-        tasks = experiment.wload.tasks.keys()
-        try:
-            wrapped_test(experiment, tasks, *args, **kwargs)
-        except AssertionError as e:
-            trace_relpath = os.path.join(experiment.out_dir, "trace.dat")
-            add_msg = "\n\tCheck trace file: " + os.path.abspath(trace_relpath)
-            orig_msg = e.args[0] if len(e.args) else ""
-            e.args = (orig_msg + add_msg,) + e.args[1:]
-            raise
+    experiments = instance.executor.experiments
+    processes = getattr(instance, 'experiment_processes', None)
+    if not processes or len(experiments) < 2:
+        for experiment in experiments:
+            tasks = experiment.wload.tasks.keys()
+            try:
+                wrapped_test(experiment, tasks, *args, **kwargs)
+            except AssertionError as e:
+                orig_msg = e.args[0] if len(e.args) else ""
+                e.args = (orig_msg + _trace_hint(experiment),) + e.args[1:]
+                raise
+        return
+
+    cls = type(instance)
+    if '_experiment_pool' not in cls.__dict__:
+        cls._experiment_pool = _ExperimentTestPool(instance, processes)
+    errors = cls._experiment_pool.run(wrapped_test.__name__,
+                                      len(experiments), args, kwargs)
+    for experiment, error in zip(experiments, errors):
+        if error is None:
+            continue
+        assertion, message, worker_tb = error
+        message = '{}{}\n\nIn worker process:\n{}'.format(
+            message, _trace_hint(experiment), worker_tb)
+        if assertion:
+            raise AssertionError(message)
+        raise RuntimeError(message)
+
+def _trace_hint(experiment):
+    trace_relpath = os.path.join(experiment.out_dir, "trace.dat")
+    return "\n\tCheck trace file: " + os.path.abspath(trace_relpath)
+
+# Test instance of an experiment_test worker process
+_worker_instance = None
+
+class _ExperimentTestPool(object):
+    """
+    Worker processes calling the experiment_test methods of a LisaTest class
+
+    Each worker is forked with the test instance creating the pool, and is
+    a single-process pool of its own, so that the experiments are always
+    assigned to the same workers. A worker then finds the traces it parsed
+    for the previous test methods of the class in its trace_cache. Like the
+    Executor post-processing workers, workers close the target connections
+    they inherit. The pool is closed at exit, unless closed before.
+
+    :param instance: Test instance, which the test methods are called on
+    :type instance: LisaTest
+
+    :param processes: Number of worker processes
+    :type processes: int
+    """
+
+    def __init__(self, instance, processes):
+        self._pools = [Pool(1, initializer=_init_experiment_test_worker,
+                            initargs=(instance,))
+                       for _ in range(processes)]
+        atexit.register(self.close)
+
+    def run(self, name, count, args, kwargs):
+        """
+        Call a test method on each experiment
+
+        :returns: list with, for each experiment, None if the test passed or
+                  a tuple (assertion, message, traceback) describing its error
+        """
+        jobs = [self._pools[exp_idx % len(self._pools)].apply_async(
+                    _run_experiment_test, (name, exp_idx, args, kwargs))
+                for exp_idx in range(count)]
+        return [job.get() for job in jobs]
+
+    def close(self):
+        pools, self._pools = self._pools, []
+        for pool in pools:
+            pool.close()
+        for pool in pools:
+            pool.join()
+
+def _init_experiment_test_worker(instance):
+    global _worker_instance
+    _postprocess_worker_init()
+    _worker_instance = instance
+
+def _run_experiment_test(name, exp_idx, args, kwargs):
+    instance = _worker_instance
+    experiment = instance.executor.experiments[exp_idx]
+    test = getattr(type(instance), name).__wrapped__
+    try:
+        test(instance, experiment, experiment.wload.tasks.keys(),
+             *args, **kwargs)
+    except Exception as e:
+        message = e.args[0] if len(e.args) else ""
+        return (isinstance(e, AssertionError), str(message),
+                traceback.format_exc())
+    return None
 
 # Prevent nosetests from running experiment_test directly as a test case
 experiment_test.__test__ = False
@@ -30,9 +30,13 @@ import logging
 from analysis_register import AnalysisRegister
 from collections import namedtuple
 from devlib.utils.misc import memoized
+from energy_markers import ENERGY_MARKER
 from trappy.utils import listify, handle_duplicate_index
 
 
+# Parse the markers written by energy meters, see EnergyMeter._mark_trace
+trappy.register_dynamic_ftrace('LisaEnergyMarker', ENERGY_MARKER)
+
 NON_IDLE_STATE = -1
 ResidencyTime = namedtuple('ResidencyTime', ['total', 'active'])
 ResidencyData = namedtuple('ResidencyData', ['label', 'residency'])
@@ -18,7 +18,7 @@
 """Initialization for wlgen"""
 
 import pkg_resources
-from wlgen.workload import Workload
+from wlgen.workload import Workload, WorkloadRun, wait_workloads
 from wlgen.rta import RTA, Ramp, Step, Pulse, Periodic
 from wlgen.perf_bench import PerfMessaging, PerfPipe
 
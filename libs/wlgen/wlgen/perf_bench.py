@@ -52,7 +52,8 @@ class PerfMessaging(Workload):
              cpus=None,
              cgroup=None,
              exc_id=0,
-             run_dir=None):
+             run_dir=None,
+             push=True):
 
         if pipe is not '':
             pipe = '--pipe'
@@ -76,6 +77,9 @@ class PerfMessaging(Workload):
 
         self.logger.debug('%14s - Command line: %s', 'PerfBench', self.command)
 
+        if push:
+            self.push()
+
         # Set and return the test label
         self.test_label = '{0:s}_{1:02d}'.format(self.name, self.exc_id)
         return self.test_label
@@ -140,7 +144,8 @@ class PerfPipe(Workload):
              loop = 10,
              cpus=None,
              cgroup=None,
-             exc_id=0):
+             exc_id=0,
+             push=True):
 
         super(PerfPipe, self).conf('custom',
                 {'loop': str(loop)},
@@ -153,6 +158,9 @@ class PerfPipe(Workload):
         self.logger.debug('%14s - Command line: %s',
                           'PerfBench', self.command)
 
+        if push:
+            self.push()
+
         # Set and return the test label
         self.test_label = '{0:s}_{1:02d}'.format(self.name, self.exc_id)
         return self.test_label
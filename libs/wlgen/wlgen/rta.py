@@ -85,11 +85,17 @@ class RTA(Workload):
         self.setCallback('postrun', self.__postrun)
 
     @staticmethod
-    def calibrate(target):
+    def calibrate(target, cpus=None, duration_s=1):
         """
         Calibrate RT-App on each CPU in the system
 
         :param target: Devlib target to run calibration on.
+        :param cpus: CPUs to calibrate, all the online CPUs by default.
+        :type cpus: list(int)
+        :param duration_s: Duration of the calibration workload on each CPU.
+            rt-app measures the calibration value when starting, so a shorter
+            workload is enough to check a known calibration.
+        :type duration_s: float
         :returns: Dict mapping CPU numbers to RT-App calibration values.
         """
         pload_regexp = re.compile(r'pLoad = ([0-9]+)ns')
@@ -108,7 +114,10 @@ class RTA(Workload):
 
         target.cpufreq.set_all_governors('performance')
 
-        for cpu in target.list_online_cpus():
+        if cpus is None:
+            cpus = target.list_online_cpus()
+
+        for cpu in cpus:
 
             log.info('CPU%d calibration...', cpu)
 
@@ -123,7 +132,7 @@ class RTA(Workload):
                         'task1': Periodic(
                             period_ms=100,
                             duty_cycle_pct=50,
-                            duration_s=1,
+                            duration_s=duration_s,
                             sched={
                                 'policy': 'FIFO',
                                 'prio' : max_rtprio
@@ -156,6 +165,8 @@ class RTA(Workload):
         if 'bl' in target.modules:
             bcpu = target.bl.bigs_online[0]
             lcpu = target.bl.littles_online[0]
+            if bcpu not in pload or lcpu not in pload:
+                return pload
             if pload[bcpu] > pload[lcpu]:
                 log.warning('Calibration values reports big cores less '
                             'capable than LITTLE cores')
@@ -170,20 +181,22 @@ class RTA(Workload):
         destdir = params['destdir']
         if destdir is None:
             return
-        self._log.debug('Pulling logfiles to [%s]...', destdir)
-        for task in self.tasks.keys():
-            logfile = self.target.path.join(self.run_dir,
-                                            '*{}*.log'.format(task))
-            self.target.pull(logfile, destdir)
-        self._log.debug('Pulling JSON to [%s]...', destdir)
-        self.target.pull(self.target.path.join(self.run_dir, self.json),
-                         destdir)
+        if params.get('pull', True):
+            self._log.debug('Pulling logfiles and JSON to [%s]...', destdir)
+            for path in self.getTargetFiles():
+                self.target.pull(path, destdir)
         logfile = self.target.path.join(destdir, 'output.log')
         self._log.debug('Saving output on [%s]...', logfile)
         with open(logfile, 'w') as ofile:
             for line in self.output['executor'].split('\n'):
                 ofile.write(line+'\n')
 
+    def getTargetFiles(self):
+        files = [self.target.path.join(self.run_dir, '*{}*.log'.format(task))
+                 for task in self.tasks.keys()]
+        files.append(self.target.path.join(self.run_dir, self.json))
+        return files
+
     def _getFirstBiggest(self, cpus):
         # Non big.LITTLE system:
         if 'bl' not in self.target.modules:
@@ -507,6 +520,13 @@ class RTA(Workload):
 
         return self.json
 
+    def push(self):
+        """
+        Create the run folder on the target and push the configuration file
+        """
+        super(RTA, self).push()
+        self.target.push(self.json, self.run_dir)
+
     def conf(self,
              kind,
              params,
@@ -515,7 +535,8 @@ class RTA(Workload):
              sched=None,
              run_dir=None,
              exc_id=0,
-             loadref='big'):
+             loadref='big',
+             push=True):
         """
         Configure a workload of a specified kind.
 
@@ -557,6 +578,11 @@ class RTA(Workload):
 
         :param run_dir: Target dir to store output and config files in.
 
+        :param push: Push the configuration file to the target, otherwise
+                     :meth:`push` has to be called before running the
+                     workload.
+        :type push: bool
+
         .. TODO: document or remove loadref
         """
 
@@ -575,7 +601,8 @@ class RTA(Workload):
             self._confProfile()
 
         # Move configuration file to target
-        self.target.push(self.json, self.run_dir)
+        if push:
+            self.push()
 
         self.rta_cmd  = self.target.executables_directory + '/rt-app'
         self.rta_conf = self.run_dir + '/' + self.json
@@ -19,8 +19,11 @@ import fileinput
 import json
 import os
 import re
+from threading import Thread
 from time import sleep
 
+from devlib.exception import TargetError
+
 import logging
 
 class Workload(object):
@@ -113,9 +116,11 @@ class Workload(object):
 
           "postrun"
             Called after the workload has finished executing, unless it's being
-            run in the background. Receives a ``params`` dictionary with
+            run in the background. With :meth:`run_async`, it is called when
+            the workload is waited for. Receives a ``params`` dictionary with
             ``params["destdir"]`` set to the host directory to store workload
-            output in.
+            output in, and ``params["pull"]`` set to False if the files listed
+            by :meth:`getTargetFiles` must be left on the target.
 
         :param step: Name of the step at which to call the callback.
         :param func: Callback function.
@@ -153,10 +158,9 @@ class Workload(object):
         # Map of task/s parameters
         self.params = {}
 
-        # Initialize run folder
+        # Initialize run folder, created on the target by push()
         if self.run_dir is None:
             self.run_dir = self.target.working_directory
-        self.target.execute('mkdir -p {}'.format(self.run_dir))
 
         # Configure a profile workload
         if kind == 'profile':
@@ -172,6 +176,16 @@ class Workload(object):
             self._log.error('%s is not a supported RTApp workload kind', kind)
             raise ValueError('RTApp workload kind not supported')
 
+    def push(self):
+        """
+        Create the run folder on the target and push the files of the workload
+
+        Called when the workload is configured, unless configured with
+        ``push=False``. Call it again if the run folder may have been wiped
+        since, e.g. by a reboot of the target.
+        """
+        self.target.execute('mkdir -p {}'.format(self.run_dir))
+
     def run(self,
             ftrace=None,
             cgroup=None,
@@ -180,7 +194,8 @@ class Workload(object):
             out_dir='./',
             as_root=False,
             start_pause_s=None,
-            end_pause_s=None):
+            end_pause_s=None,
+            pull_output=True):
         """
         This method starts the execution of the workload. If the user provides
         an ftrace object, the method will also collect a trace.
@@ -221,33 +236,16 @@ class Workload(object):
                             seconds. If ftrace is provided, trace collection is
                             stopped after this wait time.
         :type end_pause_s: float
+
+        :param pull_output: pull the output files generated on the target into
+                            out_dir. If False, the caller is expected to
+                            collect the files listed by
+                            :meth:`getTargetFiles` before the next execution.
+        :type pull_output: bool
         """
 
         self.cgroup = cgroup
-
-        # Compose the actual execution command starting from the base command
-        # defined by the base class
-        _command = self.command
-
-        if not _command:
-            self._log.error('Error: empty executor command')
-
-        # Prepend eventually required taskset command
-        if cpus or self.cpus:
-            cpus_mask = self.getCpusMask(cpus if cpus else self.cpus)
-            taskset_cmd = '{}/taskset 0x{:X}'\
-                    .format(self.target.executables_directory,
-                            cpus_mask)
-            _command = '{} {}'\
-                    .format(taskset_cmd, _command)
-
-        if self.cgroup:
-            if hasattr(self.target, 'cgroups'):
-                _command = self.target.cgroups.run_into_cmd(self.cgroup,
-                                                            _command)
-            else:
-                raise ValueError('To run workload in a cgroup, add "cgroups" '
-                                 'devlib module to target/test configuration')
+        _command = self._buildCommand(cpus)
 
         # Start FTrace (if required)
         if ftrace:
@@ -293,11 +291,80 @@ class Workload(object):
             ftrace.get_trace(ftrace_dat)
 
         if not background:
-            self.__callback('postrun', destdir=out_dir)
+            self.__callback('postrun', destdir=out_dir, pull=pull_output)
             self._log.debug('Workload execution COMPLETED')
 
         return ftrace_dat
 
+    def run_async(self,
+                  cgroup=None,
+                  cpus=None,
+                  out_dir='./',
+                  as_root=False,
+                  pull_output=True):
+        """
+        Start the workload and return without waiting for it to complete
+
+        Several workloads can be started this way to run concurrently, and
+        then waited for with :func:`wait_workloads`. Unlike a background
+        :meth:`run`, the output of the workload is collected and its postrun
+        callback is called when it is waited for.
+
+        The parameters have the same meaning as for :meth:`run`.
+
+        :returns: a :class:`WorkloadRun` to wait for the workload
+        """
+        self.cgroup = cgroup
+        _command = self._buildCommand(cpus)
+
+        self._log.info('Workload execution START (async):')
+        self._log.info('   %s', _command)
+        process = self.target.background(_command, as_root=as_root)
+        return WorkloadRun(self, process, out_dir, pull_output)
+
+    def _buildCommand(self, cpus=None):
+        # Compose the actual execution command starting from the base command
+        # defined by the base class
+        _command = self.command
+
+        if not _command:
+            self._log.error('Error: empty executor command')
+
+        # Prepend eventually required taskset command
+        if cpus or self.cpus:
+            cpus_mask = self.getCpusMask(cpus if cpus else self.cpus)
+            taskset_cmd = '{}/taskset 0x{:X}'\
+                    .format(self.target.executables_directory,
+                            cpus_mask)
+            _command = '{} {}'\
+                    .format(taskset_cmd, _command)
+
+        if self.cgroup:
+            if hasattr(self.target, 'cgroups'):
+                _command = self.target.cgroups.run_into_cmd(self.cgroup,
+                                                            _command)
+            else:
+                raise ValueError('To run workload in a cgroup, add "cgroups" '
+                                 'devlib module to target/test configuration')
+
+        return _command
+
+    def _complete(self, output, out_dir, pull_output):
+        self.output['executor'] = output
+        self.__callback('postrun', destdir=out_dir, pull=pull_output)
+        self._log.debug('Workload execution COMPLETED')
+
+    def getTargetFiles(self):
+        """
+        Get the target paths of the output files generated by the workload
+
+        Paths can contain shell wildcards. By default workloads generate no
+        output files on the target.
+
+        :returns: list(str)
+        """
+        return []
+
     def getOutput(self, step='executor'):
         return self.output[step]
 
@@ -315,3 +382,103 @@ class Workload(object):
             return
         self._log.info('Killing all [%s] instances:', self.executor)
         self.listAll(True)
+
+
+class WorkloadRun(object):
+    """
+    Handle of a workload started by :meth:`Workload.run_async`
+
+    The output of the workload is read by a thread as it runs, while the
+    postrun callback of the workload is called by :meth:`wait`, in the
+    calling thread.
+
+    :param workload: the workload which has been started
+    :type workload: :class:`Workload`
+
+    :param process: the process running the workload, as returned by
+                    ``target.background``
+    :type process: subprocess.Popen
+    """
+
+    def __init__(self, workload, process, out_dir, pull_output):
+        self.workload = workload
+        self.process = process
+        self.out_dir = out_dir
+        self.pull_output = pull_output
+        self._completed = False
+        self._output = None
+        self._error = None
+
+        self._reader = Thread(target=self._read)
+        self._reader.daemon = True
+        self._reader.start()
+
+    def _read(self):
+        stdout, stderr = self.process.communicate()
+        if self.process.returncode:
+            self._error = TargetError(
+                'Workload [{}] failed with exit code {}:\n{}'\
+                .format(self.workload.name, self.process.returncode,
+                        stderr))
+        self._output = stdout
+
+    def done(self):
+        """
+        Check whether the workload has completed
+        """
+        return not self._reader.is_alive()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the workload to complete and run its postrun callback
+
+        :param timeout: maximum time to wait in seconds, forever if None
+        :type timeout: float
+
+        :returns: the output of the workload
+
+        :raises TargetError: if the workload failed or has not completed
+                             within the timeout
+        """
+        self._reader.join(timeout)
+        if self._reader.is_alive():
+            raise TargetError('Workload [{}] not completed after {} [s]'\
+                              .format(self.workload.name, timeout))
+        if self._error:
+            raise self._error
+        if not self._completed:
+            self.workload._complete(self._output, self.out_dir,
+                                    self.pull_output)
+            self._completed = True
+        return self._output
+
+def wait_workloads(runs, timeout=None):
+    """
+    Wait for a group of workloads started by :meth:`Workload.run_async`
+
+    All the workloads are waited for, even if some of them failed, so that
+    the postrun callbacks of the others are called.
+
+    :param runs: handles of the workloads to wait for
+    :type runs: list(:class:`WorkloadRun`)
+
+    :param timeout: maximum time to wait for each workload in seconds, forever
+                    if None
+    :type timeout: float
+
+    :returns: dict mapping the name of each workload to its output
+
+    :raises TargetError: if any of the workloads failed, once all of them have
+                         been waited for
+    """
+    outputs = {}
+    error = None
+    for run in runs:
+        try:
+            outputs[run.workload.name] = run.wait(timeout)
+        except TargetError as e:
+            run.workload._log.error('%s', e)
+            error = error or e
+    if error:
+        raise error
+    return outputs
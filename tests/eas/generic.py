@@ -15,8 +15,6 @@
 # limitations under the License.
 #
 
-from math import isnan
-
 import numpy as np
 import pandas as pd
 
@@ -33,6 +31,29 @@ WORKLOAD_PERIOD_MS =  10
 SET_IS_BIG_LITTLE = True
 SET_INITIAL_TASK_UTIL = True
 
+def _values_at(index, series, count):
+    """
+    Sample step functions at each time of an index
+
+    :param index: Sorted times to sample at
+    :param series: List of ``(times, values)`` step functions, with sorted
+                   times. For repeated times the last value holds.
+    :param count: Number of step functions, in case ``series`` is empty
+    :returns: An array with a column for each step function, holding the value
+              it had at each time of ``index``, or NaN before its first time
+    """
+    ret = np.full((len(index), count), np.nan)
+    for j, (times, values) in enumerate(series):
+        times = np.asarray(times)
+        values = np.asarray(values, dtype=float)
+        if not len(times):
+            continue
+        last = np.append(times[1:] != times[:-1], True)
+        times, values = times[last], values[last]
+        pos = np.searchsorted(times, index, side='right') - 1
+        ret[pos >= 0, j] = values[pos[pos >= 0]]
+    return ret
+
 class _EnergyModelTest(LisaTest):
     """
     "Abstract" base class for generic EAS tests using the EnergyModel class
@@ -69,6 +90,12 @@ class _EnergyModelTest(LisaTest):
     compared to optimal placment.
     """
 
+    placement_search_processes = None
+    """
+    Number of host processes used to search for optimal task placements. See
+    :meth:`EnergyModel.get_optimal_placements`.
+    """
+
     @classmethod
     def setUpClass(cls, *args, **kwargs):
         super(_EnergyModelTest, cls).runExperiments(*args, **kwargs)
@@ -119,38 +146,75 @@ class _EnergyModelTest(LisaTest):
                 "/proc/sys/kernel/sched_initial_task_util", 1024, verify=False)
 
 
-    def get_task_utils_df(self, experiment):
+    def _get_task_utils(self, experiment):
         """
-        Get a DataFrame with the *expected* utilization of each task over time
+        Get the *expected* utilization of each task at each of its changes
 
         :param experiment: The :class:Experiment to examine
-        :returns: A Pandas DataFrame with a column for each task, showing how
-                  the utilization of that task varies over time
+        :returns: A tuple ``(times, tasks, utils)`` where ``utils[i, j]`` is the
+                  expected utilization of ``tasks[j]`` from ``times[i]``, or NaN
+                  before the task starts
         """
         util_scale = self.te.nrg_model.capacity_scale
+        start_time = self.get_start_time(experiment)
 
-        transitions = {}
-        def add_transition(time, task, util):
-            if time not in transitions:
-                transitions[time] = {task: util}
-            else:
-                transitions[time][task] = util
-
-        # First we'll build a dict D {time: {task_name: util}} where D[t][n] is
-        # the expected utilization of task n from time t.
-        for task, params in experiment.wload.params['profile'].iteritems():
-            time = self.get_start_time(experiment) + params['delay']
-            add_transition(time, task, 0)
+        profile = experiment.wload.params['profile']
+        tasks = sorted(profile.keys())
+        transitions = []
+        for task in tasks:
+            params = profile[task]
+            time = start_time + params['delay']
+            times, utils = [time], [0]
             for _ in range(params.get('loops', 1)):
                 for phase in params['phases']:
-                    util = (phase.duty_cycle_pct * util_scale / 100.)
-                    add_transition(time, task, util)
+                    times.append(time)
+                    utils.append(phase.duty_cycle_pct * util_scale / 100.)
                     time += phase.duration_s
-            add_transition(time, task, 0)
+            times.append(time)
+            utils.append(0)
+            transitions.append((times, utils))
+
+        index = np.unique(np.concatenate([t for t, _ in transitions]))
+        utils = _values_at(index, transitions, len(tasks))
+        return index, tasks, utils
+
+    def _get_task_cpus(self, experiment):
+        """
+        Get the CPU each task was "on" at each change of placement
+
+        :param experiment: The :class:Experiment to examine
+        :returns: A tuple ``(times, tasks, cpus)`` where ``cpus[i, j]`` is the
+                  CPU ``tasks[j]`` was on from ``times[i]``, or NaN before the
+                  task first ran
+        """
+        tasks = sorted(experiment.wload.tasks.keys())
+        trace = self.get_trace(experiment)
 
-        index = sorted(transitions.keys())
-        df = pd.DataFrame([transitions[k] for k in index], index=index)
-        return df.fillna(method='ffill')
+        df = trace.ftrace.sched_switch.data_frame
+        df = df[df['next_comm'].isin(tasks)]
+        times = df.index.values
+        comms = df['next_comm'].values
+        task_cpus = df['__cpu'].values
+
+        index = np.unique(times)
+        series = [(times[comms == task], task_cpus[comms == task])
+                  for task in tasks]
+        cpus = _values_at(index, series, len(tasks))
+        # Drop consecutive duplicates
+        changed = np.ones(len(index), dtype=bool)
+        changed[1:] = (cpus[1:] != cpus[:-1]).any(axis=1)
+        return index[changed], tasks, cpus[changed]
+
+    def get_task_utils_df(self, experiment):
+        """
+        Get a DataFrame with the *expected* utilization of each task over time
+
+        :param experiment: The :class:Experiment to examine
+        :returns: A Pandas DataFrame with a column for each task, showing how
+                  the utilization of that task varies over time
+        """
+        index, tasks, utils = self._get_task_utils(experiment)
+        return pd.DataFrame(utils, index=index, columns=tasks)
 
     def get_task_cpu_df(self, experiment):
         """
@@ -164,16 +228,8 @@ class _EnergyModelTest(LisaTest):
         :returns: A Pandas DataFrame with a column for each task, showing the
                   CPU that the task was "on" at each moment in time
         """
-        tasks = experiment.wload.tasks.keys()
-        trace = self.get_trace(experiment)
-
-        df = trace.ftrace.sched_switch.data_frame[['next_comm', '__cpu']]
-        df = df[df['next_comm'].isin(tasks)]
-        df = df.pivot(index=df.index, columns='next_comm').fillna(method='ffill')
-        cpu_df = df['__cpu']
-        # Drop consecutive duplicates
-        cpu_df = cpu_df[(cpu_df.shift(+1) != cpu_df).any(axis=1)]
-        return cpu_df
+        index, tasks, cpus = self._get_task_cpus(experiment)
+        return pd.DataFrame(cpus, index=index, columns=tasks)
 
     def _sort_power_df_columns(self, df):
         """
@@ -189,52 +245,47 @@ class _EnergyModelTest(LisaTest):
         """
         Considering only the task placement, estimate power usage over time
 
-        Examine a trace and use :meth:EnergyModel.estimate_from_cpu_util to get
-        a DataFrame showing the estimated power usage over time. This assumes
-        perfect cpuidle and cpufreq behaviour.
+        Examine a trace and use :meth:EnergyModel.estimate_from_cpu_util_series
+        to get a DataFrame showing the estimated power usage over time. This
+        assumes perfect cpuidle and cpufreq behaviour.
 
         :param experiment: The :class:Experiment to examine
         :returns: A Pandas DataFrame with a column node in the energy model
                   (keyed with a tuple of the CPUs contained by that node) Shows
                   the estimated power over time.
         """
-        task_cpu_df = self.get_task_cpu_df(experiment)
-        task_utils_df = self.get_task_utils_df(experiment)
-
-        tasks = experiment.wload.tasks.keys()
-
-        # Create a combined DataFrame with the utilization of a task and the CPU
-        # it was running on at each moment. Looks like:
-        #                       utils                  cpus
-        #          task_wmig0 task_wmig1 task_wmig0 task_wmig1
-        # 2.375056      102.4      102.4        NaN        NaN
-        # 2.375105      102.4      102.4        2.0        NaN
-
-        df = pd.concat([task_utils_df, task_cpu_df],
-                       axis=1, keys=['utils', 'cpus'])
-        df = df.sort_index().fillna(method='ffill')
-        nrg_model = self.executor.te.nrg_model
-
-        # Now make a DataFrame with the estimated power at each moment.
-        def est_power(row):
-            cpu_utils = [0 for cpu in nrg_model.cpus]
-            for task in tasks:
-                cpu = row['cpus'][task]
-                util = row['utils'][task]
-                if not isnan(cpu):
-                    cpu_utils[int(cpu)] += util
-            power = nrg_model.estimate_from_cpu_util(cpu_utils)
-            columns = power.keys()
-            return pd.Series([power[c] for c in columns], index=columns)
-        return self._sort_power_df_columns(df.apply(est_power, axis=1))
+        utils_index, tasks, task_utils = self._get_task_utils(experiment)
+        cpus_index, cpus_tasks, task_cpus = self._get_task_cpus(experiment)
+
+        # Align the utilization of each task and the CPU it was running on at
+        # each moment on a common timeline
+        index = np.union1d(utils_index, cpus_index)
+        task_utils = _values_at(index, [(utils_index, task_utils[:, j])
+                                        for j in range(len(tasks))],
+                                len(tasks))
+        task_cpus = _values_at(index, [(cpus_index, task_cpus[:, j])
+                                       for j in range(len(cpus_tasks))],
+                               len(cpus_tasks))
+
+        # Sum the utilization of the tasks placed on each CPU at each moment
+        nrg_model = self.te.nrg_model
+        cpu_utils = np.zeros((len(index), len(nrg_model.cpus)))
+        for task in experiment.wload.tasks.keys():
+            cpus = task_cpus[:, cpus_tasks.index(task)]
+            placed = ~np.isnan(cpus)
+            cpu_utils[placed, cpus[placed].astype(int)] += \
+                task_utils[placed, tasks.index(task)]
+
+        power = nrg_model.estimate_from_cpu_util_series(cpu_utils, index=index)
+        return self._sort_power_df_columns(power)
 
     def get_expected_power_df(self, experiment):
         """
         Estimate *optimal* power usage over time
 
         Examine a trace and use :meth:get_optimal_placements and
-        :meth:EnergyModel.estimate_from_cpu_util to get a DataFrame showing the
-        estimated power usage over time under ideal EAS behaviour.
+        :meth:EnergyModel.estimate_from_cpu_util_series to get a DataFrame
+        showing the estimated power usage over time under ideal EAS behaviour.
 
         :param experiment: The :class:Experiment to examine
         :returns: A Pandas DataFrame with a column each node in the energy model
@@ -242,18 +293,25 @@ class _EnergyModelTest(LisaTest):
                   "power" column with the sum of other columns. Shows the
                   estimated *optimal* power over time.
         """
-        task_utils_df = self.get_task_utils_df(experiment)
+        index, tasks, task_utils = self._get_task_utils(experiment)
 
         nrg_model = self.te.nrg_model
 
-        def exp_power(row):
-            task_utils = row.to_dict()
-            expected_utils = nrg_model.get_optimal_placements(task_utils)
-            power = nrg_model.estimate_from_cpu_util(expected_utils[0])
-            columns = power.keys()
-            return pd.Series([power[c] for c in columns], index=columns)
-        return self._sort_power_df_columns(
-            task_utils_df.apply(exp_power, axis=1))
+        # The optimal placement only depends on the task utilizations, so only
+        # search it once for each combination
+        placements = {}
+        cpu_utils = np.zeros((len(index), len(nrg_model.cpus)))
+        for i, utils in enumerate(task_utils):
+            key = tuple(utils)
+            if key not in placements:
+                expected_utils = nrg_model.get_optimal_placements(
+                    dict(zip(tasks, utils)),
+                    processes=self.placement_search_processes)
+                placements[key] = expected_utils[0]
+            cpu_utils[i] = placements[key]
+
+        power = nrg_model.estimate_from_cpu_util_series(cpu_utils, index=index)
+        return self._sort_power_df_columns(power)
 
     def _test_slack(self, experiment, tasks):
         """
@@ -0,0 +1,141 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import stat
+import tempfile
+from unittest import TestCase
+
+from devlib import TargetError
+from mock import patch
+
+from android import System
+from android.shell import (ShellSession, open_session, shell_session,
+                           close_sessions)
+
+class TestShellSession(TestCase):
+    """Tests for ShellSession, using a local shell as a stand-in for adb"""
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.session = ShellSession(['sh'])
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.res_dir)
+
+    def test_execute(self):
+        """Commands run in the same shell and their outputs are delimited"""
+        self.assertEqual(self.session.execute('echo hello; echo world'),
+                         'hello\nworld\n')
+        self.assertEqual(self.session.execute('true'), '')
+        pid = self.session.execute('echo $$')
+        self.assertEqual(self.session.execute('echo $$'), pid)
+
+    def test_errors(self):
+        with self.assertRaises(TargetError):
+            self.session.execute('exit 3')
+        self.assertEqual(self.session.execute('echo ok; false',
+                                              check_exit_code=False), 'ok\n')
+        errors = []
+        self.session.execute('false', on_error=errors.append)
+        self.assertEqual(len(errors), 1)
+
+    def test_batch(self):
+        """Batched commands are sent together when the batch exits"""
+        path = os.path.join(self.res_dir, 'out')
+        with self.session.batch():
+            self.assertIsNone(self.session.execute('echo 1 > ' + path))
+            self.session.execute('echo 2 >> ' + path)
+            self.assertFalse(os.path.exists(path))
+        with open(path) as fh:
+            self.assertEqual(fh.read(), '1\n2\n')
+
+        with self.assertRaises(TargetError):
+            with self.session.batch():
+                self.session.execute('false')
+                self.session.execute('echo 3 >> ' + path)
+        # The failure does not desync the outputs of the following commands
+        self.assertEqual(self.session.execute('cat ' + path), '1\n2\n3\n')
+
+    def test_echoing_shell(self):
+        """Shells echoing their input do not desync the outputs"""
+        session = ShellSession(['sh', '-v'])
+        try:
+            self.assertTrue(session.execute('echo hello').endswith('hello\n'))
+            with self.assertRaises(TargetError):
+                with session.batch():
+                    session.execute('echo 1')
+                    session.execute('exit 3')
+            self.assertTrue(session.execute('echo $((1 + 1))').endswith('2\n'))
+        finally:
+            session.close()
+
+class _AndroidTarget(object):
+    adb_name = 'test-device'
+    screen_resolution = (1000, 2000)
+
+class TestSystemShell(TestCase):
+    """Tests for the System helpers executing in the shell session"""
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.log = os.path.join(self.res_dir, 'input.log')
+
+        # Stand-in for the input tool, logging its arguments
+        bin_dir = os.path.join(self.res_dir, 'bin')
+        os.mkdir(bin_dir)
+        tool = os.path.join(bin_dir, 'input')
+        with open(tool, 'w') as fh:
+            fh.write('#!/bin/sh\necho "$@" >> {}\n'.format(self.log))
+        os.chmod(tool, stat.S_IRWXU)
+
+        self.target = _AndroidTarget()
+        path = '{}:{}'.format(bin_dir, os.environ['PATH'])
+        open_session(self.target, ['env', 'PATH=' + path, 'sh'])
+
+    def tearDown(self):
+        close_sessions()
+        shutil.rmtree(self.res_dir)
+
+    def read_log(self):
+        with open(self.log) as fh:
+            return fh.read().splitlines()
+
+    def test_helpers(self):
+        session = shell_session(self.target)
+        System.tap(self.target, 10, 20)
+        System.home(self.target)
+        self.assertIs(shell_session(self.target), session)
+        self.assertListEqual(self.read_log(),
+                             ['tap 100 400', 'keyevent KEYCODE_HOME'])
+
+    def test_batch(self):
+        with System.batch(self.target):
+            System.vswipe(self.target, 20, 80)
+            System.back(self.target)
+            self.assertFalse(os.path.exists(self.log))
+        self.assertListEqual(self.read_log(),
+                             ['swipe 500 1600 500 400', 'keyevent KEYCODE_BACK'])
+
+    def test_wait_tracing_on(self):
+        tracing_on = os.path.join(self.res_dir, 'tracing_on')
+        with patch('android.system.TRACING_ON', tracing_on):
+            with self.assertRaises(TargetError):
+                System.wait_tracing_on(self.target, timeout=5)
+            with open(tracing_on, 'w') as fh:
+                fh.write('1\n')
+            System.wait_tracing_on(self.target, timeout=5)
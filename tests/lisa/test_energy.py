@@ -0,0 +1,239 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import namedtuple
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from StringIO import StringIO
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from bart.common.Utils import area_under_curve
+
+from energy import (integrate_samples_csv, save_samples_npy,
+                    load_samples_npy, _HWMonSampler, ACME)
+from test_wlgen import TestTarget
+
+""" Tests for the energy meter helpers that don't need an instrument"""
+
+COLUMNS = [('BAT', 'power'), ('BAT', 'current'), ('USB', 'power')]
+
+def make_csv(num_samples, nan_every=0):
+    """Build the body (without headers) of a devlib instrument CSV"""
+    rows = []
+    for i in range(num_samples):
+        bat = '' if nan_every and i % nan_every == 0 else str(1 + (i % 7))
+        rows.append('{},{},{}'.format(bat, i % 3, 0.5 * (i % 11)))
+    return '\n'.join(rows) + '\n'
+
+def full_energy(body, sample_period):
+    """Integrate the CSV the way _DevlibContinuousEnergyMeter.report does"""
+    df = pd.read_csv(StringIO(body), names=COLUMNS)
+    df.index = np.linspace(0, sample_period * len(df), num=len(df))
+    return {site: area_under_curve(df[site]['power'])
+            for site, measure in df if measure == 'power'}
+
+class TestIntegrateSamplesCsv(TestCase):
+    def _check(self, num_samples, chunk_size, nan_every=0):
+        body = make_csv(num_samples, nan_every)
+        expected = full_energy(body, 0.001)
+        nrg, df = integrate_samples_csv(StringIO(body), COLUMNS, 0.001,
+                                        chunk_size=chunk_size)
+        self.assertIsNone(df)
+        self.assertEqual(sorted(nrg.keys()), sorted(expected.keys()))
+        for site in expected:
+            self.assertAlmostEqual(nrg[site], expected[site])
+
+    def test_single_chunk(self):
+        self._check(100, chunk_size=1000)
+
+    def test_many_chunks(self):
+        self._check(1000, chunk_size=7)
+
+    def test_missing_values(self):
+        self._check(1000, chunk_size=10, nan_every=10)
+
+    def test_empty(self):
+        with self.assertRaises(RuntimeError):
+            integrate_samples_csv(StringIO(''), COLUMNS, 0.001)
+
+    def test_downsample(self):
+        body = make_csv(1000)
+        _, df = integrate_samples_csv(StringIO(body), COLUMNS, 0.001,
+                                      chunk_size=33, downsample=10)
+        full = pd.read_csv(StringIO(body), names=COLUMNS)
+        self.assertEqual(len(df), 100)
+        self.assertListEqual(list(df.columns), COLUMNS)
+        self.assertAlmostEqual(df[('USB', 'power')].iloc[3],
+                               full[('USB', 'power')][30:40].mean())
+
+class TestSamplesNpy(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_round_trip(self):
+        _, df = integrate_samples_csv(StringIO(make_csv(100)), COLUMNS, 0.001,
+                                      downsample=10)
+        path = os.path.join(self.tmp_dir, 'samples.npy')
+        save_samples_npy(df, path)
+        loaded = load_samples_npy(path)
+        self.assertListEqual(list(loaded.columns), COLUMNS)
+        np.testing.assert_allclose(loaded.index, df.index)
+        np.testing.assert_allclose(loaded.values, df.values, rtol=1e-6)
+
+class _FakeSensor(namedtuple('_FakeSensor', ['path', 'kind'])):
+    """Stands in for a devlib HwmonSensor backed by a local file"""
+    def get_file(self, item):
+        return self.path
+
+_FakeChannel = namedtuple('_FakeChannel', ['site', 'sensor'])
+
+class _BusyTarget(TestTarget):
+    """
+    TestTarget whose commands wait for :attr:`busy` to be released, like an
+    SSH connection while it runs the workload
+    """
+    def __init__(self):
+        self.busy = threading.Lock()
+        super(_BusyTarget, self).__init__()
+
+    def execute(self, *args, **kwargs):
+        with self.busy:
+            return super(_BusyTarget, self).execute(*args, **kwargs)
+
+class TestHWMonSampler(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.target = _BusyTarget()
+        if not os.path.isdir(self.target.working_directory):
+            os.makedirs(self.target.working_directory)
+        self.channels = []
+        for site, value in [('BOARDBIG', 3000000), ('BOARDLITTLE', 1000000)]:
+            path = os.path.join(self.tmp_dir, site)
+            with open(path, 'w') as f:
+                f.write('{}\n'.format(value))
+            self.channels.append(_FakeChannel(site, _FakeSensor(path, 'energy')))
+        self.sampler = _HWMonSampler(self.target, self.channels,
+                                     period_s=0.01, buffer_size=5)
+
+    def tearDown(self):
+        self.sampler.stop()
+        shutil.rmtree(self.tmp_dir)
+
+    def test_samples(self):
+        self.sampler.start()
+        # The target connection is busy running the workload
+        with self.target.busy:
+            time.sleep(0.2)
+        self.sampler.stop()
+
+        # The ring buffer only holds the latest 5 samples
+        df = self.sampler.get_data_frame({'BOARDBIG': 1, 'BOARDLITTLE': 0.5},
+                                         {'BOARDBIG': 'big',
+                                          'BOARDLITTLE': 'LITTLE'})
+        self.assertEqual(len(df), 5)
+        self.assertTrue((df.index.values[1:] > df.index.values[:-1]).all())
+        self.assertListEqual(list(df.columns),
+                             [('LITTLE', 'energy'), ('LITTLE', 'power'),
+                              ('big', 'energy'), ('big', 'power')])
+        self.assertTrue((df[('big', 'energy')] == 2).all())
+        self.assertTrue((df[('LITTLE', 'energy')] == 0.5).all())
+
+        path = os.path.join(self.tmp_dir, 'samples.csv')
+        self.sampler.write_csv(df, path)
+        with open(path) as f:
+            self.assertEqual(f.readline().strip(),
+                             'time,LITTLE_energy,LITTLE_power,'
+                             'big_energy,big_power')
+
+IIO_CAPTURE = os.path.join(os.path.dirname(__file__), 'bin', 'iio-capture')
+
+class TestACME(TestCase):
+    """Test the ACME energy meter with a stand-in iio-capture script"""
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.out_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+        shutil.rmtree(self.out_dir)
+
+    def get_acme(self, channel_map):
+        conf = {
+            'conf' : {
+                'iio-capture' : IIO_CAPTURE,
+                'ip_address' : 'localhost',
+                'start_timeout_s' : 1,
+            },
+            'channel_map' : channel_map,
+        }
+        return ACME(None, conf, self.res_dir)
+
+    def test_report(self):
+        acme = self.get_acme({'CH0' : '0', 'CH1' : '1'})
+        acme.reset()
+        time.sleep(0.1)
+        report = acme.report(self.out_dir)
+
+        self.assertDictEqual(report.channels, {'CH0' : 1, 'CH1' : 11})
+        with open(os.path.join(self.out_dir, 'energy.json')) as f:
+            self.assertDictEqual(json.load(f), {'CH0' : 1, 'CH1' : 11})
+        with open(os.path.join(self.out_dir, 'energy_stats.json')) as f:
+            self.assertEqual(json.load(f)['CH1']['power_avg'], 1.5)
+        for channel in ['CH0', 'CH1']:
+            csv = os.path.join(self.out_dir, 'samples_{}.csv'.format(channel))
+            self.assertTrue(os.path.isfile(csv))
+        self.assertListEqual(os.listdir(self.res_dir), [])
+
+    def test_reset_twice(self):
+        acme = self.get_acme({'CH0' : '0'})
+        acme.reset()
+        acme.reset()
+        report = acme.report(self.out_dir)
+        self.assertDictEqual(report.channels, {'CH0' : 1})
+
+    def test_exited_capture(self):
+        """The output of a capture which exited cleanly is collected"""
+        acme = self.get_acme({'CH0' : '0', 'CH1' : '1'})
+        acme.reset()
+        proc = acme._iio['1']
+        proc.terminate()
+        proc.wait()
+        report = acme.report(self.out_dir)
+        self.assertDictEqual(report.channels, {'CH0' : 1, 'CH1' : 11})
+        self.assertTrue(os.path.isfile(
+            os.path.join(self.out_dir, 'samples_CH1.csv')))
+
+    def test_connection_error(self):
+        acme = self.get_acme({'CH0' : '0', 'BAD' : '99'})
+        with self.assertRaises(RuntimeError):
+            acme.reset()
+
+    def test_start_timeout(self):
+        acme = self.get_acme({'CH0' : '0', 'HUNG' : '98'})
+        with self.assertRaises(RuntimeError):
+            acme.reset()
+        self.assertDictEqual(acme._iio, {})
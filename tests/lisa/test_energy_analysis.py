@@ -0,0 +1,158 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from trace import Trace
+
+SWITCH = '          <idle>-0     [00{cpu}] d..3 {time:.6f}: sched_switch: ' \
+         'prev_comm={prev_comm} prev_pid={prev_pid} prev_prio=120 ' \
+         'prev_state={prev_state} ==> next_comm={next_comm} ' \
+         'next_pid={next_pid} next_prio=120\n'
+IDLE = '          <idle>-0     [00{cpu}] d..2 {time:.6f}: cpu_idle: ' \
+       'state={state} cpu_id={cpu}\n'
+MARKER = '              sh-1234  [000] ...1 {time:.6f}: tracing_mark_write: ' \
+         'lisa_energy_marker: event={event}\n'
+
+# (cpu, comm, pid, start, end) of each task activation
+RUNS = [
+    (0, 'busy', 11, 100.5, 101.0),
+    (1, 'other', 12, 100.5, 100.7),
+    (0, 'busy', 11, 101.5, 101.8),
+]
+
+# Energy meter samples: 1kHz from 100.2 to 101.9
+START = 100.2
+STOP = 101.9
+SAMPLE_RATE_HZ = 1000
+
+platform = {
+    'clusters' : {'little' : [0, 1]},
+    'cpus_count' : 2,
+    'freqs' : {'little' : [1000]},
+    'topology' : [[0, 1]],
+}
+
+class TestEnergyAnalysis(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def _write_trace(self, markers):
+        events = [(100.0, IDLE.format(cpu=0, time=100.0, state=0)),
+                  (100.0, IDLE.format(cpu=1, time=100.0, state=0)),
+                  (102.0, IDLE.format(cpu=1, time=102.0, state=0))]
+        for cpu, comm, pid, start, end in RUNS:
+            idle_comm = 'swapper/{}'.format(cpu)
+            events += [
+                (start, IDLE.format(cpu=cpu, time=start, state=-1)),
+                (start, SWITCH.format(
+                    cpu=cpu, time=start, prev_comm=idle_comm, prev_pid=0,
+                    prev_state='R', next_comm=comm, next_pid=pid)),
+                (end, SWITCH.format(
+                    cpu=cpu, time=end, prev_comm=comm, prev_pid=pid,
+                    prev_state='S', next_comm=idle_comm, next_pid=0)),
+                (end + 1e-6, IDLE.format(cpu=cpu, time=end + 1e-6, state=0)),
+            ]
+        if markers:
+            events += [(START, MARKER.format(time=START, event='start')),
+                       (STOP, MARKER.format(time=STOP, event='stop'))]
+
+        lines = ['# tracer: nop\n', '#\n']
+        lines += [line for _, line in sorted(events)]
+        for name in ['trace.txt', 'trace.raw.txt']:
+            with open(os.path.join(self.res_dir, name), 'w') as fh:
+                fh.writelines(lines)
+
+    def _write_samples(self, name, power):
+        with open(os.path.join(self.res_dir, name), 'w') as fh:
+            fh.write('LITTLE_power\n')
+            fh.writelines('{:f}\n'.format(p) for p in power)
+
+    def _get_trace(self, markers):
+        self._write_trace(markers)
+
+        # Power following the number of active CPUs
+        times = START + np.arange(
+            int(round((STOP - START) * SAMPLE_RATE_HZ)) + 1) \
+            / float(SAMPLE_RATE_HZ)
+        active = np.zeros(len(times))
+        for _, _, _, start, end in RUNS:
+            active += (times >= start) & (times < end)
+        self._write_samples('samples.csv', 0.5 + active)
+        self._write_samples('constant.csv', np.full(len(times), 2.0))
+
+        return Trace(platform, self.res_dir,
+                     events=['sched_switch', 'cpu_idle', 'lisa_energy_marker'],
+                     normalize_time=False)
+
+    def test_markers(self):
+        """Samples are spread between the start and stop markers"""
+        trace = self._get_trace(markers=True)
+        markers = trace.data_frame.energy_markers()
+        self.assertListEqual(list(markers.event), ['start', 'stop'])
+
+        samples = trace.data_frame.energy_samples()
+        self.assertListEqual(list(samples.columns), ['LITTLE'])
+        self.assertAlmostEqual(samples.index[0], START)
+        self.assertAlmostEqual(samples.index[-1], STOP)
+
+    def test_offset_estimate(self):
+        """Without markers, samples are aligned on the CPUs activity"""
+        trace = self._get_trace(markers=False)
+        self.assertIsNone(trace.data_frame.energy_markers())
+
+        samples = trace.data_frame.energy_samples(
+            sample_rate_hz=SAMPLE_RATE_HZ)
+        self.assertAlmostEqual(samples.index[0], START, places=3)
+
+        power = samples.LITTLE
+        power.index = power.index - power.index[0]
+        offset = trace.analysis.energy.estimate_energy_offset(
+            power, max_offset_s=1)
+        self.assertAlmostEqual(offset, START, places=3)
+
+    def test_tasks(self):
+        """Energy is split between the tasks running at each sample"""
+        trace = self._get_trace(markers=True)
+        samples = trace.data_frame.energy_samples(samples_file='constant.csv')
+        nrg = trace.data_frame.energy_tasks(samples=samples).LITTLE
+
+        # 2W, shared while both tasks run
+        self.assertAlmostEqual(nrg['busy'], 2 * (0.2 / 2 + 0.3 + 0.3),
+                               places=2)
+        self.assertAlmostEqual(nrg['other'], 2 * 0.2 / 2, places=2)
+        self.assertAlmostEqual(nrg.sum(), 2 * (STOP - START), places=2)
+
+    def test_cluster_activity(self):
+        """Energy is split between cluster active and idle time"""
+        trace = self._get_trace(markers=True)
+        samples = trace.data_frame.energy_samples(samples_file='constant.csv')
+        df = trace.data_frame.energy_cluster_activity('LITTLE',
+                                                      samples=samples)
+
+        self.assertAlmostEqual(df.loc['active', 'time'], 0.8, places=2)
+        self.assertAlmostEqual(df.loc['idle', 'time'], 0.9, places=2)
+        self.assertAlmostEqual(df.loc['active', 'energy'], 1.6, places=2)
+        self.assertAlmostEqual(df.loc['idle', 'energy'], 1.8, places=2)
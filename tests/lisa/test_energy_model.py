@@ -19,6 +19,9 @@ from collections import OrderedDict
 import unittest
 from unittest import TestCase
 
+from mock import patch
+
+import energy_model
 from energy_model import (EnergyModel, ActiveState, EnergyModelCapacityError,
                           EnergyModelNode, EnergyModelRoot, PowerDomain)
 
@@ -187,6 +190,41 @@ class TestOptimalPlacement(TestCase):
         self.assertRaises(EnergyModelCapacityError,
                           em.get_optimal_placements, tasks)
 
+    @patch.object(EnergyModel, 'placement_pool_min_candidates', 0)
+    def test_parallel_matches_serial(self):
+        """Splitting the search across processes gives the same result"""
+        tasks = {'task0': 60, 'task1': 30, 'task2': 10, 'task3': 350}
+        self.assertListEqual(em.get_optimal_placements(tasks, processes=3),
+                             em.get_optimal_placements(tasks))
+
+        tasks = {'task' + str(i) : 10 for i in range(5)}
+        self.assertListEqual(em.get_optimal_placements(tasks, processes=2),
+                             em.get_optimal_placements(tasks))
+
+    @patch.object(EnergyModel, 'placement_pool_min_candidates', 0)
+    def test_parallel_overutilized(self):
+        self.assertRaises(EnergyModelCapacityError,
+                          em.get_optimal_placements, {'task0' : 401},
+                          processes=2)
+
+    @patch.object(EnergyModel, 'placement_pool_min_candidates', 0)
+    def test_parallel_pool(self):
+        """The pool is kept across searches with the same processes"""
+        tasks = {'task0': 60, 'task1': 30}
+        em.get_optimal_placements(tasks, processes=2)
+        pool = energy_model._placement_pool[2]
+        em.get_optimal_placements(tasks, processes=2)
+        self.assertIs(energy_model._placement_pool[2], pool)
+        em.get_optimal_placements(tasks, processes=3)
+        self.assertIsNot(energy_model._placement_pool[2], pool)
+
+    def test_parallel_threshold(self):
+        """Small searches run in the calling process"""
+        with patch.object(EnergyModel, '_find_placement_candidates_parallel')\
+                as parallel:
+            em.get_optimal_placements({'task0': 60, 'task1': 30}, processes=2)
+        self.assertFalse(parallel.called)
+
 class TestBiggestCpus(TestCase):
     def test_biggest_cpus(self):
         self.assertEqual(em.biggest_cpus, [2, 3])
@@ -237,6 +275,24 @@ class TestEnergyEst(TestCase):
                 + (0.5 * 10) # LITTLE cluster active power
                 + 2)         # big cluster power
 
+    def test_series(self):
+        """Estimating a series gives the same as estimating each row"""
+        cpu_utils = [[10000] * 4, [0] * 4, [50, 0, 0, 0], [0, 200, 300, 0],
+                     [100, 0, 0, 400]]
+        power = em.estimate_from_cpu_util_series(cpu_utils,
+                                                 index=[0, 1, 2, 3, 4])
+        self.assertListEqual(list(power.index), [0, 1, 2, 3, 4])
+        for time, utils in enumerate(cpu_utils):
+            exp = em.estimate_from_cpu_util(utils)
+            row = power.loc[time]
+            self.assertItemsEqual(row.index, exp.keys())
+            for cpus, value in exp.iteritems():
+                self.assertEqual(row[cpus], value)
+
+    def test_series_invalid(self):
+        with self.assertRaises(ValueError):
+            em.estimate_from_cpu_util_series([[0, 0, 0]])
+
 class TestIdleStates(TestCase):
     def test_zero_util_deepest(self):
         self.assertEqual(em.guess_idle_states([0] * 4), ['cluster-sleep-0'] * 4)
@@ -0,0 +1,329 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+from multiprocessing import Pool
+import os
+import shutil
+import socket
+import tempfile
+from unittest import TestCase
+
+from executor import (Executor, ExecutorFarm, _postprocess_experiment,
+                      _postprocess_worker_init)
+from wlgen import Workload
+
+from test_wlgen import TestTarget
+
+class _EchoWorkload(Workload):
+    """Workload just echoing its name on the target"""
+    def __init__(self, target, name):
+        super(_EchoWorkload, self).__init__(target, name)
+        self.wtype = 'echo'
+        self.command = 'echo {}'.format(name)
+
+class _LocalTestEnv(object):
+    """Minimal stand-in for a TestEnv using a local target"""
+    def __init__(self, res_dir):
+        self.target = TestTarget()
+        self.res_dir = res_dir
+        if not os.path.isdir(res_dir):
+            os.makedirs(res_dir)
+        self.kernel = None
+        self.dtb = None
+        self.ftrace = None
+        self.emeter = None
+        self.platform = {}
+
+class _SamplesEnergyMeter(object):
+    """Energy meter stand-in writing constant power samples"""
+    def reset(self):
+        pass
+
+    def report(self, out_dir):
+        with open(os.path.join(out_dir, 'samples.csv'), 'w') as fh:
+            fh.write(SAMPLES_CSV)
+
+SAMPLES_CSV = """time,BAT_power,BAT_voltage
+0.0,1.0,5.0
+0.1,2.0,5.0
+0.2,3.0,5.0
+"""
+
+RTAPP_LOG = """# Policy : SCHED_OTHER priority : 0
+#idx     perf      run   period           start             end          rel_st      slack      c_run   c_period     wu_lat
+   0     9014     1000    10000       100000000       100010000             100       5000       2000      10000        300
+   0     9014     3000    10000       100010000       100020000           10100      -1000       2000      10000        400
+"""
+
+class _LocalExecutor(Executor):
+    """Executor running echo workloads without configuring the target"""
+    def _target_configure(self, tc):
+        return True
+
+    def _target_cleanup(self, tc):
+        pass
+
+    def _wload_init(self, tc, wl_idx):
+        test_dir = os.path.join(self.te.res_dir,
+                                'echo:{}:{}'.format(tc['tag'], wl_idx))
+        if not os.path.isdir(test_dir):
+            os.makedirs(test_dir)
+        return _EchoWorkload(self.target, wl_idx), test_dir
+
+class _FileWorkload(_EchoWorkload):
+    """Workload printing a file pushed into the run folder"""
+    def __init__(self, target, name, run_dir, events):
+        super(_FileWorkload, self).__init__(target, name)
+        self.run_dir = run_dir
+        self.command = 'cat {}/{}.conf'.format(run_dir, name)
+        self._events = events
+
+    def push(self):
+        super(_FileWorkload, self).push()
+        self.target.execute('echo {0} > {1}/{0}.conf'.format(self.name,
+                                                            self.run_dir))
+        self._events.append(('push', self.name))
+
+class _RebootExecutor(_LocalExecutor):
+    """Executor whose target configurations wipe the run folder"""
+    def __init__(self, *args, **kwargs):
+        self.events = []
+        _LocalExecutor.__init__(self, *args, **kwargs)
+
+    def _target_configure(self, tc):
+        self.target.execute('rm -rf {}'.format(self.te.run_dir))
+        self.events.append(('configure', tc['tag']))
+        return True
+
+    def _wload_init(self, tc, wl_idx):
+        _, test_dir = _LocalExecutor._wload_init(self, tc, wl_idx)
+        return (_FileWorkload(self.target, wl_idx, self.te.run_dir,
+                              self.events), test_dir)
+
+class _LocalFarm(ExecutorFarm):
+    executor_class = _LocalExecutor
+
+experiments_conf = {
+    'confs' : [{'tag' : 'conf1'}, {'tag' : 'conf2'}],
+    'wloads' : {'wl1' : {'type' : 'echo'}, 'wl2' : {'type' : 'echo'}},
+    'iterations' : 3,
+}
+
+class TestExecutorFarm(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.test_envs = [_LocalTestEnv(os.path.join(self.res_dir, str(i)))
+                          for i in range(3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_sharding(self):
+        """Each experiment runs once, each target runs whole confs"""
+        farm = _LocalFarm(self.test_envs, experiments_conf,
+                          res_dir=os.path.join(self.res_dir, 'farm'))
+        farm.run()
+
+        ran = [(e.conf['tag'], e.wload_name, e.iteration)
+               for executor in farm.executors for e in executor.experiments]
+        expected = [(tc['tag'], wl_idx, itr_idx)
+                    for tc in experiments_conf['confs']
+                    for wl_idx in experiments_conf['wloads']
+                    for itr_idx in range(1, 4)]
+        self.assertItemsEqual(ran, expected)
+
+        # Two confs for three targets, the last one is idle
+        confs = [set(e.conf['tag'] for e in executor.experiments)
+                 for executor in farm.executors]
+        self.assertEqual(confs, [set(['conf1']), set(['conf2']), set()])
+        idle_target = farm.executors[2].target
+        self.assertNotIn('echo wl1', idle_target.executed_commands)
+
+    def test_sharding_kernels(self):
+        """Confs using the same kernel are run by the same target"""
+        conf = dict(experiments_conf, confs=[
+            {'tag' : 'conf1', 'kernel' : 'a'},
+            {'tag' : 'conf2', 'kernel' : 'b'},
+            {'tag' : 'conf3', 'kernel' : 'a'},
+            {'tag' : 'conf4', 'kernel' : 'b'},
+        ])
+        farm = _LocalFarm(self.test_envs[:2], conf,
+                          res_dir=os.path.join(self.res_dir, 'farm'))
+        farm.run()
+
+        confs = [set(e.conf['tag'] for e in executor.experiments)
+                 for executor in farm.executors]
+        self.assertEqual(confs, [set(['conf1', 'conf3']),
+                                 set(['conf2', 'conf4'])])
+
+    def test_merged_results(self):
+        """The merged results folder links all the experiments"""
+        farm = _LocalFarm(self.test_envs, experiments_conf,
+                          res_dir=os.path.join(self.res_dir, 'farm'))
+        farm.run()
+
+        self.assertEqual(len(farm.experiments), 12)
+        for exp in farm.experiments:
+            self.assertTrue(exp.out_dir.startswith(farm.res_dir))
+            self.assertTrue(os.path.islink(exp.out_dir))
+            self.assertTrue(os.path.isdir(exp.out_dir))
+
+        self.assertItemsEqual(os.listdir(farm.res_dir),
+                              ['echo:conf1:wl1', 'echo:conf1:wl2',
+                               'echo:conf2:wl1', 'echo:conf2:wl2'])
+        for test_dir in os.listdir(farm.res_dir):
+            self.assertItemsEqual(
+                os.listdir(os.path.join(farm.res_dir, test_dir)),
+                ['1', '2', '3'])
+
+    def test_same_results_dir(self):
+        test_envs = [_LocalTestEnv(self.res_dir), _LocalTestEnv(self.res_dir)]
+        with self.assertRaises(ValueError):
+            _LocalFarm(test_envs, experiments_conf)
+
+class TestExecutorTimings(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_timings(self):
+        """Each experiment and the campaign record their phase timings"""
+        executor = _LocalExecutor(_LocalTestEnv(self.res_dir),
+                                  experiments_conf)
+        with executor.span('my_step'):
+            pass
+        executor.run()
+
+        for exp in executor.experiments:
+            with open(os.path.join(exp.out_dir, 'timings.json')) as fh:
+                spans = json.load(fh)
+            names = [span['name'] for span in spans]
+            self.assertIn('wload_run', names)
+            self.assertIn('experiment', names)
+            for span in spans:
+                self.assertEqual(span['iteration'], exp.iteration)
+                self.assertGreaterEqual(span['duration_s'], 0)
+
+        with open(os.path.join(self.res_dir, 'timings.json')) as fh:
+            timings = json.load(fh)
+        self.assertEqual(timings['summary']['wload_run']['count'], 12)
+        self.assertEqual(timings['summary']['my_step']['count'], 1)
+
+class TestExecutorResume(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_resume(self):
+        """Completed experiments push nothing before the target is set up"""
+        _RebootExecutor(_LocalTestEnv(self.res_dir), experiments_conf).run()
+        # The campaign was interrupted before the last experiment completed
+        manifest = os.path.join(self.res_dir, 'experiments.json')
+        with open(manifest) as fh:
+            completed = json.load(fh)
+        del completed['conf1:wl1:3']
+        with open(manifest, 'w') as fh:
+            json.dump(completed, fh)
+
+        executor = _RebootExecutor(_LocalTestEnv(self.res_dir),
+                                   experiments_conf, resume=True)
+        executor.run()
+        self.assertEqual(len(executor.experiments), 12)
+        self.assertEqual(executor.events,
+                         [('configure', 'conf1'), ('push', 'wl1')])
+        self.assertEqual(executor.experiments[-1].wload.getOutput(),
+                         'wl1\n')
+
+    def test_interleaved_reboots(self):
+        """Workloads are pushed again after each target configuration"""
+        conf = dict(experiments_conf, order='interleaved', confs=[
+            {'tag' : 'conf1', 'kernel' : 'a'},
+            {'tag' : 'conf2', 'kernel' : 'b'},
+        ])
+        executor = _RebootExecutor(_LocalTestEnv(self.res_dir), conf)
+        executor.run()
+        self.assertEqual(len(executor.experiments), 12)
+        for exp in executor.experiments:
+            self.assertEqual(exp.wload.getOutput(), exp.wload_name + '\n')
+        # Each configuration of the target runs the 2 workloads
+        configures = [event for event in executor.events
+                      if event[0] == 'configure']
+        self.assertGreater(len(configures), 2)
+        self.assertEqual(len(executor.events), 3 * len(configures))
+
+class TestExecutorPostprocess(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_experiment(self):
+        """rt-app performance and power stats of a collected experiment"""
+        with open(os.path.join(self.res_dir, 'rt-app-task-0.log'), 'w') as fh:
+            fh.write(RTAPP_LOG)
+        _SamplesEnergyMeter().report(self.res_dir)
+
+        _postprocess_experiment(self.res_dir, 'rtapp', {}, None)
+
+        with open(os.path.join(self.res_dir, 'performance.json')) as fh:
+            perf = json.load(fh)
+        self.assertIn('task', perf)
+        with open(os.path.join(self.res_dir, 'power_stats.json')) as fh:
+            stats = json.load(fh)
+        self.assertListEqual(stats.keys(), ['BAT'])
+        self.assertEqual(stats['BAT']['count'], 3)
+        self.assertAlmostEqual(stats['BAT']['avg'], 2.0)
+        self.assertAlmostEqual(stats['BAT']['max'], 3.0)
+
+    def test_pool(self):
+        """Experiments are post-processed by the pool"""
+        te = _LocalTestEnv(self.res_dir)
+        te.emeter = _SamplesEnergyMeter()
+        conf = dict(experiments_conf, postprocess={'processes' : 2})
+        executor = _LocalExecutor(te, conf)
+        executor.run()
+
+        for exp in executor.experiments:
+            path = os.path.join(exp.out_dir, 'power_stats.json')
+            self.assertTrue(os.path.isfile(path))
+
+    def test_worker_init(self):
+        """Workers do not keep the sockets of the parent process"""
+        sock = socket.socket()
+        try:
+            pool = Pool(1, initializer=_postprocess_worker_init)
+            try:
+                self.assertFalse(pool.apply(_fd_is_open, (sock.fileno(),)))
+                self.assertTrue(_fd_is_open(sock.fileno()))
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            sock.close()
+
+def _fd_is_open(fd):
+    try:
+        os.fstat(fd)
+    except OSError:
+        return False
+    return True
@@ -0,0 +1,135 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import socket
+import tempfile
+from collections import namedtuple
+from unittest import TestCase
+
+from mock import patch
+
+from test import LisaTest, experiment_test
+
+_Experiment = namedtuple('Experiment', 'out_dir, wload')
+_Wload = namedtuple('Wload', 'tasks')
+_Executor = namedtuple('Executor', 'experiments')
+
+class _ExperimentsTest(LisaTest):
+    """LisaTest checking that no experiment is named 'fail'"""
+    @experiment_test
+    def check(self, experiment, tasks):
+        with open(os.path.join(experiment.out_dir, 'pid'), 'w') as fh:
+            fh.write(str(os.getpid()))
+        self.assertNotEqual(os.path.basename(experiment.out_dir), 'fail',
+                            'Experiment failed')
+
+class _SocketTest(LisaTest):
+    """LisaTest recording whether the socket of the test process is open"""
+    sock_fd = None
+
+    @experiment_test
+    def check(self, experiment, tasks):
+        try:
+            os.fstat(self.sock_fd)
+            is_open = True
+        except OSError:
+            is_open = False
+        with open(os.path.join(experiment.out_dir, 'open'), 'w') as fh:
+            fh.write(str(is_open))
+
+class TestExperimentTest(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        _ExperimentsTest.tearDownClass()
+        _SocketTest.tearDownClass()
+        shutil.rmtree(self.res_dir)
+
+    def _test(self, names, processes, test_cls=_ExperimentsTest):
+        experiments = []
+        for name in names:
+            out_dir = os.path.join(self.res_dir, name)
+            os.makedirs(out_dir)
+            experiments.append(_Experiment(out_dir, _Wload({'task' : {}})))
+        test = test_cls()
+        test.executor = _Executor(experiments)
+        test.experiment_processes = processes
+        return test
+
+    def _pids(self, names):
+        pids = []
+        for name in names:
+            with open(os.path.join(self.res_dir, name, 'pid')) as fh:
+                pids.append(int(fh.read()))
+        return pids
+
+    def test_parallel(self):
+        """Experiments are tested in worker processes"""
+        names = ['exp{}'.format(i) for i in range(4)]
+        self._test(names, processes=2).check()
+        self.assertNotIn(os.getpid(), self._pids(names))
+
+    def test_same_workers(self):
+        """The test methods of a class share the workers"""
+        names = ['exp{}'.format(i) for i in range(4)]
+        test = self._test(names, processes=2)
+        test.check()
+        pids = self._pids(names)
+        test.check()
+        self.assertEqual(self._pids(names), pids)
+        self.assertEqual(len(set(pids)), 2)
+
+    def test_failure_message(self):
+        """Failures are reported with the traceback of the worker"""
+        names = ['exp0', 'fail', 'exp2']
+        with self.assertRaises(AssertionError) as parallel:
+            self._test(names, processes=2).check()
+        self.assertNotEqual(self._pids(['fail']), [os.getpid()])
+
+        shutil.rmtree(self.res_dir)
+        os.makedirs(self.res_dir)
+        with self.assertRaises(AssertionError) as serial:
+            self._test(names, processes=None).check()
+        self.assertIn('Experiment failed', str(serial.exception))
+        self.assertIn('Check trace file', str(serial.exception))
+        self.assertTrue(str(parallel.exception).startswith(
+            str(serial.exception)))
+        self.assertIn('Traceback', str(parallel.exception))
+
+    def test_worker_sockets(self):
+        """Workers do not keep the sockets of the test process"""
+        names = ['exp0', 'exp1']
+        sock = socket.socket()
+        try:
+            test = self._test(names, processes=2, test_cls=_SocketTest)
+            test.sock_fd = sock.fileno()
+            test.check()
+        finally:
+            sock.close()
+        for name in names:
+            with open(os.path.join(self.res_dir, name, 'open')) as fh:
+                self.assertEqual(fh.read(), 'False')
+
+    def test_close_at_exit(self):
+        """The workers are terminated at exit without tearDownClass"""
+        with patch('test.atexit.register') as register:
+            self._test(['exp0', 'exp1'], processes=2).check()
+        pool = _ExperimentsTest._experiment_pool
+        register.assert_called_once_with(pool.close)
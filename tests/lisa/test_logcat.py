@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+import time
+from unittest import TestCase
+
+from devlib import TargetError
+
+from android.logcat import LogcatWatcher
+
+LOGCAT = """I ActivityManager: START u0 {cmp=com.android.benchmark/.app.RunLocalBenchmarksActivity}
+I System.out: iteration: 0
+I System.out: unrelated message
+I System.out: iteration: 1
+I BENCH   : BenchmarkDone!
+"""
+
+class TestLogcatWatcher(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.logfile = os.path.join(self.res_dir, 'logcat.txt')
+        with open(self.logfile, 'w') as fh:
+            fh.write(LOGCAT)
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_matches(self):
+        """Patterns are waited for and call back on each matching line"""
+        iterations = []
+        watcher = LogcatWatcher(['cat', self.logfile])
+        watcher.on('start', r'ActivityManager: START')
+        watcher.on('iteration', r'System.out: iteration: (?P<iteration>[0-9]+)',
+                   lambda match: iterations.append(match.group('iteration')))
+        watcher.on('done', r'BENCH\s+:\s+BenchmarkDone!')
+        with watcher:
+            watcher.wait('start', timeout=10)
+            watcher.wait('done', timeout=10)
+            match = watcher.wait('iteration')
+        self.assertEqual(match.group('iteration'), '1')
+        self.assertListEqual(iterations, ['0', '1'])
+
+    def test_stream_end(self):
+        watcher = LogcatWatcher('cat {}'.format(self.logfile))
+        watcher.on('missing', r'never logged')
+        with watcher:
+            with self.assertRaises(TargetError):
+                watcher.wait('missing', timeout=10)
+
+    def test_timeout(self):
+        """Waits time out, and the stream is terminated on exit"""
+        watcher = LogcatWatcher(['sh', '-c', 'cat {}; exec sleep 30'.format(
+            self.logfile)])
+        watcher.on('missing', r'never logged')
+        start = time.time()
+        with watcher:
+            with self.assertRaises(TargetError):
+                watcher.wait('missing', timeout=0.2)
+        self.assertLess(time.time() - start, 10)
+
+    def test_wait_idle(self):
+        """Waiting for idle returns once no line is logged for a while"""
+        watcher = LogcatWatcher(['sh', '-c', 'cat {}; exec sleep 30'.format(
+            self.logfile)])
+        with watcher:
+            self.assertTrue(watcher.wait_idle(0.2))
+            self.assertFalse(watcher.wait_idle(0.2, max_lines=1))
+
+        watcher = LogcatWatcher(['cat', self.logfile])
+        with watcher:
+            self.assertFalse(watcher.wait_idle(10))
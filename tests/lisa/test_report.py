@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import sys
+from StringIO import StringIO
+
+import pandas as pd
+
+from report import Report
+
+from test_results import ResultsDirBase
+
+class TestReport(ResultsDirBase):
+    def setUp(self):
+        super(TestReport, self).setUp()
+        self._add_run('test', '3', energy=40.0)
+
+    def _report(self, formats):
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            report = Report(self.res_dir, compare=[('base', 'test')],
+                            formats=formats)
+            return report, sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+
+    def test_comparisons(self):
+        report, output = self._report(['relative'])
+        self.assertIn('Energy Indexes (Relative)', output)
+        self.assertIn('base', output)
+
+        cmp_df = report.comparisons
+        self.assertItemsEqual(cmp_df.base.unique(), ['base'])
+        self.assertItemsEqual(cmp_df.test.unique(), ['test'])
+        total = cmp_df[cmp_df.metric == 'energy.Total'].iloc[0]
+        self.assertEqual(total.base_avg, 10.0)
+        self.assertEqual(total.test_avg, 20.0)
+        self.assertEqual(total.delta, 10.0)
+        self.assertEqual(total.delta_pct, 100.0)
+
+    def test_reference_once(self):
+        """A single base reference line is printed per workload"""
+        self._add_run('base2', '1')
+        report, output = self._report(['relative'])
+        lines = output.splitlines()
+        self.assertEqual(len([l for l in lines
+                              if l.startswith('wl          : base')]), 1)
+        self.assertEqual(len([l for l in lines
+                              if l.startswith('wl          :   test')]), 2)
+
+    def test_csv(self):
+        report, output = self._report(['csv'])
+        self.assertEqual(output, '')
+        csv = pd.read_csv(os.path.join(self.res_dir, 'report.csv'))
+        self.assertEqual(len(csv), len(report.comparisons))
@@ -0,0 +1,147 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from results import Results, Stats, StreamingStats
+
+from test_rtapp_log import RTAPP_LOG
+
+class ResultsDirBase(TestCase):
+    """Base class for tests using a results folder of rt-app experiments"""
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        for conf in ['base', 'test']:
+            for run_idx in ['1', '2']:
+                self._add_run(conf, run_idx)
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def _add_run(self, conf, run_idx, energy=10.0):
+        run_dir = os.path.join(self.res_dir,
+                               'rtapp:{}:wl'.format(conf), run_idx)
+        os.makedirs(run_dir)
+        with open(os.path.join(run_dir, 'rt-app-task-0.log'), 'w') as fh:
+            fh.write(RTAPP_LOG)
+        with open(os.path.join(run_dir, 'energy.json'), 'w') as fh:
+            json.dump({'LITTLE' : energy / 2, 'big' : energy / 2}, fh)
+        return run_dir
+
+class TestResults(ResultsDirBase):
+    def _load(self):
+        with open(os.path.join(self.res_dir, 'results.json')) as fh:
+            return json.load(fh)
+
+    def test_parallel(self):
+        """Tests parsed in worker processes give the same results"""
+        Results(self.res_dir, processes=1, incremental=True)
+        serial = self._load()
+        Results(self.res_dir, processes=2, incremental=True)
+        self.assertEqual(self._load(), serial)
+
+        energy = serial['rtapp']['wl']['base']['energy']['Total']
+        self.assertEqual(energy['count'], 2)
+        self.assertEqual(energy['avg'], 10.0)
+
+    def test_incremental(self):
+        """Only new or changed runs are parsed again"""
+        Results(self.res_dir, processes=1, incremental=True)
+        run_json = os.path.join(self.res_dir, 'rtapp:base:wl', '1',
+                                'performance.json')
+        mtime = os.path.getmtime(run_json)
+
+        # Nothing changed
+        Results(self.res_dir, processes=1, incremental=True)
+        self.assertEqual(os.path.getmtime(run_json), mtime)
+
+        # A run is added
+        self._add_run('test', '3', energy=40.0)
+        Results(self.res_dir, processes=1, incremental=True)
+        self.assertEqual(os.path.getmtime(run_json), mtime)
+        results = self._load()
+        energy = results['rtapp']['wl']['test']['energy']['Total']
+        self.assertEqual(energy['count'], 3)
+        self.assertEqual(energy['avg'], 20.0)
+        self.assertIn('base', results['rtapp']['wl'])
+
+        # A run is changed
+        with open(os.path.join(self.res_dir, 'rtapp:base:wl', '2',
+                               'energy.json'), 'w') as fh:
+            json.dump({'LITTLE' : 20.0, 'big' : 20.0}, fh)
+        Results(self.res_dir, processes=1, incremental=True)
+        self.assertEqual(os.path.getmtime(run_json), mtime)
+        energy = self._load()['rtapp']['wl']['base']['energy']['Total']
+        self.assertEqual(energy['avg'], 25.0)
+
+    def test_parse_once(self):
+        """Unless incremental, results are only parsed without results.json"""
+        Results(self.res_dir)
+        self.assertFalse(os.path.exists(
+            os.path.join(self.res_dir, 'results_index.json')))
+        results_json = os.path.join(self.res_dir, 'results.json')
+        mtime = os.path.getmtime(results_json)
+
+        self._add_run('new', '1')
+        Results(self.res_dir)
+        self.assertEqual(os.path.getmtime(results_json), mtime)
+        self.assertNotIn('new', self._load()['rtapp']['wl'])
+
+class TestStats(TestCase):
+    values = np.random.RandomState(0).normal(1e9, 1.0, 1000)
+
+    def test_stable_std(self):
+        """The deviation of values with a large offset is accurate"""
+        stats = Stats(self.values).get()
+        self.assertAlmostEqual(stats['std'], np.std(self.values), places=6)
+
+    def test_percentiles(self):
+        stats = Stats(range(101), percentiles=[50, 90]).get()
+        self.assertEqual(stats['p50'], 50)
+        self.assertEqual(stats['p90'], 90)
+        self.assertNotIn('p99', stats)
+
+    def test_bootstrap(self):
+        stats = Stats(self.values, bootstrap=100).get()
+        low, high = stats['boot_c99']
+        self.assertLess(low, stats['avg'])
+        self.assertGreater(high, stats['avg'])
+
+    def test_streaming(self):
+        """Streaming stats match the stats of the whole list"""
+        streaming = StreamingStats()
+        for chunk in np.array_split(self.values, 7):
+            streaming.extend(chunk)
+        streaming.append(1e9)
+        stats = Stats(np.append(self.values, 1e9)).get()
+        for key, value in streaming.get().iteritems():
+            self.assertAlmostEqual(value, stats[key], places=6)
+
+    def test_streaming_reservoir(self):
+        """Percentiles are estimated when more values than kept are added"""
+        streaming = StreamingStats(reservoir=100)
+        streaming.extend(range(10000))
+        stats = streaming.get()
+        self.assertEqual(stats['count'], 10000)
+        self.assertEqual(stats['max'], 9999)
+        self.assertAlmostEqual(stats['p50'], 5000, delta=1500)
@@ -0,0 +1,71 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+
+from results_db import ResultsDB
+
+from test_results import ResultsDirBase
+
+class TestResultsDB(ResultsDirBase):
+    def setUp(self):
+        super(TestResultsDB, self).setUp()
+        with open(os.path.join(self.res_dir, 'rtapp:test:wl',
+                               'kernel.version'), 'w') as fh:
+            fh.write('Linux target 4.4.0-test #1 SMP aarch64 GNU/Linux\n')
+        self.db = ResultsDB(os.path.join(self.res_dir, 'results.db'))
+
+    def tearDown(self):
+        self.db.close()
+        super(TestResultsDB, self).tearDown()
+
+    def test_query(self):
+        self.assertEqual(self.db.ingest(self.res_dir, processes=1), 4)
+
+        df = self.db.query(metric='energy.Total')
+        self.assertEqual(len(df), 4)
+        self.assertItemsEqual(df.conf, ['base', 'base', 'test', 'test'])
+        self.assertItemsEqual(df.iteration, [1, 2, 1, 2])
+        self.assertTrue((df.value == 10.0).all())
+
+        df = self.db.query(kernel='4.4.0-test', metric=['performance.perf_avg',
+                                                        'energy.big'])
+        self.assertEqual(len(df), 4)
+        self.assertItemsEqual(df.conf.unique(), ['test'])
+        self.assertEqual(df[df.metric == 'performance.perf_avg']
+                         .value.iloc[0], 25.0)
+
+        self.assertEqual(len(self.db.query(since='2000-01-01',
+                                           until='2000-01-02')), 0)
+
+    def test_query_empty_filter(self):
+        """An empty list of values matches no run"""
+        self.db.ingest(self.res_dir, processes=1)
+        df = self.db.query(conf=[], metric='energy.Total')
+        self.assertEqual(len(df), 0)
+        self.assertIn('value', df.columns)
+
+    def test_reingest(self):
+        """Ingesting a folder again replaces its runs"""
+        self.db.ingest(self.res_dir, processes=1)
+        self._add_run('test', '3', energy=40.0)
+        self.assertEqual(self.db.ingest(self.res_dir, processes=1), 5)
+
+        self.assertEqual(len(self.db.campaigns()), 1)
+        df = self.db.query(conf='test', metric='energy.Total',
+                           campaign=self.res_dir)
+        self.assertItemsEqual(df.value, [10.0, 10.0, 40.0])
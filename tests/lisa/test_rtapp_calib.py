@@ -0,0 +1,127 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from mock import patch
+
+from env import TestEnv, RTAPP_CALIB_PROBE_S
+from wlgen import RTA
+
+class _Cpufreq(object):
+    def __init__(self, domains, max_freq):
+        self.domains = domains
+        self.max_freq = max_freq
+
+    def iter_domains(self):
+        return iter(self.domains)
+
+    def get_max_frequency(self, cpu):
+        return self.max_freq
+
+class _Target(object):
+    """Target stand-in with two frequency domains"""
+    def __init__(self, max_freq=1000):
+        self.cpufreq = _Cpufreq([[0, 1], [2, 3]], max_freq)
+        self.kernel_version = '4.4.0'
+
+    def list_online_cpus(self):
+        return [0, 1, 2, 3]
+
+class TestRTAppCalibrationCache(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.cache_file = os.path.join(self.res_dir, 'calib.json')
+
+        # Values returned by the calibration of each CPU
+        self.pload = {0 : 100, 1 : 100, 2 : 50, 3 : 50}
+        self.calls = []
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def _calibrate(self, target, cpus=None, duration_s=1):
+        cpus = cpus if cpus is not None else target.list_online_cpus()
+        self.calls.append((list(cpus), duration_s))
+        return {cpu : self.pload[cpu] for cpu in cpus}
+
+    def _get_env(self, target=None):
+        te = TestEnv.__new__(TestEnv)
+        te.conf = {'host' : 'board', 'rtapp-calib-cache' : self.cache_file}
+        te.ip = None
+        te.LISA_HOME = self.res_dir
+        te.target = target or _Target()
+        te._log = logging.getLogger('TestEnv')
+        return te
+
+    def test_cache_key(self):
+        """Calibrations of different kernels or frequencies do not mix"""
+        key = self._get_env()._calib_cache_key()
+        self.assertEqual(key, 'board:4.4.0:1000,1000,1000,1000')
+        other = self._get_env(_Target(max_freq=2000))._calib_cache_key()
+        self.assertNotEqual(key, other)
+
+    def test_stale_cpus(self):
+        """Only the domains whose probe does not match are stale"""
+        te = self._get_env()
+        calib = {0 : 100, 1 : 100, 2 : 50, 3 : 50}
+        self.pload[2] = 54
+        with patch.object(RTA, 'calibrate', side_effect=self._calibrate):
+            self.assertEqual(te._calib_stale_cpus(calib),
+                             ([], {0 : 100, 2 : 54}))
+            self.pload[2] = 80
+            self.assertEqual(te._calib_stale_cpus(calib),
+                             ([2, 3], {0 : 100, 2 : 80}))
+
+        # One short probe of the first CPU of each domain
+        self.assertEqual(self.calls, [([0, 2], RTAPP_CALIB_PROBE_S)] * 2)
+
+    def test_stale_cpus_missing(self):
+        """Domains missing from the cache are stale and not probed"""
+        te = self._get_env()
+        with patch.object(RTA, 'calibrate', side_effect=self._calibrate):
+            self.assertEqual(te._calib_stale_cpus({0 : 100, 1 : 100, 2 : 50}),
+                             ([2, 3], {0 : 100}))
+        self.assertEqual(self.calls, [([0], RTAPP_CALIB_PROBE_S)])
+
+    def test_cache(self):
+        """The cache is written, reused and updated"""
+        te = self._get_env()
+        with patch.object(RTA, 'calibrate', side_effect=self._calibrate):
+            self.assertEqual(te._calibrate_rtapp(), self.pload)
+            self.assertEqual(te._calibrate_rtapp(), self.pload)
+            self.pload[2] = self.pload[3] = 80
+            self.assertEqual(te._calibrate_rtapp(), self.pload)
+
+        self.assertEqual(self.calls, [
+            # Full calibration
+            ([0, 1, 2, 3], 1),
+            # Probes, then calibration of the other CPU of a stale domain
+            ([0, 2], RTAPP_CALIB_PROBE_S),
+            ([0, 2], RTAPP_CALIB_PROBE_S),
+            ([3], 1),
+        ])
+        with open(self.cache_file) as fh:
+            cache = json.load(fh)
+        self.assertEqual(cache.values(),
+                         [{'0' : 100, '1' : 100, '2' : 80, '3' : 80}])
+        self.assertEqual(os.listdir(self.res_dir), ['calib.json'])
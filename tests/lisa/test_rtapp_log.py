@@ -0,0 +1,88 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from perf_analysis import PerfAnalysis
+from rtapp_log import (load_rtapp_log, rtapp_metrics, rtapp_task_name,
+                       RTAPP_CACHE_SUFFIX)
+
+RTAPP_LOG = """# Policy : SCHED_OTHER priority : 0
+#idx     perf      run   period           start             end          rel_st      slack      c_run   c_period     wu_lat
+   0     9014     1000    10000       100000000       100010000             100       5000       2000      10000        300
+   0     9014     3000    10000       100010000       100020000           10100      -1000       2000      10000        400
+"""
+
+class TestRTAppLog(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        self.logfile = os.path.join(self.res_dir, 'rt-app-my-task-0.log')
+        with open(self.logfile, 'w') as fh:
+            fh.write(RTAPP_LOG)
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_task_name(self):
+        self.assertEqual(rtapp_task_name(self.logfile), 'my-task')
+        with self.assertRaises(ValueError):
+            rtapp_task_name(os.path.join(self.res_dir, 'output.log'))
+
+    def test_cache(self):
+        """The parsed log is cached and reloaded"""
+        df = load_rtapp_log(self.logfile)
+        self.assertEqual(len(df), 2)
+        self.assertListEqual(list(df.slack), [5000, -1000])
+        self.assertTrue(os.path.isfile(self.logfile + RTAPP_CACHE_SUFFIX))
+
+        os.remove(self.logfile)
+        os.mknod(self.logfile)
+        os.utime(self.logfile, (0, 0))
+        self.assertTrue(load_rtapp_log(self.logfile).equals(df))
+
+    def test_metrics(self):
+        df = load_rtapp_log(self.logfile)
+        metrics = rtapp_metrics({'a' : df, 'b' : df}, energy=2.0)
+        self.assertListEqual(sorted(metrics.index), ['a', 'b'])
+
+        prf = metrics.loc['a']
+        # perf index: 100 * 5000 / 8000 and 100 * -1000 / 8000
+        self.assertAlmostEqual(prf['perf_avg'], 25.0)
+        self.assertAlmostEqual(prf['perf_std'], 37.5)
+        self.assertEqual(prf['run_sum'], 4000)
+        self.assertEqual(prf['slack_sum'], 1000)
+        self.assertAlmostEqual(prf['slack_pct'], 25.0)
+        self.assertAlmostEqual(prf['edp2'], 2.0 * 4000 ** 2)
+
+        metrics = rtapp_metrics({'a' : df})
+        self.assertEqual(metrics.loc['a', 'edp1'], 0)
+
+    def test_perf_analysis(self):
+        """PerfAnalysis keeps every sample, whatever the comment lines"""
+        # Older rt-app versions log no policy line
+        logfile = os.path.join(self.res_dir, 'rt-app-other-0.log')
+        with open(logfile, 'w') as fh:
+            fh.write(RTAPP_LOG.split('\n', 1)[1])
+
+        pa = PerfAnalysis(self.res_dir)
+        for task in ['my-task', 'other']:
+            df = pa.df(task)
+            self.assertEqual(len(df), 2)
+            self.assertListEqual(list(df.Slack), [5000, -1000])
@@ -0,0 +1,96 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+import numpy as np
+
+from bart.sched.SchedMultiAssert import SchedMultiAssert
+from trappy.stats.Topology import Topology
+from trace import Trace
+
+SWITCH = '          <idle>-0     [00{cpu}] d..3 {time:.6f}: sched_switch: ' \
+         'prev_comm={prev_comm} prev_pid={prev_pid} prev_prio=120 ' \
+         'prev_state={prev_state} ==> next_comm={next_comm} ' \
+         'next_pid={next_pid} next_prio=120\n'
+
+# (time, cpu, prev_comm, prev_pid, next_comm, next_pid)
+SWITCHES = [
+    (100.0, 0, 'swapper/0', 0, 'task1', 11),
+    (100.2, 1, 'swapper/1', 0, 'task2', 12),
+    (100.3, 0, 'task1', 11, 'swapper/0', 0),
+    (100.4, 1, 'task2', 12, 'task1', 11),
+    (100.5, 0, 'swapper/0', 0, 'task2', 12),
+    (100.6, 0, 'task2', 12, 'other', 13),
+    (100.9, 1, 'task1', 11, 'swapper/1', 0),
+    (101.0, 0, 'other', 13, 'swapper/0', 0),
+]
+
+platform = {
+    'clusters' : {'little' : [0, 1]},
+    'cpus_count' : 2,
+    'freqs' : {'little' : [1000]},
+    'topology' : [[0, 1]],
+}
+
+class TestTaskLifetimes(TestCase):
+    def setUp(self):
+        self.res_dir = tempfile.mkdtemp()
+        lines = ['# tracer: nop\n', '#\n']
+        for time, cpu, prev_comm, prev_pid, next_comm, next_pid in SWITCHES:
+            lines.append(SWITCH.format(
+                cpu=cpu, time=time, prev_comm=prev_comm, prev_pid=prev_pid,
+                prev_state='R' if prev_pid == 0 else 'S',
+                next_comm=next_comm, next_pid=next_pid))
+        for name in ['trace.txt', 'trace.raw.txt']:
+            with open(os.path.join(self.res_dir, name), 'w') as fh:
+                fh.writelines(lines)
+        self.trace = Trace(platform, self.res_dir, events=['sched_switch'],
+                           normalize_time=False)
+
+    def tearDown(self):
+        shutil.rmtree(self.res_dir)
+
+    def test_lifetimes(self):
+        """First run, last run and runtime of each task"""
+        df = self.trace.data_frame.task_lifetimes(['task1', 'task2', 'none'])
+        self.assertListEqual(list(df.index), ['task1', 'task2', 'none'])
+
+        self.assertAlmostEqual(df.loc['task1', 'first_run'], 100.0)
+        self.assertAlmostEqual(df.loc['task1', 'last_run'], 100.4)
+        self.assertAlmostEqual(df.loc['task1', 'runtime'], 0.3 + 0.5)
+        self.assertAlmostEqual(df.loc['task2', 'first_run'], 100.2)
+        self.assertAlmostEqual(df.loc['task2', 'last_run'], 100.5)
+        self.assertAlmostEqual(df.loc['task2', 'runtime'], 0.2 + 0.1)
+        self.assertTrue(np.isnan(df.loc['none', 'first_run']))
+
+    def test_bart(self):
+        """Start and end times match the ones of bart"""
+        tasks = ['task1', 'task2']
+        df = self.trace.data_frame.task_lifetimes(tasks)
+        sma = SchedMultiAssert(self.trace.ftrace,
+                               Topology(clusters=[[0, 1]]), execnames=tasks)
+        self.assertEqual(len(sma.getStartTime()), 2)
+        for start in sma.getStartTime().itervalues():
+            self.assertAlmostEqual(df.loc[start['task_name'], 'first_run'],
+                                   start['starttime'])
+        for end in sma.getEndTime().itervalues():
+            self.assertAlmostEqual(df.loc[end['task_name'], 'last_run'],
+                                   end['endtime'])
@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from collections import namedtuple
+from unittest import TestCase
+
+import numpy as np
+import pandas as pd
+
+from test import TraceCache
+
+_Event = namedtuple('Event', 'data_frame')
+
+class _FTrace(object):
+    """Stand-in for a trappy FTrace with a single 1MB event"""
+    def __init__(self):
+        self.sched_switch = _Event(pd.DataFrame({'a' : np.zeros(128 * 1024)}))
+
+    def get_filters(self):
+        return ['sched_switch']
+
+_Trace = namedtuple('Trace', 'ftrace')
+
+class TestTraceCache(TestCase):
+    def setUp(self):
+        self.loads = []
+
+    def _get(self, cache, key):
+        def load():
+            self.loads.append(key)
+            return _Trace(_FTrace())
+        return cache.get(key, load)
+
+    def test_cached(self):
+        """Traces are loaded once"""
+        cache = TraceCache(max_mb=10)
+        trace = self._get(cache, 'a')
+        self.assertIs(self._get(cache, 'a'), trace)
+        self.assertEqual(self.loads, ['a'])
+
+    def test_lru(self):
+        """The least recently used traces are evicted beyond the budget"""
+        cache = TraceCache(max_mb=2.5)
+        for key in ['a', 'b', 'a', 'c']:
+            self._get(cache, key)
+        self.assertEqual(self.loads, ['a', 'b', 'c'])
+
+        # 'b' was evicted when 'c' was loaded
+        self._get(cache, 'a')
+        self._get(cache, 'b')
+        self.assertEqual(self.loads, ['a', 'b', 'c', 'b'])
+
+    def test_objects(self):
+        """Objects built from a trace are dropped with it"""
+        cache = TraceCache(max_mb=1.5)
+        self._get(cache, 'a')
+        cache.objects('a')['assert'] = object()
+        self._get(cache, 'b')
+        self._get(cache, 'a')
+        self.assertEqual(cache.objects('a'), {})
@@ -0,0 +1,74 @@
+# SPDX-License-Identifier: Apache-2.0
+#
+# Copyright (C) 2017, ARM Limited and contributors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License"); you may
+# not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+# WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+import time
+
+from devlib.exception import TargetError
+
+from wlgen import Workload, wait_workloads
+
+from test_wlgen import WlgenSelfBase
+
+class _ShellWorkload(Workload):
+    """Workload running a shell command, keeping track of its postrun"""
+    def __init__(self, target, name, command):
+        super(_ShellWorkload, self).__init__(target, name)
+        self.command = command
+        self.postrun_params = None
+        self.setCallback('postrun', self._postrun)
+
+    def _postrun(self, params):
+        self.postrun_params = params
+
+class TestRunAsync(WlgenSelfBase):
+    def test_concurrent(self):
+        """Workloads started with run_async run concurrently"""
+        wloads = [_ShellWorkload(self.target, 'wl{}'.format(i),
+                                 'sleep 1; echo wl{}'.format(i))
+                  for i in range(3)]
+
+        start = time.time()
+        runs = [wload.run_async(out_dir='/foo') for wload in wloads]
+        outputs = wait_workloads(runs)
+        self.assertLess(time.time() - start, 2.5)
+
+        self.assertEqual(outputs, {'wl0' : 'wl0\n', 'wl1' : 'wl1\n',
+                                   'wl2' : 'wl2\n'})
+        for wload in wloads:
+            self.assertEqual(wload.getOutput(), '{}\n'.format(wload.name))
+            self.assertEqual(wload.postrun_params,
+                             {'destdir' : '/foo', 'pull' : True})
+
+    def test_failure(self):
+        """A failed workload is reported after waiting for all of them"""
+        failing = _ShellWorkload(self.target, 'failing', 'exit 1')
+        passing = _ShellWorkload(self.target, 'passing', 'sleep 0.5')
+
+        runs = [failing.run_async(), passing.run_async()]
+        with self.assertRaises(TargetError):
+            wait_workloads(runs)
+        self.assertIsNone(failing.postrun_params)
+        self.assertIsNotNone(passing.postrun_params)
+
+    def test_timeout(self):
+        wload = _ShellWorkload(self.target, 'slow', 'sleep 1')
+        run = wload.run_async()
+        self.assertFalse(run.done())
+        with self.assertRaises(TargetError):
+            run.wait(timeout=0.1)
+        run.wait()
+        self.assertTrue(run.done())
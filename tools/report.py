@@ -34,8 +34,14 @@ parser.add_argument('--tests',  type=str,
 parser.add_argument('--results', type=str,
         default='./results_latest',
         help='Folder containing experimental results')
+parser.add_argument('--format', type=str, action='append',
+        choices=['relative', 'absolute', 'csv', 'parquet'],
+        help='Report relative or absolute comparisons, or export them into '
+             'report.csv or report.parquet in the results folder. '
+             'Can be repeated, default: relative')
 
 if __name__ == "__main__":
     args = parser.parse_args()
-    Report(args.results, compare=[(args.bases, args.tests)])
+    Report(args.results, compare=[(args.bases, args.tests)],
+           formats=args.format or ['relative'])
 